@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: import and first page with a large theme catalog.
+
+Generates a catalog of 5,000 palettes (see registry_scan.py) and runs each variant in a fresh
+interpreter: import nicetheme, create the registry and a manager, and compile the stylesheet
+the first page is rendered with.
+    eager           ThemeRegistry(lazy=False, snapshot=False)   builds every entry
+    eager+snapshot  ThemeRegistry(lazy=False)                   unpickles every entry (warm)
+    lazy            ThemeRegistry()                              builds what the page uses
+
+Usage:
+    python benchmarks/catalog_startup.py [--palettes 5000] [--runs 3]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+VARIANTS = {
+    'eager': {'lazy': False, 'snapshot': False},
+    'eager+snapshot': {'lazy': False, 'snapshot': True},
+    'lazy': {'lazy': True, 'snapshot': False},
+}
+
+
+def run(catalog: str, options: dict):
+    """Child process: prints the phase timings as JSON."""
+    start = time.perf_counter()
+    from nicetheme.core.compiler import ThemeCompiler
+    from nicetheme.core.manager import ThemeManager
+    from nicetheme.core.registry import ThemeRegistry
+    imported = time.perf_counter()
+    registry = ThemeRegistry(themes_dirs=[Path(catalog)], font_subsets=None, **options)
+    scanned = time.perf_counter()
+    compiled = ThemeCompiler().compile(ThemeManager(registry=registry))
+    assert compiled is not None and '--nt-primary' in compiled.stylesheet
+    done = time.perf_counter()
+    print(json.dumps({'import': imported - start, 'registry': scanned - imported, 'first page': done - scanned,
+                      'total': done - start, 'parsed': registry.parsed_files}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--palettes', type=int, default=5000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run(args.child[0], json.loads(args.child[1]))
+        return
+
+    from registry_scan import make_catalog  # Imports nicetheme, so not in the child processes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = make_catalog(Path(tmp), args.palettes)
+        print(f'{args.palettes} palettes{"":<8}' + ''.join(f'{c:>12}' for c in ('import', 'registry', 'first page', 'total'))
+              + '  parsed')
+        for label, options in VARIANTS.items():
+            results = []
+            for _ in range(args.runs + (1 if options['snapshot'] else 0)):
+                output = subprocess.check_output([sys.executable, __file__, '--child', str(catalog), json.dumps(options)])
+                results.append(json.loads(output.decode().strip().splitlines()[-1]))
+            if options['snapshot']:
+                results = results[1:]  # The first run writes the snapshot
+            row = ''.join(f"{statistics.median(r[k] for r in results) * 1000:>9.0f} ms"
+                          for k in ('import', 'registry', 'first page', 'total'))
+            print(f'{label:<22}{row}  {results[-1]["parsed"]:>6}')
+
+
+if __name__ == '__main__':
+    main()
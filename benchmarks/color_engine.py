@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: nicetheme.core.color on whole palettes and whole catalogs.
+
+Builds a catalog of N palettes from the bundled ones (every palette with colors of its own, mixing
+hex, rgb(), hsl() and oklch() values) and converts it to OKLCH and to RGB triples, once per value
+and in a single batch per palette and per catalog. The parse cache is cleared before each run.
+
+Usage:
+    python benchmarks/color_engine.py [--palettes 1,100,5000] [--runs 3]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from nicetheme.core import color  # noqa: E402
+from nicetheme.core.registry import ThemeRegistry  # noqa: E402
+
+
+def make_catalog(size: int) -> List[List[str]]:
+    """The resolved colors of `size` palettes (light and dark tables of the bundled palettes, perturbed)."""
+    registry = ThemeRegistry(font_subsets=None, snapshot=False)
+    tables = [list(palette.table.values()) for pair in registry.palettes.values() for palette in pair.values()]
+    rng = random.Random(0)
+    syntaxes = [
+        lambda r, g, b: f'#{r:02x}{g:02x}{b:02x}',
+        lambda r, g, b: f'rgb({r} {g} {b})',
+        lambda r, g, b: f'hsl({rng.uniform(0, 360):.1f} {rng.uniform(0, 100):.1f}% {rng.uniform(0, 100):.1f}%)',
+        lambda r, g, b: f'oklch({rng.uniform(0, 1):.3f} {rng.uniform(0, 0.3):.3f} {rng.uniform(0, 360):.1f})',
+    ]
+    catalog = []
+    for i in range(size):
+        palette = []
+        for value in tables[i % len(tables)]:
+            rgb = color.rgb_triple(value) or (0, 0, 0)
+            r, g, b = (min(255, max(0, c + rng.randint(-8, 8))) for c in rgb)
+            palette.append(rng.choice(syntaxes)(r, g, b))
+        catalog.append(palette)
+    return catalog
+
+
+def timed(function: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        color.parse_value.cache_clear()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--palettes', default='1,100,5000', help='Comma separated catalog sizes')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    columns = ('per value', 'per palette', 'per catalog')
+    print(f"{'palettes':>8}  {'colors':>7}  {'target':<8}" + ''.join(f'{c:>15}' for c in columns))
+    for size in (int(s) for s in args.palettes.split(',')):
+        catalog = make_catalog(size)
+        values = [value for palette in catalog for value in palette]
+        for target, batch in (('oklch', lambda v: color.convert(v, 'oklch')), ('rgb', color.rgb_triples)):
+            row = (
+                timed(lambda: [batch([value]) for value in values], args.runs),
+                timed(lambda: [batch(palette) for palette in catalog], args.runs),
+                timed(lambda: batch(values), args.runs),
+            )
+            print(f'{size:>8}  {len(values):>7}  {target:<8}' + ''.join(f'{t * 1000:>12.1f} ms' for t in row))
+
+
+if __name__ == '__main__':
+    main()
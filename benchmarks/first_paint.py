@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first themed paint.
+
+Starts a NiceTheme app in a subprocess and measures how long it takes until the
+browser holds HTML that already contains the themed CSS variables and mode class
+(i.e. what it needs to paint the page correctly, without waiting for the websocket).
+
+Usage:
+    python benchmarks/first_paint.py [--requests 50]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+PORT = 8765
+
+
+def serve():
+    from nicegui import ui
+    from nicetheme import nt
+
+    @nt.page('/')
+    def index():
+        nt.button('Themed on first paint')
+
+    ui.run(port=PORT, show=False, reload=False)
+
+
+def fetch(path: str, headers: dict) -> tuple:
+    request = urllib.request.Request(f'http://127.0.0.1:{PORT}{path}', headers=headers)
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        html = response.read().decode('utf-8')
+    return time.perf_counter() - start, html
+
+
+def wait_for_server(timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            fetch('/', {})
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Server did not start')
+
+
+def measure(label: str, headers: dict, count: int, expect_dark: bool):
+    timings = []
+    for _ in range(count):
+        elapsed, html = fetch('/', headers)
+        themed = 'id="nt-theme-vars"' in html and '--nt-primary' in html
+        mode_class = '"classes":["body--dark"]' if expect_dark else '"classes":["body--light"]'
+        mode_ok = mode_class in html
+        hidden = 'theme-ready' in html
+        if not themed or not mode_ok or hidden:
+            print(f'{label}: initial HTML is not themed (themed={themed}, mode={mode_ok}, hidden={hidden})')
+            return
+        timings.append(elapsed * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f'{label:<32} p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        return
+
+    server = subprocess.Popen([sys.executable, __file__, '--serve'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server()
+        prefs = urllib.parse.quote(json.dumps({'mode': 'dark', 'palette': 'material'}))
+        measure('no hints (light default)', {}, args.requests, expect_dark=False)
+        measure('Sec-CH-Prefers-Color-Scheme', {'Sec-CH-Prefers-Color-Scheme': 'dark'}, args.requests, expect_dark=True)
+        measure('nt_prefs cookie', {'Cookie': f'nt_prefs_default={prefs}'}, args.requests, expect_dark=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ in {'__main__', '__mp_main__'}:
+    main()
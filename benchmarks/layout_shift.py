@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: layout shift when a web font swaps in, with and without metric-adjusted fallbacks.
+
+Serves two pages that set a paragraph-heavy panel in a local theme font which arrives with a delay:
+    /before  font-family: '<font>', Arial               (plain system fallback)
+    /after   font-family: '<font>', '<font> Fallback'   (size-adjust / ascent / descent overrides)
+Each page measures its Cumulative Layout Shift with a PerformanceObserver and reports it back.
+
+Usage:
+    python benchmarks/layout_shift.py [--font milkshake] [--delay 0.8] [--runs 5]
+
+With playwright installed the pages are loaded in headless Chromium and the scores are printed;
+otherwise open http://localhost:8767/before and /after in a Chromium-based browser.
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+PORT = 8767
+
+TEXT = ('The quick brown fox jumps over the lazy dog. Pack my box with five dozen liquor jugs. '
+        'Sphinx of black quartz, judge my vow. ') * 6
+
+MEASURE_JS = """
+<script>
+window.ntLayoutShift = 0;
+new PerformanceObserver((list) => {
+  for (const entry of list.getEntries()) {
+    if (!entry.hadRecentInput) window.ntLayoutShift += entry.value;
+  }
+}).observe({type: 'layout-shift', buffered: true});
+</script>
+"""
+
+
+def serve(font: str, delay: float):
+    from fastapi.responses import FileResponse
+    from nicegui import app, ui
+    from nicetheme.core.fonts import FontMetrics, font_face_css, font_stack
+    from nicetheme.core.registry import ThemeRegistry
+
+    registry = ThemeRegistry(font_subsets=None)
+    source = registry.font_files[font]
+    metrics = FontMetrics.from_file(source)
+
+    @app.get('/bench-fonts/{name}')
+    async def slow_font(name: str):
+        await asyncio.sleep(delay)  # Font arrives after the first paint, like on a slow network
+        return FileResponse(source)
+
+    def build(stack: str, extra_css: str):
+        ui.add_head_html(MEASURE_JS)
+        ui.add_head_html(f'<style>{font_face_css(font, f"/bench-fonts/{source.name}")} {extra_css}'
+                         f' .bench {{ font-family: {stack}; font-size: 18px; }}</style>')
+        with ui.column().classes('bench w-full max-w-2xl'):
+            ui.label(f'Layout shift benchmark: {font}').classes('text-2xl')
+            for _ in range(4):
+                ui.label(TEXT)
+                ui.button('Action')
+
+    @ui.page('/before')
+    def before():
+        build(f"'{font}', Arial", '')
+
+    @ui.page('/after')
+    def after():
+        build(font_stack(font), metrics.fallback_css(font))
+
+    ui.run(port=PORT, show=False, reload=False)
+
+
+def wait_for_server(timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{PORT}/before').read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Server did not start')
+
+
+async def measure(runs: int, delay: float):
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        for path in ('/before', '/after'):
+            scores = []
+            for _ in range(runs):
+                page = await browser.new_page()
+                await page.goto(f'http://127.0.0.1:{PORT}{path}')
+                await page.evaluate('document.fonts.ready')
+                await page.wait_for_timeout(delay * 1000 + 500)
+                scores.append(await page.evaluate('window.ntLayoutShift'))
+                await page.close()
+            print(f'{path:<8} CLS median {statistics.median(scores):.4f}   max {max(scores):.4f}')
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--font', default='milkshake', help='Local font registered by the theme registry')
+    parser.add_argument('--delay', type=float, default=0.8, help='Seconds before the font file is served')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--serve', action='store_true', help='Only run the server')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.font, args.delay)
+        return
+
+    try:
+        import playwright  # noqa: F401
+    except ImportError:
+        print(f'playwright is not installed: open http://localhost:{PORT}/before and /after in Chromium '
+              'and read window.ntLayoutShift in the console.')
+        serve(args.font, args.delay)
+        return
+
+    server = subprocess.Popen([sys.executable, __file__, '--serve', '--font', args.font, '--delay', str(args.delay)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server()
+        asyncio.run(measure(args.runs, args.delay))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ in {'__main__', '__mp_main__'}:
+    main()
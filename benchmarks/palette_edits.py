@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one session edit (update_primary_color) until the stylesheet is compiled.
+
+Edits the primary color of a session N times, with a new color each time, so every compile
+misses the cache. The same edit is also timed as a full recompute:
+    palette     Palette.derive (what depends on the field)  vs  replace + css_vars (everything)
+    stylesheet  CompiledTheme.build from the previous one   vs  from scratch
+    edit        update_primary_color + ThemeCompiler.compile, end to end
+
+Usage:
+    python benchmarks/palette_edits.py [--edits 2000] [--theme default]
+"""
+import argparse
+import itertools
+import statistics
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from nicetheme.core.compiler import CompiledTheme, ThemeCompiler  # noqa: E402
+from nicetheme.core.manager import ThemeManager  # noqa: E402
+
+colors = (f'#{i % 0xFFFFFF:06x}' for i in itertools.count(1))
+
+
+def timed(function: Callable[[Any], object], edits: int, prepare: Callable[[str], Any] = lambda value: value) -> float:
+    """Median time of one call with a new color (prepared outside the timing), in microseconds."""
+    times = []
+    for _ in range(5):
+        batch = [prepare(next(colors)) for _ in range(edits)]
+        start = time.perf_counter()
+        for value in batch:
+            function(value)
+        times.append((time.perf_counter() - start) / edits)
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--edits', type=int, default=2000)
+    parser.add_argument('--theme', default='default')
+    args = parser.parse_args()
+
+    manager = ThemeManager()
+    manager.select_theme(args.theme)
+    compiler = ThemeCompiler()
+    previous = compiler.compile(manager)
+    palette = manager.get_active_palette()
+    palettes = {mode: manager.get_active_palette(mode) for mode in ('light', 'dark')}
+
+    def edited(value: str) -> dict:
+        return {mode: p.derive(primary=value) for mode, p in palettes.items()}
+
+    def edit(value: str, incremental: bool):
+        manager.update_primary_color(value)
+        if not incremental:  # What every edit did before: rebuild the palettes and the stylesheet
+            manager._invalidate()
+            compiler._latest.clear()
+        compiler.compile(manager)
+
+    rows = (
+        ('palette', timed(lambda v: palette.derive(primary=v).css_vars, args.edits),
+         timed(lambda v: replace(palette, primary=v).css_vars, args.edits)),
+        ('stylesheet', timed(lambda p: CompiledTheme.build(manager.theme, p, previous), args.edits, edited),
+         timed(lambda p: CompiledTheme.build(manager.theme, p), args.edits, edited)),
+        ('edit', timed(lambda v: edit(v, True), args.edits), timed(lambda v: edit(v, False), args.edits)),
+    )
+    print(f"{'':<12}{'incremental':>14}{'full':>14}")
+    for name, incremental, full in rows:
+        print(f'{name:<12}{incremental:>11.1f} us{full:>11.1f} us')
+
+
+if __name__ == '__main__':
+    main()
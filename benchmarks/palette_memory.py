@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory per loaded palette (tracemalloc).
+
+Generates a catalog of N palettes from the bundled ones, each with a few colors of its own
+(catalogs usually share most values: white, black, grey scales), indexes it lazily and then
+measures what loading every palette (light and dark variant, compiled lookup tables) adds.
+Also measures a per-session copy of a palette with an overridden primary color.
+
+Usage:
+    python benchmarks/palette_memory.py [--palettes 1000] [--sessions 200]
+"""
+import argparse
+import gc
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from nicetheme.core.registry import ThemeRegistry  # noqa: E402
+
+THEMES = Path(__file__).parent.parent / 'nicetheme' / 'themes'
+
+
+def make_catalog(root: Path, size: int) -> Path:
+    sources = [yaml.safe_load(file.read_text()) for file in sorted((THEMES / 'palettes').glob('*.yaml'))]
+    catalog = root / 'palettes'
+    catalog.mkdir(parents=True)
+    for i in range(size):
+        data = sources[i % len(sources)]
+        palette = data.get('palette', data)
+        colors = dict(palette.get('colors', {}))
+        for n, name in enumerate(list(colors)[:3]):  # A few colors unique to this palette
+            colors[name] = f'#{(i * 3 + n) % 0xFFFFFF:06x}'
+        (catalog / f'palette_{i}.yaml').write_text(yaml.safe_dump({**palette, 'colors': colors}))
+    return root
+
+
+def traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--palettes', type=int, default=1000)
+    parser.add_argument('--sessions', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = make_catalog(Path(tmp), args.palettes)
+        registry = ThemeRegistry(themes_dirs=[catalog], font_subsets=None, snapshot=False)
+        names = [name for name in registry.palettes if name.startswith('palette_')]
+
+        tracemalloc.start()
+        before = traced()
+        loaded = [registry.palettes[name] for name in names]
+        for pair in loaded:
+            for palette in pair.values():
+                palette.table  # Compiled lookup tables are part of a loaded palette
+        per_palette = (traced() - before) / len(loaded)
+
+        from dataclasses import replace
+        base = loaded[0]['light']
+        before = traced()
+        sessions = []
+        for i in range(args.sessions):
+            copy = replace(base, primary=f'#{i:06x}')
+            copy.table
+            sessions.append(copy)
+        per_session = (traced() - before) / len(sessions)
+        tracemalloc.stop()
+
+    print(f'{len(loaded)} palettes: {per_palette / 1024:.1f} KiB per palette (light + dark, compiled)')
+    print(f'{len(sessions)} session copies: {per_session / 1024:.2f} KiB per overridden palette')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ThemeRegistry.scan on growing theme catalogs.
+
+Generates catalogs of N palettes (plus N/4 textures, layouts and themes) by copying the bundled
+YAML files, then times a full scan with the pure-Python and the C YAML loader, serially and
+with a thread or process pool, and a restart that loads the compiled snapshot instead.
+
+Usage:
+    python benchmarks/registry_scan.py [--sizes 10,100,500,1000] [--runs 3]
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from nicetheme.core import registry  # noqa: E402
+from nicetheme.core.registry import ThemeRegistry  # noqa: E402
+
+THEMES = Path(__file__).parent.parent / 'nicetheme' / 'themes'
+
+
+def make_catalog(root: Path, size: int) -> Path:
+    """Copies the bundled components round-robin until the catalog holds `size` palettes."""
+    catalog = root / f'catalog-{size}'
+    for kind, count in (('palettes', size), ('textures', size // 4), ('layouts', size // 4)):
+        sources = sorted((THEMES / kind).glob('*.yaml'))
+        (catalog / kind).mkdir(parents=True)
+        for i in range(count):
+            source = sources[i % len(sources)]
+            shutil.copy(source, catalog / kind / f'{source.stem}_{i}.yaml')
+    sources = sorted(THEMES.glob('*.yaml'))
+    for i in range(size // 4):
+        shutil.copy(sources[i % len(sources)], catalog / f'theme_{i}.yaml')
+    return catalog
+
+
+def time_scan(catalog: Path, executor, runs: int, snapshot: bool = False) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        ThemeRegistry(themes_dirs=[catalog], font_subsets=None, scan_executor=executor, snapshot=snapshot,
+                      lazy=False)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,500,1000', help='Comma separated palette counts')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    loaders = [('SafeLoader', yaml.SafeLoader)]
+    if hasattr(yaml, 'CSafeLoader'):
+        loaders.append(('CSafeLoader', yaml.CSafeLoader))
+    else:
+        print('libyaml is not available: only the pure-Python loader is measured')
+    executors = [('serial', None), ('thread', 'thread'), ('process', 'process')]
+
+    columns = [f'{loader}/{executor}' for loader, _ in loaders for executor, _ in executors] + ['snapshot']
+    print(f"{'palettes':>8}  " + '  '.join(f'{c:>20}' for c in columns))
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(',')):
+            catalog = make_catalog(Path(tmp), size)
+            row = []
+            for _, loader in loaders:
+                registry.YamlLoader = loader
+                for _, executor in executors:
+                    row.append(time_scan(catalog, executor, args.runs))
+            time_scan(catalog, 'thread', 1, snapshot=True)  # Writes the snapshot
+            row.append(time_scan(catalog, 'thread', args.runs, snapshot=True))
+            print(f'{size:>8}  ' + '  '.join(f'{t * 1000:>17.1f} ms' for t in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+/* NiceTheme client runtime: applies theme updates sent by ThemeBridge */
+(function () {
+  const darkQuery = window.matchMedia("(prefers-color-scheme: dark)");
+
+  function themeStyle() {
+    let el = document.getElementById("nt-theme-vars");
+    if (!el) {
+      el = document.createElement("style");
+      el.id = "nt-theme-vars";
+      el.dataset.mode = "auto";
+      document.head.appendChild(el);
+    }
+    return el;
+  }
+
+  function findRule(sheet, selector) {
+    for (const rule of sheet.cssRules) {
+      if (rule.selectorText === selector) return rule;
+    }
+    return sheet.cssRules[sheet.insertRule(selector + " {}", sheet.cssRules.length)];
+  }
+
+  function applyDark(dark) {
+    document.body.classList.toggle("body--dark", dark);
+    document.body.classList.toggle("body--light", !dark);
+    document.querySelector("#app")?.classList.toggle("q-dark", dark);
+  }
+
+  window.nt = {
+    /* Sets and removes CSS variables per scope: {":root": {...}, "body.body--dark": {...}} */
+    setVars(changes, removed, version) {
+      const el = themeStyle();
+      const sheet = el.sheet;
+      for (const [selector, vars] of Object.entries(changes || {})) {
+        const style = findRule(sheet, selector).style;
+        for (const [name, value] of Object.entries(vars)) style.setProperty(name, value);
+      }
+      for (const [selector, names] of Object.entries(removed || {})) {
+        const style = findRule(sheet, selector).style;
+        for (const name of names) style.removeProperty(name);
+      }
+      if (version) el.dataset.version = version;
+    },
+
+    /* Both variable sets are already on the page, so switching mode is a class flip */
+    setMode(mode) {
+      themeStyle().dataset.mode = mode;
+      applyDark(mode === "auto" ? darkQuery.matches : mode === "dark");
+    },
+
+    /* Everything the server needs on connect, in one round trip */
+    handshake(theme) {
+      return {
+        scheme: darkQuery.matches ? "dark" : "light",
+        prefs: localStorage.getItem("nt_prefs_" + theme),
+        version: document.getElementById("nt-theme-vars")?.dataset.version || null,
+      };
+    },
+
+    get mode() {
+      return document.getElementById("nt-theme-vars")?.dataset.mode || "auto";
+    },
+  };
+
+  /* Remembers the OS preference (the cookie lets the server render the right mode next time) */
+  function storeScheme() {
+    const scheme = darkQuery.matches ? "dark" : "light";
+    localStorage.setItem("nt_detected_color_scheme", scheme);
+    document.cookie = "nt_scheme=" + scheme + "; path=/; max-age=31536000; samesite=lax";
+    document.documentElement.setAttribute("data-detected-color-scheme", scheme);
+    return scheme;
+  }
+  storeScheme();
+
+  /* Auto mode follows the browser, even if the server guessed the scheme wrong */
+  document.addEventListener("DOMContentLoaded", () => {
+    if (window.nt.mode === "auto") applyDark(darkQuery.matches);
+  });
+
+  /* OS scheme changed: flip locally and tell this client's session (no reload) */
+  darkQuery.addEventListener("change", (e) => {
+    const scheme = storeScheme();
+    if (window.nt.mode === "auto") applyDark(e.matches);
+    if (typeof emitEvent === "function") emitEvent("nt_color_scheme", scheme);
+  });
+})();
@@ -0,0 +1,121 @@
+"""
+Command line tools for NiceTheme.
+
+    nicetheme fonts optimize [--themes-dir DIR] [--cache DIR] [--subsets latin,latin-ext]
+    nicetheme fonts fetch FAMILY [FAMILY ...] [--cache DIR]
+    nicetheme audit [--themes-dir DIR] [--minimum 3] [--text 4.5] [--levels surface-0,...] [--roles-only]
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .core.fonts import DEFAULT_SUBSETS, UNICODE_RANGES, FontStore
+from .core.themes import ACCENT_CONTRAST
+
+
+def _optimize_fonts(args) -> int:
+    from .core.registry import ThemeRegistry
+
+    subsets = [s.strip() for s in args.subsets.split(',') if s.strip()]
+    unknown = [s for s in subsets if s not in UNICODE_RANGES]
+    if unknown:
+        print(f"Unknown subsets: {', '.join(unknown)} (available: {', '.join(UNICODE_RANGES)})", file=sys.stderr)
+        return 2
+
+    registry = ThemeRegistry(themes_dirs=[Path(d) for d in args.themes_dir], font_cache=args.cache,
+                             font_subsets=subsets)
+    store = registry.font_store
+    for name, source in registry.font_files.items():
+        faces = registry.font_faces.get(name)
+        if not faces:
+            print(f'{name}: not optimized ({source})')
+            continue
+        sizes = [store.file_path(url.rsplit('/', 1)[-1]).stat().st_size for url, _ in faces]
+        print(f'{name}: {source.stat().st_size / 1024:.1f} KiB -> '
+              + ', '.join(f"{url.rsplit('/', 1)[-1]} {size / 1024:.1f} KiB" for (url, _), size in zip(faces, sizes)))
+    return 0
+
+
+def _fetch_fonts(args) -> int:
+    store = FontStore(args.cache)
+    failed = 0
+    for family in args.families:
+        try:
+            store.fetch(family)
+            print(f'{family}: cached in {store.cache_dir}')
+        except Exception as e:
+            print(f'{family}: {e}', file=sys.stderr)
+            failed += 1
+    return 1 if failed else 0
+
+
+def _audit(args) -> int:
+    from .core.registry import ThemeRegistry
+    from .core.themes import PALETTE_ROLES
+
+    levels = [level.strip() for level in args.levels.split(',') if level.strip()]
+    # Builds the whole catalog up front, so its contrast indexes are computed in one batch
+    registry = ThemeRegistry(themes_dirs=[Path(d) for d in args.themes_dir], font_subsets=None, lazy=False)
+    variants = accents = texts = 0
+    for name in sorted(registry.palettes):
+        for mode, palette in sorted(registry.palettes[name].items()):
+            variants += 1
+            contrast = palette.get_contrast()
+            roles: Dict[str, List[str]] = {}
+            for role in PALETTE_ROLES:
+                roles.setdefault(getattr(palette, role), []).append(role)
+            lines = [
+                f'  accent  {color} on {level}  {ratio:.2f}:1' + (f"  ({', '.join(roles[color])})" if color in roles else '')
+                for color, level, ratio in contrast.failing(args.minimum, levels)
+                if color in roles or not args.roles_only
+            ]
+            accents += len(lines)
+            for content, ratios in enumerate(contrast.text.tolist()):
+                for surface, ratio in enumerate(ratios):
+                    if ratio < args.text:
+                        lines.append(f'  text    content-{content} on surface-{surface}  {ratio:.2f}:1')
+                        texts += 1
+            if lines:
+                print(f'{name}/{mode}')
+                print('\n'.join(lines))
+    print(f'{variants} palette variants: {accents} color pairs below {args.minimum:g}:1, '
+          f'{texts} content pairs below {args.text:g}:1')
+    return 1 if accents or texts else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='nicetheme', description='NiceTheme command line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fonts = commands.add_parser('fonts', help='Font cache and optimization').add_subparsers(dest='action', required=True)
+
+    optimize = fonts.add_parser('optimize', help='Subset local theme fonts to WOFF2 per Unicode range')
+    optimize.add_argument('--themes-dir', action='append', default=[], help='Additional themes directory')
+    optimize.add_argument('--cache', type=Path, default=None, help='Font cache directory')
+    optimize.add_argument('--subsets', default=','.join(DEFAULT_SUBSETS),
+                          help=f"Comma separated ranges ({', '.join(UNICODE_RANGES)})")
+    optimize.set_defaults(handler=_optimize_fonts)
+
+    fetch = fonts.add_parser('fetch', help='Download Google families into the cache (e.g. to seed offline mode)')
+    fetch.add_argument('families', nargs='+')
+    fetch.add_argument('--cache', type=Path, default=None, help='Font cache directory')
+    fetch.set_defaults(handler=_fetch_fonts)
+
+    audit = commands.add_parser('audit', help='Check the WCAG contrast of every palette in the catalog')
+    audit.add_argument('--themes-dir', action='append', default=[], help='Additional themes directory')
+    audit.add_argument('--minimum', type=float, default=ACCENT_CONTRAST,
+                       help='Minimum contrast of colors against the levels (default: %(default)g)')
+    audit.add_argument('--text', type=float, default=4.5,
+                       help='Minimum contrast of content levels against the listed surfaces (default: %(default)g)')
+    audit.add_argument('--levels', default='surface-0',
+                       help='Comma separated levels colors are checked against (surface-N, content-N)')
+    audit.add_argument('--roles-only', action='store_true', help='Only report colors used by a role (primary, ...)')
+    audit.set_defaults(handler=_audit)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
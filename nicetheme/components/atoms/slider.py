@@ -1,5 +1,5 @@
 from nicegui import ui
-from typing import Optional, Callable, Any, Dict
+from typing import Optional, Callable, Any, Collection, Dict
 
 class slider(ui.slider):
     """
@@ -111,17 +111,20 @@ class palette_slider(ui.element):
     A horizontal color selection bar resembling a slider.
     Displays a set of colors and emphasizes the selected one by expanding it.
     Ideal for selecting a color from a palette (e.g., 8 accent colors).
+    Colors named in `flagged` (e.g. low contrast) are hatched.
     """
     def __init__(self, 
                  colors: Dict[str, str],
                  value: str,
-                 on_change: Optional[Callable[[str], None]] = None):
+                 on_change: Optional[Callable[[str], None]] = None,
+                 flagged: Collection[str] = ()):
         super().__init__('div')
         self.classes('relative w-full nt-palette-slider-container')
         self.style('height: 32px;') # Ensure container has height
         
         self._color_list = list(colors.values())
         self._color_names = list(colors.keys())
+        self._flagged = frozenset(flagged)
         self._on_change = on_change
         
         # Initial index
@@ -158,6 +161,8 @@ class palette_slider(ui.element):
             
             item = ui.element('div').classes('h-full transition-all duration-300 ease-out relative')
             item.style(f'background-color: {color}; flex: {flex_val};')
+            if self._color_names[i] in self._flagged:
+                item.classes('nt-palette-item--flagged')
             
             # Selection indicator
             if is_selected:
@@ -174,10 +179,11 @@ class palette_slider(ui.element):
         if self._on_change:
             self._on_change(self._color_list[int(e.value)])
 
-    def set_colors(self, colors: Dict[str, str], value: Optional[str] = None):
-        """Updates the available colors and optionally the current value."""
+    def set_colors(self, colors: Dict[str, str], value: Optional[str] = None, flagged: Collection[str] = ()):
+        """Updates the available colors (and which are flagged) and optionally the current value."""
         self._color_list = list(colors.values())
         self._color_names = list(colors.keys())
+        self._flagged = frozenset(flagged)
         
         self._slider.props(f'max={max(0, len(self._color_list) - 1)}')
         
@@ -1,38 +1,38 @@
 from nicegui import ui, Client
-from typing import Optional, List, Dict
+from typing import AbstractSet, Literal, Optional, List, Dict
 from nicetheme.components.atoms.tab import tab
 from nicetheme.components.atoms.toggle import toggle
 from nicetheme.components.atoms.select import select
 from nicetheme.components.atoms.slider import palette_slider, slider, split_slider
 from nicetheme.components.atoms.icon import palette_icon
-from nicetheme.core.manager import ThemeManager
+from nicetheme.core.fonts import GOOGLE_FONTS, load_fonts
+from nicetheme.core.manager import TOPICS, ThemeManager
 from nicetheme.core.registry import ThemeRegistry
 from nicetheme.core.themes import Palette
 
+# A filtered font picker only downloads its Google previews once at most this many families match
+FONT_PREVIEW_LIMIT = 6
+
 class theme_config(ui.column):
-    def __init__(self, manager: ThemeManager, registry: ThemeRegistry):
+    def __init__(
+        self,
+        manager: ThemeManager,
+        registry: Optional[ThemeRegistry] = None,
+        low_contrast: Literal['flag', 'skip', 'show'] = 'flag',
+    ):
         super().__init__()
         
-        self.manager = manager
-        self.registry = registry
+        # Edit this client's session, never the shared defaults
+        self.manager = manager.session()
+        self.registry = registry or manager.registry
+
+        # Accents that are hard to read on the page surface (see Palette.get_contrast) are hatched or left out
+        self.low_contrast = low_contrast
 
         # Local state to track which palette object we are currently editing
         self._palette: Optional[Palette] = None
         self._updating = False
 
-        # Curated list of Google Fonts - kept for UI options
-        google_fonts = [
-            "Roboto", "Open Sans", "Noto Sans JP", "Inter", "Lato", "Montserrat", 
-            "Oswald", "Source Sans Pro", "Slabo 27px", "Raleway", "PT Sans", 
-            "Merriweather", "Nunito Sans", "Prompt", "Work Sans", "Rubik",
-            "Playfair Display", "Fira Sans", "Mukta", "Quicksand", "Karla",
-            "Titillium Web", "Inconsolata", "Barlow", "Dosis", "Cabin",
-            "Bitter", "Anton", "Oxygen", "Arvo", "Libre Baskerville", "Lobster",
-            "Pacifico", "Shadows Into Light", "Dancing Script", "Bebas Neue",
-            "Poppins", "Recursive", "Sniglet"
-        ]
-        google_fonts.sort()
-        
         # Combine with local fonts
         self._all_font_opts = []
         for name in self.registry.fonts:
@@ -47,7 +47,7 @@ class theme_config(ui.column):
         # Simple Google "G" Icon (MDI path)
         google_svg = '<svg viewBox="0 0 24 24" style="width: 20px; height: 20px; fill: currentColor;"><path d="M21.35,11.1H12.18V13.83H18.69C18.36,17.64 15.19,19.27 12.19,19.27C8.36,19.27 5,16.25 5,12C5,7.9 8.2,4.73 12.2,4.73C15.29,4.73 17.1,6.7 17.1,6.7L19,4.72C19,4.72 16.56,2 12.1,2C6.42,2 2.03,6.8 2.03,12C2.03,17.05 6.16,22 12.25,22C17.6,22 21.5,18.33 21.5,12.91C21.5,11.76 21.35,11.1 21.35,11.1V11.1Z"/></svg>'
 
-        for name in google_fonts:
+        for name in GOOGLE_FONTS:
              if not any(o['value'] == name for o in self._all_font_opts):
                   self._all_font_opts.append({
                       'label': name,
@@ -213,6 +213,10 @@ class theme_config(ui.column):
                                 on_filter=self._filter_fonts
                             ).classes('w-48')
 
+                    # Font previews are only loaded once a picker is opened (see _load_font_previews)
+                    for font_select in (self._font_primary_select, self._font_secondary_select, self._font_mono_select):
+                        font_select.on('popup-show', self._load_font_previews)
+
                     # Font Scale
                     with ui.column().classes('w-full gap-1'):
                         ui.label('Font Scale').classes('text-[10px] opacity-60 font-bold uppercase tracking-wider')
@@ -256,9 +260,10 @@ class theme_config(ui.column):
                         ui.label('Density').classes('text-[10px] opacity-60 font-bold uppercase tracking-wider')
                         self._density_slider = slider(min=0.5, max=1.5, step=0.05, on_change=self._update_density)
                     
-        # Sync with manager
-        self.manager.bind(self._update_ui)
-        self._update_ui(self.manager)
+        # Sync with manager: each flush only refreshes the controls of the topics it changed
+        self.manager.bind(self._update_ui, topics=(
+            'mode', 'effective_mode', 'palette', 'palette_override', 'texture', 'layout', 'typography'))
+        self._refresh(frozenset(TOPICS))
 
         # Cleanup on client disconnect to prevent "Client has been deleted" errors
         if ui.context.client:
@@ -269,12 +274,15 @@ class theme_config(ui.column):
         self.manager.unbind(self._update_ui)
 
     def _update_ui(self, manager: ThemeManager):
-        """Updates the UI components based on the manager's current state."""
+        """Listener: updates the UI components of the topics the manager's last flush changed."""
         # SELF-CLEANING: Check if this component's client is still alive
         if self.client.id not in Client.instances:
             self.dispose()
             return
+        self._refresh(manager.changes.keys())
 
+    def _refresh(self, topics: AbstractSet[str]):
+        """Updates the UI components showing the given topics from the manager's current state."""
         if not self.manager.theme:
             return
         
@@ -282,27 +290,28 @@ class theme_config(ui.column):
         try:
             
             # 1. Update Mode Toggle
-            self._mode_toggle.value = self.manager.mode
+            if 'mode' in topics:
+                self._mode_toggle.value = self.manager.mode
             
             # 2. Update Palette Select
-            self._palette_select.value = self.manager.active_palette_name
+            if 'palette' in topics:
+                self._palette_select.value = self.manager.active_palette_name
             
-            # 3. Resolve actual Palette object based on mode
-            self._palette = self.manager.get_active_palette()
+            # 3. Resolve actual Palette object based on mode (the same object needs no new sliders)
+            palette = self._palette
+            if not topics.isdisjoint(('palette', 'palette_override', 'effective_mode')):
+                self._palette = self.manager.get_active_palette()
                 
-            if self._palette:
+            if self._palette and self._palette is not palette:
                 # 4. Update Sliders - resolve color references to actual hex values
-                self._primary_accent_slider.set_colors(
-                    self._palette.colors, 
-                    self._palette.resolve_color(self._palette.primary)
-                )
-                self._secondary_accent_slider.set_colors(
-                    self._palette.colors, 
-                    self._palette.resolve_color(self._palette.secondary)
-                )
+                for accent_slider, role in ((self._primary_accent_slider, self._palette.primary),
+                                            (self._secondary_accent_slider, self._palette.secondary)):
+                    value = self._palette.resolve_color(role)
+                    colors, flagged = self._accent_colors(value)
+                    accent_slider.set_colors(colors, value, flagged)
 
             # 5. Update Texture UI
-            if self.manager.theme and self.manager.theme.texture:
+            if 'texture' in topics and self.manager.theme.texture:
                 tex = self.manager.theme.texture
                 self._texture_select.value = self.manager.theme.texture_name
                 
@@ -318,7 +327,7 @@ class theme_config(ui.column):
                 self._blur_container.set_visibility(tex.opacity < 1)
 
             # 6. Update Typography UI
-            if self.manager.theme and self.manager.theme.typography:
+            if 'typography' in topics and self.manager.theme.typography:
                 typo = self.manager.theme.typography
                 
                 # Helper to find or add a font option (case-insensitive, auto-loads Google Fonts)
@@ -355,9 +364,8 @@ class theme_config(ui.column):
                     self._all_font_opts.append(new_option)
                     fonts_added = True
                     
-                    # Inject the Google Font CSS
-                    font_url = title_cased.replace(' ', '+')
-                    ui.add_head_html(f'<link href="https://fonts.googleapis.com/css2?family={font_url}&display=swap" rel="stylesheet">')
+                    # Load the Google Font (updates may be flushed outside of a UI context)
+                    load_fonts([title_cased], self.registry, self.client)
                     
                     return title_cased
                 
@@ -385,7 +393,7 @@ class theme_config(ui.column):
                 self._case_toggle.value = typo.title_case
 
             # 7. Update Layout UI
-            if self.manager.theme and self.manager.theme.layout:
+            if 'layout' in topics and self.manager.theme.layout:
                 layout = self.manager.theme.layout
                 self._layout_select.value = self.manager.theme.layout_name
 
@@ -396,6 +404,16 @@ class theme_config(ui.column):
         finally:
             self._updating = False
 
+    def _accent_colors(self, value: str):
+        """The colors offered for an accent and the flagged ones (from the contrast index built at load)."""
+        colors = self._palette.colors
+        if self.low_contrast == 'show':
+            return colors, ()
+        readable = self._palette.get_contrast().readable
+        if self.low_contrast == 'skip':
+            return {name: color for name, color in colors.items() if name in readable or color == value}, ()
+        return colors, [name for name in colors if name not in readable]
+
     def _handle_palette_change(self, e):
         if self._updating: return
         self.manager.set_palette(e.value)
@@ -418,86 +436,67 @@ class theme_config(ui.column):
 
     def _handle_texture_change(self, e):
         if self._updating: return
-        texture = self.registry.textures.get(e.value)
-        if texture and self.manager.theme:
-            self.manager.theme.texture = texture
-            self.manager.theme.texture_name = e.value
-            self.manager.refresh()
+        self.manager.set_texture(e.value)
 
     def _update_shadow_highlight(self, values: dict):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.texture:
-            self.manager.theme.texture.shadow_intensity = values['left']
-            self.manager.theme.texture.highlight_intensity = values['right']
-            self.manager.refresh()
+        self.manager.update_texture(shadow_intensity=values['left'], highlight_intensity=values['right'])
 
     def _update_blur(self, e):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.texture:
-            self.manager.theme.texture.blur = int(e.value)
-            self.manager.refresh()
+        self.manager.update_texture(blur=int(e.value))
 
     def _update_opacity(self, e):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.texture:
-            self.manager.theme.texture.opacity = e.value
-            self._blur_container.set_visibility(e.value < 1)
-            self.manager.refresh()
+        self._blur_container.set_visibility(e.value < 1)
+        self.manager.update_texture(opacity=e.value)
 
     def _update_border(self, e):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.layout:
-            self.manager.theme.layout.border = e.value
-            self.manager.refresh()
+        self.manager.update_layout(border=e.value)
 
     def _update_roundness(self, e):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.layout:
-            self.manager.theme.layout.roundness = e.value
-            self.manager.refresh()
+        self.manager.update_layout(roundness=e.value)
 
     def _update_density(self, e):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.layout:
-            self.manager.theme.layout.density = e.value
-            self.manager.refresh()
+        self.manager.update_layout(density=e.value)
 
     def _handle_layout_change(self, e):
         if self._updating: return
-        layout = self.registry.layouts.get(e.value)
-        if layout and self.manager.theme:
-            self.manager.theme.layout = layout
-            self.manager.theme.layout_name = e.value
-            self.manager.refresh()
+        self.manager.set_layout(e.value)
 
     def _filter_fonts(self, value: str):
         if not value:
             return self._all_font_opts
-        return [opt for opt in self._all_font_opts if value.lower() in (opt['value'] or "").lower()]
+        options = [opt for opt in self._all_font_opts if value.lower() in (opt['value'] or "").lower()]
+        # The user narrowed the list down, so the matching Google families are worth downloading
+        google = [opt['value'] for opt in options if opt.get('origin') == 'google']
+        if len(google) <= FONT_PREVIEW_LIMIT:
+            load_fonts(google, self.registry, self.client)
+        return options
+
+    def _load_font_previews(self):
+        """Loads the offered families that need no download (local and cached), so the picker renders them in their own font."""
+        store = self.registry.font_store
+        families = [opt['value'] for opt in self._all_font_opts
+                    if opt.get('origin') == 'local' or (opt.get('origin') == 'google' and store.css(opt['value']) is not None)]
+        load_fonts(families, self.registry, self.client)
 
     def _update_font(self, font_name: str, font_type: str):
         if self._updating: return
         if not self.manager.theme or not font_name:
             return
             
-        # Bridge loads ALL fonts at init. So we just set the value.
-        if font_type == 'primary':
-            self.manager.theme.typography.primary = font_name
-        elif font_type == 'secondary':
-            self.manager.theme.typography.secondary = font_name
-        elif font_type == 'mono':
-            self.manager.theme.typography.mono = font_name
-            
-        self.manager.refresh()
+        # The bridge loads the newly selected family on sync, so we just set the value.
+        if font_type in ('primary', 'secondary', 'mono'):
+            self.manager.update_typography(**{font_type: font_name})
 
     def _update_font_scale(self, e):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.typography:
-            self.manager.theme.typography.scale = float(e.value)
-            self.manager.refresh()
+        self.manager.update_typography(scale=float(e.value))
 
     def _update_text_case(self, e):
         if self._updating: return
-        if self.manager.theme and self.manager.theme.typography:
-            self.manager.theme.typography.title_case = e.value
-            self.manager.refresh()
\ No newline at end of file
+        self.manager.update_typography(title_case=e.value)
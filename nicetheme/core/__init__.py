@@ -4,18 +4,24 @@ NiceTheme Core Module
 Exports core theme management utilities.
 """
 
-from .manager import ThemeManager
+from .manager import ThemeChange, ThemeManager
 from .bridge import ThemeBridge
-from .registry import ThemeRegistry
-from .themes import Theme, Palette, Texture, Layout, Typography
+from .registry import LazyEntries, ThemeRegistry
+from .compiler import CompiledTheme, ThemeCompiler
+from .themes import ColorCycleError, Theme, Palette, Texture, Layout, Typography
 
 __all__ = [
     'ThemeManager',
+    'ThemeChange',
     'ThemeBridge',
     'ThemeRegistry',
+    'LazyEntries',
+    'CompiledTheme',
+    'ThemeCompiler',
     'Theme',
     'Palette',
     'Texture',
     'Layout',
     'Typography',
+    'ColorCycleError',
 ]
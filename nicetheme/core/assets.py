@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import re
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from nicegui import app, ui
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+ASSETS_DIR = Path(__file__).parent.parent / "assets"
+
+# Order matters: later sheets override earlier ones
+STYLESHEETS = ['icons.css', 'sliders.css', 'components.css', 'global_overrides.css']
+
+# Client runtime used by ThemeBridge for variable updates and mode switches
+SCRIPTS = ['nicetheme.js']
+
+ASSET_URL_PREFIX = '/_nicetheme/assets'
+
+# Hashed URLs never change content, so browsers may cache them forever
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+# Matches string literals (kept verbatim) and comments (dropped)
+_CSS_COMMENTS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.S)
+_CSS_STRINGS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+
+
+def minify_css(css: str) -> str:
+    """Strips comments and redundant whitespace from a stylesheet."""
+    css = _CSS_COMMENTS.sub(lambda m: m.group(1) or '', css)
+
+    parts = []
+    for i, chunk in enumerate(_CSS_STRINGS.split(css)):
+        if i % 2 == 0:
+            chunk = re.sub(r'\s+', ' ', chunk)
+            chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+            chunk = re.sub(r':\s+', ':', chunk).replace(';}', '}')
+        parts.append(chunk)
+    return ''.join(parts).strip()
+
+
+class AssetBundle:
+    """
+    Build-once asset pipeline: concatenates and minifies a set of files at startup,
+    precompresses the result (gzip, and brotli when available) and serves it from
+    a content-hashed URL with immutable cache headers.
+    """
+
+    def __init__(self, name: str, files: List[str], assets_dir: Path = ASSETS_DIR,
+                 media_type: str = 'text/css'):
+        self.name = name
+        self.files = files
+        self.assets_dir = assets_dir
+        self.media_type = media_type
+
+        self.content: bytes = b''
+        self.gzip: bytes = b''
+        self.brotli: Optional[bytes] = None
+        self.digest: str = ''
+        self._mounted = False
+
+        self.build()
+
+    def build(self):
+        """Reads, concatenates, minifies and compresses the bundle."""
+        sources = []
+        for file in self.files:
+            path = self.assets_dir / file
+            if path.exists():
+                sources.append(path.read_text(encoding='utf-8'))
+
+        text = '\n'.join(sources)
+        if self.media_type == 'text/css':
+            text = minify_css(text)
+
+        self.content = text.encode('utf-8')
+        self.digest = hashlib.sha256(self.content).hexdigest()[:16]
+        self.gzip = gzip.compress(self.content, compresslevel=9)
+        self.brotli = brotli.compress(self.content) if brotli else None
+
+    @property
+    def url(self) -> str:
+        extension = 'css' if self.media_type == 'text/css' else 'js'
+        return f"{ASSET_URL_PREFIX}/{self.name}.{self.digest}.{extension}"
+
+    def link_html(self) -> str:
+        """Returns the tag that references the bundle from a page head."""
+        if self.media_type == 'text/css':
+            return f'<link rel="stylesheet" href="{self.url}">'
+        return f'<script src="{self.url}"></script>'
+
+    def install(self):
+        """Registers the route and adds the bundle to every page head (once per process)."""
+        if self._mounted:
+            return
+        self._mounted = True
+        app.add_api_route(self.url, self.response, methods=['GET'], include_in_schema=False)
+        ui.add_head_html(self.link_html(), shared=True)
+
+    def response(self, request: Request) -> Response:
+        """Serves the best precompressed variant the client accepts."""
+        etag = f'"{self.digest}"'
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE,
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+        }
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=headers)
+
+        accepted = request.headers.get('accept-encoding', '')
+        body = self.content
+        if self.brotli is not None and 'br' in accepted:
+            body = self.brotli
+            headers['Content-Encoding'] = 'br'
+        elif 'gzip' in accepted:
+            body = self.gzip
+            headers['Content-Encoding'] = 'gzip'
+
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+_stylesheet_bundle: Optional[AssetBundle] = None
+_script_bundle: Optional[AssetBundle] = None
+
+
+def stylesheet_bundle() -> AssetBundle:
+    """Returns the process-wide bundle of the package stylesheets, building it on first use."""
+    global _stylesheet_bundle
+    if _stylesheet_bundle is None:
+        _stylesheet_bundle = AssetBundle('nicetheme', STYLESHEETS)
+    return _stylesheet_bundle
+
+
+def script_bundle() -> AssetBundle:
+    """Returns the process-wide bundle of the client runtime, building it on first use."""
+    global _script_bundle
+    if _script_bundle is None:
+        _script_bundle = AssetBundle('nicetheme', SCRIPTS, media_type='text/javascript')
+    return _script_bundle
@@ -1,9 +1,37 @@
-from nicegui import ui, app # Added app import
-from typing import List
-import os
+from nicegui import ui, app, Client, context # Added app import
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import unquote
+import json
+import weakref
+from .assets import script_bundle, stylesheet_bundle
+from .compiler import CompiledTheme, ThemeCompiler
+from .fonts import load_fonts, typography_families
 from .manager import ThemeManager
 from .registry import ThemeRegistry
-from .themes import Palette, Texture, Layout, Typography
+from .themes import Palette
+
+@dataclass
+class SyncStats:
+    """Websocket payload accounting for ThemeBridge.sync (JavaScript characters sent)."""
+    syncs: int = 0
+    skipped: int = 0
+    full_bytes: int = 0
+    sent_bytes: int = 0
+    last_saved: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.full_bytes - self.sent_bytes
+
+    def record(self, full: int, sent: int):
+        self.syncs += 1
+        if not sent:
+            self.skipped += 1
+        self.full_bytes += full
+        self.sent_bytes += sent
+        self.last_saved = full - sent
+
 
 class ThemeBridge:
     """
@@ -13,464 +41,297 @@ class ThemeBridge:
     def __init__(self, manager: ThemeManager, registry: ThemeRegistry):
         self.manager = manager
         self.registry = registry
-        
-        # Subscribe to changes automatically
-        self.manager.bind(self.sync)
-        
+
+        # Each client gets its own session of the manager; we subscribe to it on connect
+
+        # Last state pushed to each session's client, so sync can send deltas
+        self._pushed: 'weakref.WeakKeyDictionary[ThemeManager, dict]' = weakref.WeakKeyDictionary()
+        self.stats = SyncStats()
+
+        # Compiled outputs shared by every client on the same theme combination
+        self.compiler = ThemeCompiler()
+
+        # Sessions whose page already received the theme in its initial HTML,
+        # with the state that was known at render time (scheme / prefs from the request)
+        self._painted: 'weakref.WeakKeyDictionary[ThemeManager, dict]' = weakref.WeakKeyDictionary()
+
         # Suppress sync during startup to prevent global UI definition violation
         self._startup_phase = True
+
+        # Static resources (Global Styles, client runtime) are shared by every page.
+        # The runtime also detects the color scheme and reports changes (see _render_theme).
+        # Fonts are per page: only the families of the client's typography (see fonts.load_fonts)
+        self._inject_static_styles()
+        _install_client_hints()
         
         # Client Setup via on_connect
         app.on_connect(self._on_client_connect)
 
-    def _on_client_connect(self, client):
+    def first_paint(self, client: Optional[Client] = None):
+        """
+        Renders the client's theme into the initial HTML. Call it while a page is being built
+        (`nt.page` does it for you). The mode comes from the Sec-CH-Prefers-Color-Scheme header
+        or the nt_scheme cookie, the preferences from the nt_prefs_* cookie written by sync.
+        """
+        client = client or context.client
+        self._startup_phase = False
+        session = self.manager.session(client)
+
+        known = {'scheme': False, 'prefs': False}
+        try:
+            request = client.request
+        except (AttributeError, RuntimeError):
+            request = None
+
+        if request is not None:
+            scheme = request.headers.get('sec-ch-prefers-color-scheme') or request.cookies.get('nt_scheme')
+            if scheme in ('light', 'dark'):
+                session.set_detected_mode(scheme)
+                known['scheme'] = True
+
+            prefs_cookie = request.cookies.get(f'nt_prefs_{session.theme_name}')
+            if prefs_cookie:
+                try:
+                    session.apply_preferences(json.loads(unquote(prefs_cookie)))
+                    known['prefs'] = True
+                except ValueError:
+                    pass
+        session.flush()
+
+        self._render_theme(session)
+        self._painted[session] = known
+
+    def _render_theme(self, session: ThemeManager):
+        """Adds the compiled variables (both modes), texture and mode class to the client's page."""
+        compiled = self.compiler.compile(session)
+        if not compiled:
+            return
+        is_dark = session.get_effective_mode() == 'dark'
+
+        ui.add_head_html(f'<style id="nt-theme-vars" data-mode="{session.mode}" data-version="{compiled.hash}">{compiled.stylesheet}</style>')
+        self._inject_texture_css(compiled)
+        load_fonts(typography_families(session.theme.typography), self.registry, session.client, preload=True)
+        if is_dark:
+            ui.query('body').classes(add='body--dark', remove='body--light')
+        else:
+            ui.query('body').classes(add='body--light', remove='body--dark')
+
+        self._listen(session)
+
+        self._pushed[session] = {
+            'hash': compiled.hash,
+            'scopes': compiled.scopes,
+            'mode': session.mode,
+            'texture': compiled.texture_css,
+        }
+
+    def _listen(self, session: ThemeManager):
+        """OS color scheme changes arrive as events for this client only (the browser already flipped)."""
+        ui.on('nt_color_scheme', lambda e: self._on_color_scheme(session, e.args))
+
+    def _on_color_scheme(self, session: ThemeManager, scheme: str):
+        """Applies a prefers-color-scheme change reported by the client runtime."""
+        if scheme in ('light', 'dark'):
+            session.set_detected_mode(scheme)
+
+    async def _on_client_connect(self, client):
         """Called for every new client connection."""
         # Startup phase over, allow syncs
         self._startup_phase = False
-        
-        # FOUC Prevention: Hide body until theme is ready
-        self._inject_fouc_prevention()
-        
-        # Inject static resources (Global Styles)
-        self._inject_static_styles()
-        self._inject_google_fonts()
-        self._inject_local_fonts()
 
-        # Inject browser color scheme detection
-        self._inject_color_scheme_detection()
-        
-        # Inject persistence logic (localStorage)
-        self._inject_persistence_logic()
-
-        # Initial Variable Injection (SSR friendly)
-        if self.manager.theme:
-            palette = self.manager.get_active_palette()
-            if palette:
-                css_vars = self._generate_css_vars_dict(self.manager, palette)
-                
-                # Unwrap dict to css string
-                css_lines = [f"{k}: {v};" for k, v in css_vars.items()]
-                vars_block = "\n  ".join(css_lines)
-                
-                # Check mode
-                mode = self.manager.get_effective_mode()
-                # For on_connect, we can use ui.add_head_html for this client specifically?
-                # Or just run JS?
-                # Actually, add_head_html works per client if called here.
-                if mode == 'dark':
-                    ui.add_head_html(f"<style>body.body--dark {{ {vars_block} }}</style>")
-                else:
-                    ui.add_head_html(f"<style>:root {{ {vars_block} }}</style>")
-                
-                # Inject texture CSS
-                self._inject_texture_css(self.manager.theme.texture)
-        
-        # Mark theme as ready - reveal body smoothly
-        self._mark_theme_ready()
-
-        # Sync current state to this client immediately (Quasar colors etc)
-        # self.sync calls ui.colors which updates layout props
-        # We might need to run self.sync(self.manager) but ensure it targets THIS client
-        # ui.colors uses the current client context, so it should be fine.
-        # Sync current state to this client immediately (Quasar colors etc)
-        # self.sync calls ui.colors which updates layout props
-        # We might need to run self.sync(self.manager) but ensure it targets THIS client
-        # ui.colors uses the current client context, so it should be fine.
-        self.sync(self.manager)
-        pass
+        # Client-scoped state: changes made by this client never leak to others
+        session = self.manager.session(client)
+        session.bind(self.sync)
+
+        known = self._painted.get(session)
+        if known is None:
+            # Page was built without first_paint: the whole theme goes out with the first sync
+            self._pushed.pop(session, None)
+            self._listen(session)
+            known = {'scheme': False, 'prefs': False}
+            self._painted[session] = known
+
+        # One round trip for whatever the request did not tell us
+        if not known['scheme'] or not known['prefs']:
+            await self._handshake(client, session, known)
+
+        # Push whatever changed (variables, mode, prefs persistence etc.) in one go
+        session.flush()
+        self.sync(session)
+
+    async def _handshake(self, client: Client, session: ThemeManager, known: dict):
+        """Reads the detected scheme, the persisted prefs and the page's theme version at once."""
+        try:
+            reply = await client.run_javascript(f'return nt.handshake({json.dumps(session.theme_name)});', timeout=1.0)
+        except Exception:
+            # If we can't read it, keep the defaults (light, no prefs)
+            reply = None
+        missing = {key for key, value in known.items() if not value}
+        known['scheme'] = known['prefs'] = True
+        if not isinstance(reply, dict):
+            return
+
+        if 'scheme' in missing and reply.get('scheme') in ('light', 'dark'):
+            session.set_detected_mode(reply['scheme'])
+        if 'prefs' in missing and reply.get('prefs'):
+            try:
+                # Use a specialized method in manager to apply all at once
+                session.apply_preferences(json.loads(reply['prefs']))
+            except ValueError:
+                pass
+
+        # The page may already hold these exact variables (e.g. reconnect after a restart)
+        compiled = self.compiler.compile(session)
+        if session not in self._pushed and compiled and reply.get('version') == compiled.hash:
+            self._pushed[session] = {'hash': compiled.hash, 'scopes': compiled.scopes, 'texture': compiled.texture_css}
 
     def sync(self, manager: ThemeManager):
-        """Called whenever the manager notifies of a change."""
+        """Called whenever the manager notifies of a change. Sends only what changed since the last push."""
         # Skip sync during startup (e.g. from initial select_theme call)
         if getattr(self, '_startup_phase', False):
             return
 
-        theme = manager.theme
-        if not theme:
+        # Flushes may run outside of any UI context, so target the session's client explicitly
+        client = manager.client
+        if client is None or client.id not in Client.instances:
             return
 
-        palette = manager.get_active_palette()
-        if not palette:
+        # Shared, cached output for this theme combination
+        compiled = self.compiler.compile(manager)
+        if not compiled:
             return
 
-        # 1. Update Quasar/NiceGUI global colors
-        ui.colors(
-            primary=palette.resolve_color(palette.primary),
-            secondary=palette.resolve_color(palette.secondary),
-            positive=palette.resolve_color(palette.positive),
-            negative=palette.resolve_color(palette.negative),
-            warning=palette.resolve_color(palette.warning),
-            info=palette.resolve_color(palette.info),
-            accent=palette.resolve_color(palette.content[0]) if palette.content else palette.resolve_color(palette.primary),
-            dark=palette.resolve_color('base03'),
-        )
-
-        # 2. Generate CSS Variables Dictionary
-        css_vars = self._generate_css_vars_dict(manager, palette)
-        
-        # 3. Update CSS Variables & Body Class via JS (Dynamic & Fast)
-        import json
-        mode = manager.get_effective_mode()
-        is_dark = mode == 'dark'
-        
-        js_cmd = f"""
-        const vars = {json.dumps(css_vars)};
-        Object.entries(vars).forEach(([k,v]) => document.documentElement.style.setProperty(k, v));
-        
-        // Toggle Body Classes
-        if ({str(is_dark).lower()}) {{
-            document.body.classList.add('body--dark');
-            document.body.classList.remove('body--light');
-            document.querySelector('#app').classList.add('q-dark'); // Standard Quasar
-        }} else {{
-            document.body.classList.remove('body--dark');
-            document.body.classList.add('body--light');
-            document.querySelector('#app').classList.remove('q-dark');
-        }}
+        with client:
+            self._sync_client(manager, compiled)
 
-        // Persistence: Save current state to localStorage
-        const prefs = {{
-            mode: {json.dumps(manager.mode)},
-            palette: {json.dumps(manager.active_palette_name)},
-            texture: {json.dumps(theme.texture_name)},
-            layout: {json.dumps(theme.layout_name)},
-            typography: {{
-                primary: {json.dumps(theme.typography.primary)},
-                secondary: {json.dumps(theme.typography.secondary)},
-                mono: {json.dumps(theme.typography.mono)},
-                scale: {theme.typography.scale},
-                title_case: {json.dumps(theme.typography.title_case)}
-            }}
-        }};
-        
-        // Add palette overrides
-        const p_primary = {json.dumps(palette.primary)};
-        const p_secondary = {json.dumps(palette.secondary)};
-        prefs.palette_overrides = {{ primary: p_primary, secondary: p_secondary }};
+    def _sync_client(self, manager: ThemeManager, compiled: CompiledTheme):
+        previous = self._pushed.get(manager, {})
+        state = {
+            'hash': compiled.hash,
+            'scopes': compiled.scopes,
+            'mode': manager.mode,
+            'prefs': self._generate_prefs_dict(manager, manager.get_active_palette()),
+            'texture': compiled.texture_css,
+        }
 
-        localStorage.setItem('nt_prefs_' + {json.dumps(manager.theme_name)}, JSON.stringify(prefs));
-        """
+        # 1. Diff CSS Variables (per scope) against what this client already has.
+        # Both modes are on the page, so a mode switch alone changes nothing here
+        changed, removed = {}, {}
+        if compiled.hash != previous.get('hash'):
+            old_scopes = previous.get('scopes', {})
+            for selector, css_vars in compiled.scopes.items():
+                old_vars = old_scopes.get(selector, {})
+                if css_vars is old_vars:
+                    continue  # Scope reused by an incremental build (see CompiledTheme.build)
+                diff = {k: v for k, v in css_vars.items() if old_vars.get(k) != v}
+                gone = [k for k in old_vars if k not in css_vars]
+                if diff:
+                    changed[selector] = diff
+                if gone:
+                    removed[selector] = gone
+
+        # 2. Load newly used font families (each family once per client)
+        load_fonts(typography_families(manager.theme.typography), self.registry, manager.client)
+
+        # 3. Update CSS Variables, Mode, Persistence and Texture via JS (only the changed parts)
+        full_parts = [
+            self._vars_js(compiled.vars_json, '{}', compiled.hash),
+            self._mode_js(manager.mode),
+            self._prefs_js(manager.theme_name, state['prefs']),
+            self._texture_js(compiled.texture_css),
+        ]
+        vars_json = compiled.vars_json if changed == compiled.scopes else json.dumps(changed)
+        parts = [
+            self._vars_js(vars_json, json.dumps(removed), compiled.hash) if changed or removed else '',
+            full_parts[1] if state['mode'] != previous.get('mode') else '',
+            full_parts[2] if state['prefs'] != previous.get('prefs') else '',
+            full_parts[3] if state['texture'] != previous.get('texture') else '',
+        ]
+        js_cmd = ''.join(parts)
+        self.stats.record(full=len(''.join(full_parts)), sent=len(js_cmd))
+        self._pushed[manager] = state
+
+        if not js_cmd:
+            return
         try:
             ui.run_javascript(js_cmd)
         except (AssertionError, RuntimeError):
             # No active client/loop (e.g. during startup), skip JS update
-            pass
-        
-        # Update texture CSS dynamically
-        if manager.theme and manager.theme.texture:
-            self._update_texture_css_dynamic(manager.theme.texture)
+            self._pushed.pop(manager, None)
 
-    def _generate_css_vars_dict(self, manager: ThemeManager, palette: Palette) -> dict:
-        """Generates a flat dictionary of CSS variables."""
-        css_vars = {}
-        
-        # Helper for resolving colors
-        def rc(val): return palette.resolve_color(val)
-        
-        # Helper to hex to rgb
-        def hex_to_rgb(hex_code):
-            hex_code = hex_code.lstrip('#')
-            if len(hex_code) == 3: hex_code = ''.join([c*2 for c in hex_code])
-            return tuple(int(hex_code[i:i+2], 16) for i in (0, 2, 4))
-            
-        def to_rgb_str(val):
-            try:
-                c = rc(val)
-                if c.startswith('#'):
-                    h = hex_to_rgb(c)
-                    return f"{h[0]}, {h[1]}, {h[2]}"
-                return "0, 0, 0" # Fallback
-            except:
-                return "0, 0, 0"
-
-        # 1. Palette Colors
-        css_vars["--nt-primary"] = rc(palette.primary)
-        css_vars["--nt-secondary"] = rc(palette.secondary)
-        css_vars["--nt-positive"] = rc(palette.positive)
-        css_vars["--nt-negative"] = rc(palette.negative)
-        css_vars["--nt-warning"] = rc(palette.warning)
-        css_vars["--nt-info"] = rc(palette.info)
-        css_vars["--nt-inactive"] = rc(palette.inative)
-
-        # Custom & Named Colors
-        for name, color in palette.colors.items():
-            css_vars[f"--nt-color-{name}"] = rc(color)
-        
-        # Ensure base colors exist
-        if 'white' not in palette.colors:
-            css_vars["--nt-color-white"] = "#ffffff"
-        if 'black' not in palette.colors:
-            css_vars["--nt-color-black"] = "#000000"
-
-        # Greys
-        for name, color in palette.greys.items():
-            css_vars[f"--nt-color-{name}"] = rc(color)
-
-        # 2. Surface (with Padding)
-        if palette.surface:
-            css_vars["--nt-surface-rgb"] = to_rgb_str(palette.surface[0])
-            css_vars["--nt-surface-page"] = rc(palette.surface[0])
-            
-            # Pad up to 6 levels (0-5)
-            last_surface = palette.surface[-1]
-            for i in range(6):
-                if i < len(palette.surface):
-                    val = palette.surface[i]
-                else:
-                    val = last_surface
-                css_vars[f"--nt-surface-{i}"] = rc(val)
-        
-        # 3. Content
-        if palette.content:
-            css_vars["--nt-content-rgb"] = to_rgb_str(palette.content[0])
-            css_vars["--nt-content-accent"] = rc(palette.content[0])
-            
-            for i, cont in enumerate(palette.content):
-                css_vars[f"--nt-content-{i}"] = rc(cont)
-
-        # 4. Texture Colors
-        css_vars["--nt-shadow-color"] = rc(palette.shadow)
-        css_vars["--nt-shadow-rgb"] = to_rgb_str(palette.shadow)
-        css_vars["--nt-highlight-color"] = rc(palette.highlight)
-        css_vars["--nt-highlight-rgb"] = to_rgb_str(palette.highlight)
-        css_vars["--nt-border-color"] = rc(palette.border)
-        css_vars["--nt-border-rgb"] = to_rgb_str(palette.border)
-
-        # 5. Theme Settings (Layout, Texture, Typography)
-        if manager.theme:
-            if manager.theme.layout:
-                layout = manager.theme.layout
-                css_vars["--nt-roundness"] = str(layout.roundness)
-                css_vars["--nt-border-width"] = str(layout.border)
-                css_vars["--nt-density"] = str(layout.density)
-            
-            if manager.theme.texture:
-                texture = manager.theme.texture
-                css_vars["--nt-shadow-intensity"] = str(texture.shadow_intensity)
-                css_vars["--nt-highlight-intensity"] = str(texture.highlight_intensity)
-                css_vars["--nt-opacity"] = str(texture.opacity)
-                css_vars["--nt-blur"] = str(texture.blur)
-
-            if manager.theme.typography:
-                typo = manager.theme.typography
-                css_vars["--nt-font-primary"] = f"'{typo.primary}'"
-                css_vars["--nt-font-secondary"] = f"'{typo.secondary}'"
-                css_vars["--nt-font-mono"] = f"'{typo.mono}'"
-                css_vars["--nt-font-scale"] = str(typo.scale)
-                
-                transform_map = {
-                     "lowercase": "lowercase",
-                     "uppercase": "uppercase",
-                     "titlecase": "capitalize",
-                     "title_case": "capitalize",
-                     "none": "none"
-                }
-                css_vars["--nt-text-transform-title"] = transform_map.get(typo.title_case, "none")
-        
-        return css_vars
+    def _generate_prefs_dict(self, manager: ThemeManager, palette: Palette) -> dict:
+        """The state persisted to localStorage (read back by apply_preferences)."""
+        theme = manager.theme
+        return {
+            'mode': manager.mode,
+            'palette': manager.active_palette_name,
+            'texture': theme.texture_name,
+            'layout': theme.layout_name,
+            'typography': {
+                'primary': theme.typography.primary,
+                'secondary': theme.typography.secondary,
+                'mono': theme.typography.mono,
+                'scale': theme.typography.scale,
+                'title_case': theme.typography.title_case,
+            },
+            'palette_overrides': {'primary': palette.primary, 'secondary': palette.secondary},
+        }
 
-    def _inject_static_styles(self):
-        """Injects static CSS files."""
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        assets_dir = os.path.join(os.path.dirname(current_dir), 'assets')
-        
-        for css_file in ['icons.css', 'sliders.css', 'components.css', 'global_overrides.css']:
-            path = os.path.join(assets_dir, css_file)
-            if os.path.exists(path):
-                with open(path, 'r') as f:
-                    ui.add_head_html(f"<style>{f.read()}</style>")
-
-    def _inject_google_fonts(self):
-        # A curated list of Google Fonts
-        google_fonts = [
-            "Roboto", "Open Sans", "Noto Sans JP", "Inter", "Lato", "Montserrat", 
-            "Oswald", "Source Sans Pro", "Slabo 27px", "Raleway", "PT Sans", 
-            "Merriweather", "Nunito Sans", "Prompt", "Work Sans", "Rubik",
-            "Playfair Display", "Fira Sans", "Mukta", "Quicksand", "Karla",
-            "Titillium Web", "Inconsolata", "Barlow", "Dosis", "Cabin",
-            "Bitter", "Anton", "Oxygen", "Arvo", "Libre Baskerville", "Lobster",
-            "Pacifico", "Shadows Into Light", "Dancing Script", "Bebas Neue",
-            "Poppins", "Recursive", "Sniglet"
-        ]
-        google_fonts.sort()
-        families = "&family=".join([f.replace(' ', '+') for f in google_fonts])
-        ui.add_head_html(f'<link href="https://fonts.googleapis.com/css2?family={families}&display=swap" rel="stylesheet">')
+    def _vars_js(self, changes_json: str, removed_json: str, version: str) -> str:
+        return f"nt.setVars({changes_json}, {removed_json}, {json.dumps(version)});"
 
-    def _inject_local_fonts(self):
-        """Generates @font-face rules for local fonts registered in the Registry."""
-        if not self.registry or not self.registry.fonts:
-            return
+    def _mode_js(self, mode: str) -> str:
+        # Class flip in the browser (auto follows prefers-color-scheme there)
+        return f"nt.setMode({json.dumps(mode)});"
 
-        css_rules = []
-        for name, url in self.registry.fonts.items():
-            rule = f"""
-            @font-face {{
-                font-family: '{name}';
-                src: url('{url}');
-            }}
-            """
-            css_rules.append(rule)
-        
-        if css_rules:
-            ui.add_head_html(f"<style>{''.join(css_rules)}</style>")
-    
-    def _inject_color_scheme_detection(self):
-        """Injects JavaScript to detect browser color scheme preference using prefers-color-scheme media query."""
-        detection_script = """
-        <script>
-        (function() {
-            // Detect color scheme preference using media query
-            const mediaQuery = window.matchMedia('(prefers-color-scheme: dark)');
-            
-            function detectAndStoreColorScheme() {
-                const isDark = mediaQuery.matches;
-                const mode = isDark ? 'dark' : 'light';
-                
-                // Store in localStorage for persistence
-                localStorage.setItem('nt_detected_color_scheme', mode);
-                
-                // Also store as a custom property on the document for easy access
-                document.documentElement.setAttribute('data-detected-color-scheme', mode);
-            }
-            
-            // Detect initial preference immediately
-            detectAndStoreColorScheme();
-            
-            // Listen for changes (e.g., user changes system preference)
-            if (mediaQuery.addEventListener) {
-                mediaQuery.addEventListener('change', function() {
-                    detectAndStoreColorScheme();
-                    // Trigger a page refresh to apply the new theme
-                    window.location.reload();
-                });
-            } else {
-                // Fallback for older browsers
-                mediaQuery.addListener(function() {
-                    detectAndStoreColorScheme();
-                    window.location.reload();
-                });
-            }
-        })();
-        </script>
-        """
-        ui.add_head_html(detection_script)
-        
-        # After detection script is loaded, read the detected value and set it
-        # This will run on the server side during initialization
-        read_detection_script = """
-        const detectedMode = localStorage.getItem('nt_detected_color_scheme') || 
-                           (window.matchMedia('(prefers-color-scheme: dark)').matches ? 'dark' : 'light');
-        return detectedMode;
+    def _prefs_js(self, theme_name: str, prefs: dict) -> str:
+        return f"""
+        // Persistence: Save current state to localStorage
+        const prefsJson = JSON.stringify({json.dumps(prefs)});
+        localStorage.setItem('nt_prefs_' + {json.dumps(theme_name)}, prefsJson);
+        // Mirrored in a cookie so the next page load renders these prefs server-side
+        document.cookie = 'nt_prefs_' + {json.dumps(theme_name)} + '=' + encodeURIComponent(prefsJson) + '; path=/; max-age=31536000; samesite=lax';
         """
-        
-        # Try to read the detected mode and set it in the manager
-        # This needs to be done after the client connects
-        def set_initial_detected_mode():
-            try:
-                detected = ui.run_javascript(read_detection_script, timeout=1.0)
-                if detected and detected in ['light', 'dark']:
-                    self.manager.set_detected_mode(detected)
-            except:
-                # If we can't read it (e.g., during SSR), default to light
-                self.manager.set_detected_mode('light')
-        
-        # Schedule this to run when a client connects
-        ui.timer(0.1, set_initial_detected_mode, once=True)
 
-    def _inject_persistence_logic(self):
-        """Injects logic to read from localStorage on startup and apply to manager."""
-        import json
-        
-        read_prefs_script = f"""
-        return localStorage.getItem('nt_prefs_' + {json.dumps(self.manager.theme_name)});
+    def _texture_js(self, css: str) -> str:
+        if not css:
+            return ''
+        return f"""
+        let styleEl = document.getElementById('nt-texture-css');
+        if (!styleEl) {{
+            styleEl = document.createElement('style');
+            styleEl.id = 'nt-texture-css';
+            document.head.appendChild(styleEl);
+        }}
+        styleEl.textContent = {json.dumps(css)};
         """
-        
-        async def load_persisted_prefs():
-            try:
-                prefs_json = await ui.run_javascript(read_prefs_script, timeout=1.0)
-                if prefs_json:
-                    prefs = json.loads(prefs_json)
-                    # Use a specialized method in manager to apply all at once
-                    self.manager.apply_preferences(prefs)
-            except Exception:
-                pass
-        
-        # Schedule to run once on client connection
-        ui.timer(0.2, load_persisted_prefs, once=True)
-
-    def _inject_texture_css(self, texture: Texture):
-        """Generates and injects component-specific texture CSS on initial load."""
-        css = self._generate_texture_css(texture)
-        if css:
-            ui.add_head_html(f'<style id="nt-texture-css">{css}</style>')
-    
-    def _update_texture_css_dynamic(self, texture: Texture):
-        """Dynamically updates texture CSS via JavaScript."""
-        css = self._generate_texture_css(texture)
-        if css:
-            # Escape for JavaScript string
-            import json
-            css_escaped = json.dumps(css)
-            js_cmd = f"""
-            let styleEl = document.getElementById('nt-texture-css');
-            if (!styleEl) {{
-                styleEl = document.createElement('style');
-                styleEl.id = 'nt-texture-css';
-                document.head.appendChild(styleEl);
-            }}
-            styleEl.textContent = {css_escaped};
-            """
-            try:
-                ui.run_javascript(js_cmd)
-            except (AssertionError, RuntimeError):
-                pass
-    
-    def _generate_texture_css(self, texture: Texture) -> str:
-        """Generates CSS rules from component-specific texture properties."""
-        rules: List[str] = []
-        
-        # Component type to CSS selectors mapping
-        selectors = {
-            'button': '.q-btn:not(.q-btn--flat):not(.q-btn--outline)',
-            'card': '.q-card, .nicegui-card',
-            'progress': '.q-linear-progress, .q-circular-progress',
-            'slider': '.q-slider, .palette-slider',
-            'toggle': '.q-toggle, .q-checkbox, .q-radio, .q-btn-group',
-            'chip': '.q-chip, .q-badge',
-            'menu': '.q-menu, .q-tooltip, .q-notification'
-        }
-        
-        # Generate rules for each component type
-        for component, selector in selectors.items():
-            css_props = getattr(texture, component, "")
-            if css_props and css_props.strip():
-                # Handle multiline YAML properties
-                props_cleaned = css_props.strip().replace('\n', ' ')
-                rules.append(f"{selector} {{ {props_cleaned} }}")
-        
-        return '\n'.join(rules)
 
-    def _inject_fouc_prevention(self):
-        """Injects CSS to prevent Flash of Unstyled Content (FOUC)."""
-        fouc_css = """
-        @keyframes force-reveal {
-            to { opacity: 1; }
-        }
-        body {
-            opacity: 0;
-            transition: opacity 0.2s ease-in-out;
-            /* Failsafe: Force reveal after 0.5s if JS fails */
-            animation: force-reveal 0.1s forwards 0.5s;
-        }
-        body.theme-ready {
-            opacity: 1;
-            animation: none;
-        }
-        """
-        ui.add_head_html(f"<style>{fouc_css}</style>")
-    
-    def _mark_theme_ready(self):
-        """Marks the theme as ready by adding the theme-ready class to body."""
-        # Use direct JS execution for reliable update
-        ui.run_javascript("document.body.classList.add('theme-ready');")
+    def _inject_static_styles(self):
+        """Links the hashed, precompressed stylesheet and runtime bundles from every page head."""
+        stylesheet_bundle().install()
+        script_bundle().install()
+
+    def _inject_texture_css(self, compiled: CompiledTheme):
+        """Injects component-specific texture CSS on initial load."""
+        if compiled.texture_css:
+            ui.add_head_html(f'<style id="nt-texture-css">{compiled.texture_css}</style>')
+
+
+_client_hints_installed = False
+
+
+def _install_client_hints():
+    """Asks browsers to send Sec-CH-Prefers-Color-Scheme so the first render has the right mode."""
+    global _client_hints_installed
+    if _client_hints_installed:
+        return
+    _client_hints_installed = True
 
+    @app.middleware('http')
+    async def request_color_scheme_hint(request, call_next):
+        response = await call_next(request)
+        if response.headers.get('content-type', '').startswith('text/html'):
+            response.headers['Accept-CH'] = 'Sec-CH-Prefers-Color-Scheme'
+            response.headers['Critical-CH'] = 'Sec-CH-Prefers-Color-Scheme'
+            response.headers.append('Vary', 'Sec-CH-Prefers-Color-Scheme')
+        return response
@@ -0,0 +1,533 @@
+"""
+Color engine: parses CSS color values into NumPy arrays and converts them between color spaces
+in batches (a whole palette, or a whole catalog, per call).
+
+Arrays hold one color per row, channels on the last axis:
+    srgb          r, g, b in 0..1 (gamma encoded)
+    srgb-linear   r, g, b in 0..1 (linear light)
+    hsl           hue in degrees, saturation and lightness in 0..1
+    oklab         L in 0..1, a, b
+    oklch         L in 0..1, chroma, hue in degrees
+Values that are not colors (`var(...)`, `currentcolor`, typos) parse to rows of NaN.
+"""
+import functools
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SPACES = ('srgb', 'srgb-linear', 'hsl', 'oklab', 'oklch')
+
+# CSS Color 4 named colors
+NAMED_COLORS: Dict[str, str] = dict(item.split(':') for item in """
+aliceblue:f0f8ff antiquewhite:faebd7 aqua:00ffff aquamarine:7fffd4 azure:f0ffff beige:f5f5dc bisque:ffe4c4
+black:000000 blanchedalmond:ffebcd blue:0000ff blueviolet:8a2be2 brown:a52a2a burlywood:deb887
+cadetblue:5f9ea0 chartreuse:7fff00 chocolate:d2691e coral:ff7f50 cornflowerblue:6495ed cornsilk:fff8dc
+crimson:dc143c cyan:00ffff darkblue:00008b darkcyan:008b8b darkgoldenrod:b8860b darkgray:a9a9a9
+darkgreen:006400 darkgrey:a9a9a9 darkkhaki:bdb76b darkmagenta:8b008b darkolivegreen:556b2f
+darkorange:ff8c00 darkorchid:9932cc darkred:8b0000 darksalmon:e9967a darkseagreen:8fbc8f
+darkslateblue:483d8b darkslategray:2f4f4f darkslategrey:2f4f4f darkturquoise:00ced1 darkviolet:9400d3
+deeppink:ff1493 deepskyblue:00bfff dimgray:696969 dimgrey:696969 dodgerblue:1e90ff firebrick:b22222
+floralwhite:fffaf0 forestgreen:228b22 fuchsia:ff00ff gainsboro:dcdcdc ghostwhite:f8f8ff gold:ffd700
+goldenrod:daa520 gray:808080 green:008000 greenyellow:adff2f grey:808080 honeydew:f0fff0 hotpink:ff69b4
+indianred:cd5c5c indigo:4b0082 ivory:fffff0 khaki:f0e68c lavender:e6e6fa lavenderblush:fff0f5
+lawngreen:7cfc00 lemonchiffon:fffacd lightblue:add8e6 lightcoral:f08080 lightcyan:e0ffff
+lightgoldenrodyellow:fafad2 lightgray:d3d3d3 lightgreen:90ee90 lightgrey:d3d3d3 lightpink:ffb6c1
+lightsalmon:ffa07a lightseagreen:20b2aa lightskyblue:87cefa lightslategray:778899 lightslategrey:778899
+lightsteelblue:b0c4de lightyellow:ffffe0 lime:00ff00 limegreen:32cd32 linen:faf0e6 magenta:ff00ff
+maroon:800000 mediumaquamarine:66cdaa mediumblue:0000cd mediumorchid:ba55d3 mediumpurple:9370db
+mediumseagreen:3cb371 mediumslateblue:7b68ee mediumspringgreen:00fa9a mediumturquoise:48d1cc
+mediumvioletred:c71585 midnightblue:191970 mintcream:f5fffa mistyrose:ffe4e1 moccasin:ffe4b5
+navajowhite:ffdead navy:000080 oldlace:fdf5e6 olive:808000 olivedrab:6b8e23 orange:ffa500
+orangered:ff4500 orchid:da70d6 palegoldenrod:eee8aa palegreen:98fb98 paleturquoise:afeeee
+palevioletred:db7093 papayawhip:ffefd5 peachpuff:ffdab9 peru:cd853f pink:ffc0cb plum:dda0dd
+powderblue:b0e0e6 purple:800080 rebeccapurple:663399 red:ff0000 rosybrown:bc8f8f royalblue:4169e1
+saddlebrown:8b4513 salmon:fa8072 sandybrown:f4a460 seagreen:2e8b57 seashell:fff5ee sienna:a0522d
+silver:c0c0c0 skyblue:87ceeb slateblue:6a5acd slategray:708090 slategrey:708090 snow:fffafa
+springgreen:00ff7f steelblue:4682b4 tan:d2b48c teal:008080 thistle:d8bfd8 tomato:ff6347
+turquoise:40e0d0 violet:ee82ee wheat:f5deb3 white:ffffff whitesmoke:f5f5f5 yellow:ffff00
+yellowgreen:9acd32
+""".split())
+
+# Conversion matrices (CSS Color 4 / Björn Ottosson's OKLab)
+_LINEAR_TO_XYZ = np.array([
+    [0.41239079926595934, 0.357584339383878, 0.1804807884018343],
+    [0.21263900587151027, 0.715168678767756, 0.07219231536073371],
+    [0.01933081871559182, 0.11919477979462598, 0.9505321522496607],
+])
+_XYZ_TO_LINEAR = np.linalg.inv(_LINEAR_TO_XYZ)
+_D50_TO_D65 = np.array([
+    [0.955473421488075, -0.02309845494876471, 0.06325924320057072],
+    [-0.0283697093338637, 1.0099953980813041, 0.021041441191917323],
+    [0.012314014864481998, -0.020507649298898964, 1.330365926242124],
+])
+_P3_TO_XYZ = np.array([
+    [0.4865709486482162, 0.26566769316909306, 0.1982172852343625],
+    [0.2289745640697488, 0.6917385218365064, 0.079286914093745],
+    [0.0, 0.04511338185890264, 1.043944368900976],
+])
+_D50_WHITE = np.array([0.3457 / 0.3585, 1.0, (1.0 - 0.3457 - 0.3585) / 0.3585])
+_LINEAR_TO_LMS = np.array([
+    [0.4122214708, 0.5363325363, 0.0514459929],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+])
+_LMS_TO_OKLAB = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+])
+_LMS_TO_LINEAR = np.linalg.inv(_LINEAR_TO_LMS)
+_OKLAB_TO_LMS = np.linalg.inv(_LMS_TO_OKLAB)
+
+
+def _apply(matrix: np.ndarray, values: np.ndarray) -> np.ndarray:
+    return values @ matrix.T
+
+
+# Transfer functions and conversions (all take and return arrays of shape (..., 3))
+
+def srgb_to_linear(rgb: np.ndarray) -> np.ndarray:
+    rgb = np.asarray(rgb, dtype=float)
+    magnitude = np.abs(rgb)
+    return np.where(magnitude <= 0.04045, rgb / 12.92, np.sign(rgb) * ((magnitude + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(rgb: np.ndarray) -> np.ndarray:
+    rgb = np.asarray(rgb, dtype=float)
+    magnitude = np.abs(rgb)
+    return np.where(magnitude <= 0.0031308, rgb * 12.92, np.sign(rgb) * (1.055 * magnitude ** (1 / 2.4) - 0.055))
+
+
+def srgb_to_hsl(rgb: np.ndarray) -> np.ndarray:
+    rgb = np.asarray(rgb, dtype=float)
+    r, g, b = np.moveaxis(rgb, -1, 0)
+    high, low = rgb.max(axis=-1), rgb.min(axis=-1)
+    delta = high - low
+    lightness = (high + low) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturation = np.where(delta == 0, 0.0, delta / (1 - np.abs(2 * lightness - 1)))
+        hue = np.select(
+            [delta == 0, high == r, high == g],
+            [0.0, ((g - b) / delta) % 6, (b - r) / delta + 2],
+            (r - g) / delta + 4,
+        ) * 60
+    return np.stack([hue, saturation, lightness], axis=-1)
+
+
+def hsl_to_srgb(hsl: np.ndarray) -> np.ndarray:
+    hsl = np.asarray(hsl, dtype=float)
+    hue, saturation, lightness = (hsl[..., i:i + 1] for i in range(3))
+    k = (np.array([0, 8, 4]) + hue / 30) % 12
+    a = saturation * np.minimum(lightness, 1 - lightness)
+    return lightness - a * np.clip(np.minimum(k - 3, 9 - k), -1, 1)
+
+
+def hwb_to_srgb(hwb: np.ndarray) -> np.ndarray:
+    hwb = np.asarray(hwb, dtype=float)
+    hue, white, black = (hwb[..., i:i + 1] for i in range(3))
+    total = white + black
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grey = np.where(total >= 1, white / total, 0.0)
+    hues = hsl_to_srgb(np.concatenate([hue, np.ones_like(hue), np.full_like(hue, 0.5)], axis=-1))
+    return np.where(total >= 1, grey, hues * (1 - white - black) + white)
+
+
+def linear_to_oklab(rgb: np.ndarray) -> np.ndarray:
+    return _apply(_LMS_TO_OKLAB, np.cbrt(_apply(_LINEAR_TO_LMS, np.asarray(rgb, dtype=float))))
+
+
+def oklab_to_linear(lab: np.ndarray) -> np.ndarray:
+    return _apply(_LMS_TO_LINEAR, _apply(_OKLAB_TO_LMS, np.asarray(lab, dtype=float)) ** 3)
+
+
+def lab_to_lch(lab: np.ndarray) -> np.ndarray:
+    """Cartesian to polar (OKLab to OKLCH, CIE Lab to LCH)."""
+    lab = np.asarray(lab, dtype=float)
+    chroma = np.hypot(lab[..., 1], lab[..., 2])
+    hue = np.degrees(np.arctan2(lab[..., 2], lab[..., 1])) % 360
+    return np.stack([lab[..., 0], chroma, hue], axis=-1)
+
+
+def lch_to_lab(lch: np.ndarray) -> np.ndarray:
+    """Polar to cartesian (OKLCH to OKLab, LCH to CIE Lab)."""
+    lch = np.asarray(lch, dtype=float)
+    hue = np.radians(lch[..., 2])
+    return np.stack([lch[..., 0], lch[..., 1] * np.cos(hue), lch[..., 1] * np.sin(hue)], axis=-1)
+
+
+def cielab_to_linear(lab: np.ndarray) -> np.ndarray:
+    """CIE Lab (D50, as in CSS `lab()`) to linear sRGB."""
+    lab = np.asarray(lab, dtype=float)
+    kappa, epsilon = 24389 / 27, 216 / 24389
+    lightness = lab[..., 0]
+    f1 = (lightness + 16) / 116
+    f0 = lab[..., 1] / 500 + f1
+    f2 = f1 - lab[..., 2] / 200
+    x = np.where(f0 ** 3 > epsilon, f0 ** 3, (116 * f0 - 16) / kappa)
+    y = np.where(lightness > kappa * epsilon, f1 ** 3, lightness / kappa)
+    z = np.where(f2 ** 3 > epsilon, f2 ** 3, (116 * f2 - 16) / kappa)
+    xyz = np.stack([x, y, z], axis=-1) * _D50_WHITE
+    return _apply(_XYZ_TO_LINEAR @ _D50_TO_D65, xyz)
+
+
+def in_gamut(rgb: np.ndarray, tolerance: float = 1e-6) -> np.ndarray:
+    """Whether each sRGB row lies inside the 0..1 cube."""
+    rgb = np.asarray(rgb, dtype=float)
+    return np.all((rgb >= -tolerance) & (rgb <= 1 + tolerance), axis=-1)
+
+
+def oklch_to_srgb(lch: np.ndarray, fit: bool = True) -> np.ndarray:
+    """
+    OKLCH to sRGB. With `fit`, out-of-gamut colors keep their lightness and hue and lose chroma
+    until they fit (a vectorized bisection, as CSS Color 4 gamut mapping does); otherwise they
+    are returned unclipped.
+    """
+    lch = np.asarray(lch, dtype=float)
+    rgb = linear_to_srgb(oklab_to_linear(lch_to_lab(lch)))
+    if not fit:
+        return rgb
+    outside = ~in_gamut(rgb) & ~np.isnan(rgb).any(axis=-1)
+    if outside.any():
+        points = lch[outside]
+        hue = np.radians(points[:, 2])
+        cos, sin = np.cos(hue), np.sin(hue)
+        trial = np.empty_like(points)
+        trial[:, 0] = points[:, 0]
+        low, high = np.zeros(len(points)), points[:, 1].copy()
+        for _ in range(14):  # Chroma within 1/16384 of the boundary, far below 8-bit precision
+            middle = (low + high) / 2
+            trial[:, 1], trial[:, 2] = middle * cos, middle * sin
+            fits = in_gamut(oklab_to_linear(trial))  # The transfer function maps 0..1 onto itself
+            low, high = np.where(fits, middle, low), np.where(fits, high, middle)
+        trial[:, 1], trial[:, 2] = low * cos, low * sin
+        rgb[outside] = linear_to_srgb(oklab_to_linear(trial))
+    return np.clip(rgb, 0, 1)
+
+
+def srgb_to_oklch(rgb: np.ndarray) -> np.ndarray:
+    return lab_to_lch(linear_to_oklab(srgb_to_linear(rgb)))
+
+
+# WCAG 2 contrast
+
+def relative_luminance(rgb: np.ndarray) -> np.ndarray:
+    """WCAG relative luminance of sRGB rows (Y of linear sRGB), NaN for NaN rows."""
+    return srgb_to_linear(rgb) @ _LINEAR_TO_XYZ[1]
+
+
+def contrast_ratio(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """WCAG contrast ratios (1 to 21) between luminances; broadcasts (a[:, None] against b for a matrix)."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    return (np.maximum(a, b) + 0.05) / (np.minimum(a, b) + 0.05)
+
+
+# Ramps (OKLCH in and out; oklch_to_srgb fits them into sRGB)
+
+def tonal_ramps(lch: np.ndarray, lightness: Sequence[float]) -> np.ndarray:
+    """
+    (N, 3) OKLCH colors to (N, steps, 3) ramps over the given lightness levels, keeping chroma and
+    hue (gamut fitting tapers the chroma at the ends). Each color replaces its nearest step, so the
+    ramp contains it unchanged.
+    """
+    lch = np.asarray(lch, dtype=float).reshape(-1, 3)
+    lightness = np.asarray(lightness, dtype=float)
+    ramps = np.repeat(lch[:, None, :], len(lightness), axis=1)
+    ramps[..., 0] = lightness
+    nearest = np.abs(lightness[None, :] - lch[:, :1]).argmin(axis=1)
+    ramps[np.arange(len(lch)), nearest] = lch
+    return ramps
+
+
+def extend_ramps(lch: np.ndarray, steps: np.ndarray, count: int) -> np.ndarray:
+    """(N, 3) OKLCH colors to (N, count, 3) continuations, each `steps[i]` further in lightness than the last."""
+    lch = np.asarray(lch, dtype=float).reshape(-1, 3)
+    offsets = np.asarray(steps, dtype=float)[:, None] * np.arange(1, count + 1)
+    ramps = np.repeat(lch[:, None, :], count, axis=1)
+    ramps[..., 0] = np.clip(lch[:, None, 0] + offsets, 0, 1)
+    return ramps
+
+
+_FROM_SRGB: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'srgb': lambda rgb: rgb,
+    'srgb-linear': srgb_to_linear,
+    'hsl': srgb_to_hsl,
+    'oklab': lambda rgb: linear_to_oklab(srgb_to_linear(rgb)),
+    'oklch': srgb_to_oklch,
+}
+
+_TO_SRGB: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'srgb': lambda rgb: rgb,
+    'srgb-linear': linear_to_srgb,
+    'hsl': hsl_to_srgb,
+    'hwb': hwb_to_srgb,
+    'lab': lambda lab: linear_to_srgb(cielab_to_linear(lab)),
+    'lch': lambda lch: linear_to_srgb(cielab_to_linear(lch_to_lab(lch))),
+    'oklab': lambda lab: linear_to_srgb(oklab_to_linear(lab)),
+    'oklch': lambda lch: oklch_to_srgb(lch, fit=False),
+    'display-p3': lambda rgb: linear_to_srgb(_apply(_XYZ_TO_LINEAR @ _P3_TO_XYZ, srgb_to_linear(rgb))),
+    'xyz-d65': lambda xyz: linear_to_srgb(_apply(_XYZ_TO_LINEAR, xyz)),
+    'xyz-d50': lambda xyz: linear_to_srgb(_apply(_XYZ_TO_LINEAR @ _D50_TO_D65, xyz)),
+}
+_TO_SRGB['xyz'] = _TO_SRGB['xyz-d65']
+
+
+# Parsing
+
+_FUNCTION = re.compile(r'^([a-z-]+)\((.*)\)$', re.S)
+_NUMBER = r'([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(%|deg|grad|rad|turn)?'
+_TOKEN = re.compile(rf'^{_NUMBER}$')
+# The common case, parsed in bulk by parse(): a function with three numeric channels and an optional alpha
+_SIMPLE = re.compile(
+    rf'(rgba?|hsla?|hwb|lab|lch|oklab|oklch)\(\s*{_NUMBER}\s*,?\s*{_NUMBER}\s*,?\s*{_NUMBER}\s*(?:[,/]\s*{_NUMBER})?\s*\)'
+)
+_UNITS = np.array(sorted(('', '%', 'deg', 'grad', 'rad', 'turn')))
+_TURNS = {None: 1.0, 'deg': 1.0, 'grad': 0.9, 'rad': 180 / np.pi, 'turn': 360.0}
+
+# For each function: the color space it is converted from and, per channel, the value of 100%
+# (and a scale applied to plain numbers)
+_FUNCTIONS: Dict[str, Tuple[str, Tuple[Tuple[float, float], ...]]] = {
+    'rgb': ('srgb', ((1.0, 1 / 255),) * 3),
+    'hsl': ('hsl', ((None, 1.0), (1.0, 0.01), (1.0, 0.01))),
+    'hwb': ('hwb', ((None, 1.0), (1.0, 0.01), (1.0, 0.01))),
+    'lab': ('lab', ((100.0, 1.0), (125.0, 1.0), (125.0, 1.0))),
+    'lch': ('lch', ((100.0, 1.0), (150.0, 1.0), (None, 1.0))),
+    'oklab': ('oklab', ((1.0, 1.0), (0.4, 1.0), (0.4, 1.0))),
+    'oklch': ('oklch', ((1.0, 1.0), (0.4, 1.0), (None, 1.0))),
+}
+_FUNCTIONS['rgba'] = _FUNCTIONS['rgb']
+_FUNCTIONS['hsla'] = _FUNCTIONS['hsl']
+_PREDEFINED = ('srgb', 'srgb-linear', 'display-p3', 'xyz', 'xyz-d50', 'xyz-d65')
+
+Parsed = Tuple[str, Tuple[float, float, float], float]
+
+
+def is_literal(value: str) -> bool:
+    """Whether a palette value is a CSS value (hex or function) rather than a reference to a name."""
+    return value.startswith('#') or '(' in value
+
+
+def _number(token: str, percent: Optional[float], scale: float) -> Optional[float]:
+    """A channel token: `none`, a number (times `scale`), a percentage (of `percent`) or an angle."""
+    if token == 'none':
+        return 0.0
+    match = _TOKEN.match(token)
+    if not match:
+        return None
+    number, unit = float(match.group(1)), match.group(2)
+    if percent is None:  # Hue
+        return number * _TURNS[unit] if unit != '%' else None
+    if unit == '%':
+        return number / 100 * percent
+    return number * scale if unit is None else None
+
+
+def _alpha(token: Optional[str]) -> Optional[float]:
+    if token is None:
+        return 1.0
+    value = _number(token, 1.0, 1.0)
+    return None if value is None else min(max(value, 0.0), 1.0)
+
+
+def _parse_hex(digits: str) -> Optional[Parsed]:
+    if len(digits) in (3, 4):
+        digits = ''.join(c * 2 for c in digits)
+    if len(digits) not in (6, 8):
+        return None
+    try:
+        channels = bytes.fromhex(digits)
+    except ValueError:
+        return None
+    alpha = channels[3] / 255 if len(channels) == 4 else 1.0
+    return 'srgb', (channels[0] / 255, channels[1] / 255, channels[2] / 255), alpha
+
+
+def _split(arguments: str) -> Tuple[List[str], Optional[str]]:
+    """Channel tokens and the alpha token of a modern (`a b c / d`) or legacy (`a, b, c, d`) list."""
+    if ',' in arguments:
+        tokens = [token.strip() for token in arguments.split(',')]
+        if len(tokens) == 4:
+            return tokens[:3], tokens[3]
+        return tokens, None
+    channels, _, alpha = arguments.partition('/')
+    return channels.split(), alpha.strip() or None
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_value(value: str) -> Optional[Parsed]:
+    """
+    Parses one CSS color into (space, channels, alpha) without converting it, None if it is not a
+    color. Channels are normalized to the ranges described at the top of this module.
+    """
+    value = value.strip().lower()
+    if value.startswith('#'):
+        return _parse_hex(value[1:])
+    if value in NAMED_COLORS:
+        return _parse_hex(NAMED_COLORS[value])
+    if value == 'transparent':
+        return 'srgb', (0.0, 0.0, 0.0), 0.0
+    match = _FUNCTION.match(value)
+    if not match:
+        return None
+    function, arguments = match.groups()
+    if function == 'color':
+        space, _, arguments = arguments.strip().partition(' ')
+        if space not in _PREDEFINED:
+            return None
+        units = ((1.0, 1.0),) * 3
+    elif function in _FUNCTIONS:
+        space, units = _FUNCTIONS[function]
+    else:
+        return None  # var(), color-mix(), ...: not resolvable here
+    tokens, alpha_token = _split(arguments)
+    if len(tokens) != 3:
+        return None
+    channels = tuple(_number(token, percent, scale) for token, (percent, scale) in zip(tokens, units))
+    alpha = _alpha(alpha_token)
+    if None in channels or alpha is None:
+        return None
+    return space, channels, alpha
+
+
+def parse(values: Iterable[str]) -> np.ndarray:
+    """
+    Parses CSS colors into an (N, 4) array of sRGB channels and alpha, NaN rows for values that
+    are not colors. '#rrggbb' values and plain functions (`rgb(...)`, `oklch(...)`, ...) are
+    decoded in bulk, everything else through parse_value; each color space is converted in one call.
+    """
+    values = list(values)
+    result = np.full((len(values), 4), np.nan)
+    hex_rows: List[int] = []
+    hex_digits: List[str] = []
+    simple_rows: List[int] = []
+    simple_fields: List[Tuple[str, ...]] = []
+    groups: Dict[str, Tuple[List[int], List[Tuple[float, float, float]], List[float]]] = {}
+
+    def add(i: int, parsed: Optional[Parsed]):
+        if parsed is not None:
+            rows, channels, alphas = groups.setdefault(parsed[0], ([], [], []))
+            rows.append(i)
+            channels.append(parsed[1])
+            alphas.append(parsed[2])
+
+    for i, value in enumerate(values):
+        if not value:
+            continue
+        value = value.strip().lower()
+        if len(value) == 7 and value[0] == '#':
+            hex_rows.append(i)
+            hex_digits.append(value[1:])
+            continue
+        match = _SIMPLE.fullmatch(value)
+        if match:
+            simple_rows.append(i)
+            simple_fields.append(match.groups(''))
+        else:
+            add(i, parse_value(value))
+
+    if hex_rows:
+        try:
+            channels = np.frombuffer(bytes.fromhex(''.join(hex_digits)), dtype=np.uint8).reshape(-1, 3)
+            result[hex_rows, :3] = channels / 255
+            result[hex_rows, 3] = 1.0
+        except ValueError:  # A typo somewhere in the batch
+            for i, digits in zip(hex_rows, hex_digits):
+                add(i, _parse_hex(digits))
+    if simple_rows:
+        _parse_simple(np.array(simple_fields), np.array(simple_rows), result)
+    for space, (rows, channels, alphas) in groups.items():
+        result[rows, :3] = _TO_SRGB[space](np.array(channels, dtype=float))
+        result[rows, 3] = alphas
+    return result
+
+
+def _parse_simple(fields: np.ndarray, rows: np.ndarray, result: np.ndarray):
+    """Converts _SIMPLE matches (function, then number and unit of each channel and the alpha) into result rows."""
+    numbers = np.where(fields[:, 1::2] == '', 'nan', fields[:, 1::2]).astype(float)
+    units = np.searchsorted(_UNITS, fields[:, 2::2])  # Unit names as indices into _UNITS
+    percent, plain = np.searchsorted(_UNITS, ['%', ''])
+    angles = np.full(len(_UNITS), np.nan)  # Degrees per unit, NaN for '%'
+    for unit, factor in _TURNS.items():
+        angles[np.searchsorted(_UNITS, unit or '')] = factor
+    for function in np.unique(fields[:, 0]):
+        selected = fields[:, 0] == function
+        space, channel_units = _FUNCTIONS[function]
+        channels = np.empty((selected.sum(), 3))
+        for j, (hundred, scale) in enumerate(channel_units):
+            number, unit = numbers[selected, j], units[selected, j]
+            if hundred is None:  # Hue
+                channels[:, j] = number * angles[unit]
+            else:
+                channels[:, j] = np.where(unit == percent, number / 100 * hundred,
+                                          np.where(unit == plain, number * scale, np.nan))
+        alpha_number, alpha_unit = numbers[selected, 3], units[selected, 3]
+        alpha = np.where(np.isnan(alpha_number) & (alpha_unit == plain), 1.0,
+                         np.where(alpha_unit == percent, alpha_number / 100,
+                                  np.where(alpha_unit == plain, alpha_number, np.nan)))
+        target = rows[selected]
+        result[target, :3] = _TO_SRGB[space](channels)
+        result[target, 3] = np.clip(alpha, 0, 1)
+        # A bad unit anywhere makes the whole value invalid
+        invalid = np.isnan(channels).any(axis=-1) | np.isnan(alpha)
+        result[target[invalid]] = np.nan
+
+
+def convert(values: Iterable[str], space: str = 'srgb') -> np.ndarray:
+    """Parses CSS colors into an (N, 3) array in one of SPACES."""
+    return _FROM_SRGB[space](parse(values)[:, :3])
+
+
+def to_rgb255(rgb: np.ndarray) -> np.ndarray:
+    """sRGB in 0..1 to integers in 0..255 (clipped; NaN rows become -1)."""
+    rgb = np.asarray(rgb, dtype=float)
+    scaled = np.rint(np.clip(rgb, 0, 1) * 255)
+    return np.where(np.isnan(scaled), -1, scaled).astype(int)
+
+
+# Below this many values, rgb_triples goes value by value through the caches (a palette's table):
+# NumPy's per-call overhead only pays off on larger batches
+BULK_MIN = 256
+
+
+def rgb_triples(values: Sequence[str]) -> List[Optional[Tuple[int, int, int]]]:
+    """(r, g, b) tuples in 0..255 for a batch of CSS colors, None for values that are not colors."""
+    values = list(values)
+    if len(values) < BULK_MIN:
+        return [rgb_triple(value) if value else None for value in values]
+    return _bulk_triples(values)
+
+
+def _bulk_triples(values: Sequence[str]) -> List[Optional[Tuple[int, int, int]]]:
+    rows = to_rgb255(parse(values)[:, :3]).tolist()
+    return [_triple(*row) if row[0] >= 0 else None for row in rows]
+
+
+@functools.lru_cache(maxsize=4096)  # Palettes share a few hundred colors: share the tuples too
+def _triple(r: int, g: int, b: int) -> Tuple[int, int, int]:
+    return r, g, b
+
+
+@functools.lru_cache(maxsize=4096)
+def rgb_triple(value: str) -> Optional[Tuple[int, int, int]]:
+    """(r, g, b) in 0..255 for one CSS color, None if it is not a color."""
+    parsed = parse_value(value)
+    if parsed is None:
+        return None
+    if parsed[0] == 'srgb':  # Hex, names and rgb(): no conversion needed
+        return _triple(*(int(round(min(max(c, 0.0), 1.0) * 255)) for c in parsed[1]))
+    return _bulk_triples([value])[0]
+
+
+def to_hex(rgb: np.ndarray, alpha: Optional[np.ndarray] = None) -> List[Optional[str]]:
+    """sRGB rows to '#rrggbb' ('#rrggbbaa' where alpha is below 1), None for NaN rows."""
+    rows = to_rgb255(rgb).tolist()
+    alphas = [1.0] * len(rows) if alpha is None else np.asarray(alpha, dtype=float).tolist()
+    result = []
+    for (r, g, b), a in zip(rows, alphas):
+        if r < 0:
+            result.append(None)
+        elif a < 1:
+            result.append(f'#{r:02x}{g:02x}{b:02x}{int(round(a * 255)):02x}')
+        else:
+            result.append(f'#{r:02x}{g:02x}{b:02x}')
+    return result
@@ -0,0 +1,235 @@
+import hashlib
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from json.encoder import encode_basestring_ascii
+from typing import Dict, Hashable, List, Optional, Tuple
+from .fonts import font_stack
+from .themes import Theme, Palette, Texture
+
+
+# Scopes of the compiled variables: shared ones on :root, mode-specific ones on the body class
+# Quasar toggles, so a light/dark switch in the browser needs no new variables
+ROOT_SCOPE = ':root'
+MODE_SCOPES = {'light': 'body.body--light', 'dark': 'body.body--dark'}
+
+
+@dataclass
+class CompiledTheme:
+    """
+    Deterministic output of a sync for one (theme, palette, texture, layout, typography)
+    combination: CSS variables for both modes, texture CSS, and the stylesheet built from them.
+    """
+    scopes: Dict[str, Dict[str, str]]  # selector -> CSS variables (see ROOT_SCOPE / MODE_SCOPES)
+    texture_css: str
+    stylesheet: str  # Rules for every scope, ready for a <style> element
+    vars_json: str   # JSON object of scopes, ready for a JS payload
+    hash: str
+    # Keeps the source objects alive while cached so their ids in the key stay unique
+    sources: tuple = field(default=(), repr=False, compare=False)
+    # Every variable of each mode, and each scope rendered per variable and as a whole (reused by the next build)
+    modes: Dict[str, Dict[str, str]] = field(default_factory=dict, repr=False, compare=False)
+    fragments: Dict[str, Dict[str, Tuple[str, str]]] = field(default_factory=dict, repr=False, compare=False)
+    rules: Dict[str, Tuple[str, str]] = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def build(cls, theme: Theme, palettes: Dict[str, Palette], previous: Optional['CompiledTheme'] = None) -> 'CompiledTheme':
+        """
+        Compiles both modes. With the previous output of the same manager, only the variables that
+        changed are rendered again (a palette edit re-emits only those too, see Palette.derive).
+        """
+        mode_vars = {mode: generate_css_vars(theme, palette) for mode, palette in palettes.items()}
+        light = mode_vars.get('light') or mode_vars['dark']
+        dark = mode_vars.get('dark') or light
+
+        edits = previous._changes(light, dark) if previous else None
+        if edits is None:
+            # Variables that do not depend on the mode are emitted once
+            shared = {k: v for k, v in light.items() if dark.get(k) == v}
+            scopes = {ROOT_SCOPE: shared}
+            for mode, css_vars in (('light', light), ('dark', dark)):
+                scopes[MODE_SCOPES[mode]] = {k: v for k, v in css_vars.items() if k not in shared}
+            fragments = {selector: _fragments(css_vars) for selector, css_vars in scopes.items()}
+            rules = {selector: _render(selector, parts) for selector, parts in fragments.items()}
+        else:
+            scopes, fragments, rules = dict(previous.scopes), dict(previous.fragments), dict(previous.rules)
+            for selector, values in edits.items():
+                scopes[selector] = {**scopes[selector], **values}
+                fragments[selector] = {**fragments[selector], **_fragments(values)}
+                rules[selector] = _render(selector, fragments[selector])
+
+        if previous and previous.sources and previous.sources[0].texture == theme.texture:
+            texture_css = previous.texture_css
+        else:
+            texture_css = generate_texture_css(theme.texture) if theme.texture else ''
+        stylesheet = '\n'.join(rule for rule, _ in rules.values())
+
+        digest = hashlib.sha1()
+        for chunk in (stylesheet, texture_css):
+            digest.update(chunk.encode('utf-8'))
+
+        return cls(
+            scopes=scopes,
+            texture_css=texture_css,
+            stylesheet=stylesheet,
+            vars_json='{' + ', '.join(f'{_json(selector)}: {js}' for selector, (_, js) in rules.items()) + '}',
+            hash=digest.hexdigest()[:16],
+            sources=(theme, *palettes.values()),
+            modes={'light': light, 'dark': dark},
+            fragments=fragments,
+            rules=rules,
+        )
+
+    def _changes(self, light: Dict[str, str], dark: Dict[str, str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        The values that changed, per scope. None if variables were added or removed, or moved
+        between scopes (a full build keeps the output deterministic).
+        """
+        before_light, before_dark = self.modes['light'], self.modes['dark']
+        if light.keys() != before_light.keys() or dark.keys() != before_dark.keys():
+            return None
+        # Unchanged palette variables are the same objects (see Palette.derive)
+        changed = {k for k, v in light.items() if before_light[k] is not v and before_light[k] != v}
+        changed.update(k for k, v in dark.items() if before_dark[k] is not v and before_dark[k] != v)
+
+        edits: Dict[str, Dict[str, str]] = {}
+        shared = self.scopes[ROOT_SCOPE]
+        for k in changed:
+            if (k in shared) != (k in dark and dark[k] == light.get(k)):
+                return None
+            if k in shared:
+                edits.setdefault(ROOT_SCOPE, {})[k] = light[k]
+                continue
+            for mode, css_vars in (('light', light), ('dark', dark)):
+                if k in css_vars:
+                    edits.setdefault(MODE_SCOPES[mode], {})[k] = css_vars[k]
+        return edits
+
+
+_json = encode_basestring_ascii  # What json.dumps does for each string
+
+
+def _fragments(css_vars: Dict[str, str]) -> Dict[str, Tuple[str, str]]:
+    """Each variable as a CSS declaration and as a JSON object member."""
+    return {k: (f'{k}: {v};', f'{_json(k)}: {_json(v)}') for k, v in css_vars.items()}
+
+
+def _render(selector: str, fragments: Dict[str, Tuple[str, str]]) -> Tuple[str, str]:
+    """A scope as a CSS rule and as a JSON object (the same text as json.dumps)."""
+    declarations = ' '.join([declaration for declaration, _ in fragments.values()])
+    return f'{selector} {{ {declarations} }}', '{' + ', '.join([member for _, member in fragments.values()]) + '}'
+
+
+class ThemeCompiler:
+    """
+    Bounded LRU cache of CompiledTheme objects, so every client on the same
+    theme combination reuses a single compiled result.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: 'OrderedDict[Hashable, CompiledTheme]' = OrderedDict()
+        # Latest output of each manager, the base of its next build
+        self._latest: 'weakref.WeakKeyDictionary[object, CompiledTheme]' = weakref.WeakKeyDictionary()
+
+    def compile(self, manager) -> Optional[CompiledTheme]:
+        """Returns the compiled output for a manager's current state (None if it has no theme)."""
+        theme = manager.theme
+        palettes = {mode: manager.get_active_palette(mode) for mode in MODE_SCOPES}
+        palettes = {mode: palette for mode, palette in palettes.items() if palette}
+        if not theme or not palettes:
+            return None
+
+        key = manager.cache_key()
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            self._latest[manager] = compiled
+            return compiled
+
+        self.misses += 1
+        compiled = CompiledTheme.build(theme, palettes, self._latest.get(manager))
+        compiled.sources += (manager._base_theme,)
+        self._cache[key] = compiled
+        self._latest[manager] = compiled
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        """Drops every cached result (e.g. after the registry changed)."""
+        self._cache.clear()
+        self._latest.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def generate_css_vars(theme: Theme, palette: Palette) -> Dict[str, str]:
+    """Generates a flat dictionary of CSS variables."""
+    # 1. Palette: colors, tonal ramps, surface, content and texture colors (emitted once per palette,
+    # edits re-emit only what depends on them: see Palette.derive)
+    css_vars = dict(palette.css_vars)
+
+    # 2. Theme Settings (Layout, Texture, Typography)
+    if theme:
+        if theme.layout:
+            layout = theme.layout
+            css_vars["--nt-roundness"] = str(layout.roundness)
+            css_vars["--nt-border-width"] = str(layout.border)
+            css_vars["--nt-density"] = str(layout.density)
+
+        if theme.texture:
+            texture = theme.texture
+            css_vars["--nt-shadow-intensity"] = str(texture.shadow_intensity)
+            css_vars["--nt-highlight-intensity"] = str(texture.highlight_intensity)
+            css_vars["--nt-opacity"] = str(texture.opacity)
+            css_vars["--nt-blur"] = str(texture.blur)
+
+        if theme.typography:
+            typo = theme.typography
+            # Each family is followed by its metric-adjusted fallback (see fonts.FontMetrics)
+            css_vars["--nt-font-primary"] = font_stack(typo.primary)
+            css_vars["--nt-font-secondary"] = font_stack(typo.secondary)
+            css_vars["--nt-font-mono"] = font_stack(typo.mono)
+            css_vars["--nt-font-scale"] = str(typo.scale)
+
+            transform_map = {
+                 "lowercase": "lowercase",
+                 "uppercase": "uppercase",
+                 "titlecase": "capitalize",
+                 "title_case": "capitalize",
+                 "none": "none"
+            }
+            css_vars["--nt-text-transform-title"] = transform_map.get(typo.title_case, "none")
+
+    return css_vars
+
+
+def generate_texture_css(texture: Texture) -> str:
+    """Generates CSS rules from component-specific texture properties."""
+    rules: List[str] = []
+
+    # Component type to CSS selectors mapping
+    selectors = {
+        'button': '.q-btn:not(.q-btn--flat):not(.q-btn--outline)',
+        'card': '.q-card, .nicegui-card',
+        'progress': '.q-linear-progress, .q-circular-progress',
+        'slider': '.q-slider, .palette-slider',
+        'toggle': '.q-toggle, .q-checkbox, .q-radio, .q-btn-group',
+        'chip': '.q-chip, .q-badge',
+        'menu': '.q-menu, .q-tooltip, .q-notification'
+    }
+
+    # Generate rules for each component type
+    for component, selector in selectors.items():
+        css_props = getattr(texture, component, "")
+        if css_props and css_props.strip():
+            # Handle multiline YAML properties
+            props_cleaned = css_props.strip().replace('\n', ' ')
+            rules.append(f"{selector} {{ {props_cleaned} }}")
+
+    return '\n'.join(rules)
@@ -0,0 +1,515 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import urllib.request
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from fastapi import HTTPException
+from fastapi.responses import FileResponse
+from nicegui import ui, app, background_tasks, Client, context
+from .themes import Typography
+
+# A curated list of Google Fonts (offered by theme_config, loaded on demand)
+GOOGLE_FONTS = sorted([
+    "Roboto", "Open Sans", "Noto Sans JP", "Inter", "Lato", "Montserrat",
+    "Oswald", "Source Sans Pro", "Slabo 27px", "Raleway", "PT Sans",
+    "Merriweather", "Nunito Sans", "Prompt", "Work Sans", "Rubik",
+    "Playfair Display", "Fira Sans", "Mukta", "Quicksand", "Karla",
+    "Titillium Web", "Inconsolata", "Barlow", "Dosis", "Cabin",
+    "Bitter", "Anton", "Oxygen", "Arvo", "Libre Baskerville", "Lobster",
+    "Pacifico", "Shadows Into Light", "Dancing Script", "Bebas Neue",
+    "Poppins", "Recursive", "Sniglet"
+])
+
+# CSS generic families are provided by the browser and never loaded
+GENERIC_FAMILIES = {
+    'serif', 'sans-serif', 'monospace', 'cursive', 'fantasy', 'system-ui',
+    'ui-serif', 'ui-sans-serif', 'ui-monospace', 'ui-rounded', 'math', 'emoji',
+}
+
+GOOGLE_FONTS_CSS = 'https://fonts.googleapis.com/css2'
+
+FONT_MEDIA_TYPES = {'.otf': 'font/otf', '.ttf': 'font/ttf', '.woff': 'font/woff', '.woff2': 'font/woff2'}
+
+FONT_URL_PREFIX = '/_nicetheme/fonts'
+DEFAULT_FONT_CACHE = Path.home() / '.cache' / 'nicetheme' / 'fonts'
+
+# Google serves WOFF2 only to browsers it recognizes
+_FETCH_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                                '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'}
+_REMOTE_URL = re.compile(r'url\((https://fonts\.gstatic\.com/[^)]+)\)')
+_FILE_NAME = re.compile(r'^[0-9a-f]{16}(-[a-z0-9-]+)?\.(woff2|woff|ttf|otf)$')
+_LATIN_RANGE = 'U+0000-00FF'
+
+# Unicode ranges local fonts are split into (same ranges Google Fonts uses)
+UNICODE_RANGES = {
+    'latin': 'U+0000-00FF, U+0131, U+0152-0153, U+02BB-02BC, U+02C6, U+02DA, U+02DC, U+0304, U+0308, '
+             'U+0329, U+2000-206F, U+20AC, U+2122, U+2191, U+2193, U+2212, U+2215, U+FEFF, U+FFFD',
+    'latin-ext': 'U+0100-02BA, U+02BD-02C5, U+02C7-02CC, U+02CE-02D7, U+02DD-02FF, U+0304, U+0308, '
+                 'U+0329, U+1D00-1DBF, U+1E00-1E9F, U+1EF2-1EFF, U+2020, U+20A0-20AB, U+20AD-20C0, '
+                 'U+2113, U+2C60-2C7F, U+A720-A7FF',
+    'cyrillic': 'U+0301, U+0400-045F, U+0490-0491, U+04B0-04B1, U+2116',
+    'greek': 'U+0370-0377, U+037A-037F, U+0384-038A, U+038C, U+038E-03A1, U+03A3-03FF',
+    'vietnamese': 'U+0102-0103, U+0110-0111, U+0128-0129, U+0168-0169, U+01A0-01A1, U+01AF-01B0, '
+                  'U+0300-0301, U+0303-0304, U+0308-0309, U+0323, U+0329, U+1EA0-1EF9, U+20AB',
+}
+DEFAULT_SUBSETS = ('latin', 'latin-ext')
+
+# A font face served from the app: (url, unicode-range or '' for the whole font)
+FontFace = Tuple[str, str]
+
+# English letter frequencies, used to average glyph widths the way running text sees them
+_CHAR_FREQUENCIES = {
+    'a': .0668, 'b': .0122, 'c': .0228, 'd': .0348, 'e': .1039, 'f': .0182, 'g': .0165, 'h': .0499,
+    'i': .0570, 'j': .0013, 'k': .0063, 'l': .0329, 'm': .0197, 'n': .0552, 'o': .0614, 'p': .0158,
+    'q': .0008, 'r': .0490, 's': .0518, 't': .0741, 'u': .0226, 'v': .0080, 'w': .0193, 'x': .0012,
+    'y': .0162, 'z': .0006, ' ': .1818,
+}
+
+
+@dataclass(frozen=True)
+class FontMetrics:
+    """Vertical metrics and average character width of a font, in font units."""
+    ascent: int
+    descent: int  # Negative, below the baseline
+    line_gap: int
+    units_per_em: int
+    x_width_avg: float
+    category: str = 'sans-serif'  # Which system fallback resembles it: sans-serif, serif or monospace
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'FontMetrics':
+        """Reads the metrics browsers use for line boxes (hhea, or OS/2 typo with USE_TYPO_METRICS)."""
+        from fontTools.ttLib import TTFont
+
+        with _quiet_font_tools(), TTFont(str(path), lazy=True) as font:
+            return cls._from_font(font)
+
+    @classmethod
+    def _from_font(cls, font) -> 'FontMetrics':
+        os2 = font['OS/2'] if 'OS/2' in font else None
+        if os2 is not None and os2.fsSelection & (1 << 7):
+            ascent, descent, line_gap = os2.sTypoAscender, os2.sTypoDescender, os2.sTypoLineGap
+        else:
+            hhea = font['hhea']
+            ascent, descent, line_gap = hhea.ascent, hhea.descent, hhea.lineGap
+
+        cmap = font.getBestCmap() or {}
+        hmtx = font['hmtx']
+        weighted = total = 0.0
+        for char, frequency in _CHAR_FREQUENCIES.items():
+            glyph = cmap.get(ord(char))
+            if glyph is not None:
+                weighted += hmtx[glyph][0] * frequency
+                total += frequency
+        x_width_avg = weighted / total if total else (os2.xAvgCharWidth if os2 is not None else 0)
+
+        category = 'sans-serif'
+        if font['post'].isFixedPitch:
+            category = 'monospace'
+        elif os2 is not None and os2.panose.bFamilyType == 2 and 2 <= os2.panose.bSerifStyle <= 10:
+            category = 'serif'
+
+        return cls(ascent, descent, line_gap, font['head'].unitsPerEm, x_width_avg, category)
+
+    def fallback_css(self, family: str) -> str:
+        """
+        An @font-face for `<family> Fallback`: the matching system font, scaled and with line metrics
+        overridden so text set in it takes the same space as `family` (no layout shift on swap).
+        """
+        local_name, fallback = FALLBACK_FONTS[self.category]
+        size_adjust = (self.x_width_avg / self.units_per_em) / (fallback.x_width_avg / fallback.units_per_em)
+        scale = self.units_per_em * size_adjust
+        return (
+            f"@font-face {{ font-family: '{fallback_family(family)}'; src: local('{local_name}');"
+            f" size-adjust: {size_adjust * 100:.2f}%;"
+            f" ascent-override: {self.ascent / scale * 100:.2f}%;"
+            f" descent-override: {abs(self.descent) / scale * 100:.2f}%;"
+            f" line-gap-override: {self.line_gap / scale * 100:.2f}%; }}"
+        )
+
+
+# System fonts the fallbacks are derived from, with their metrics
+FALLBACK_FONTS = {
+    'sans-serif': ('Arial', FontMetrics(1854, -434, 67, 2048, 904)),
+    'serif': ('Times New Roman', FontMetrics(1825, -443, 87, 2048, 819, 'serif')),
+    'monospace': ('Courier New', FontMetrics(1705, -615, 0, 2048, 1229, 'monospace')),
+}
+
+
+def fallback_family(name: str) -> str:
+    return f'{name} Fallback'
+
+
+def font_stack(name: str) -> str:
+    """CSS font-family value for a typography name, followed by its metric-adjusted fallback."""
+    if not name or name.lower() in GENERIC_FAMILIES:
+        return name
+    return f"'{name}', '{fallback_family(name)}'"
+
+
+# Families already added to each client's page
+_loaded: 'weakref.WeakKeyDictionary[Client, Set[str]]' = weakref.WeakKeyDictionary()
+
+
+def typography_families(typography: Optional[Typography]) -> List[str]:
+    """The families a typography needs loaded (primary, secondary, mono), without generic ones."""
+    if typography is None:
+        return []
+    families = []
+    for name in (typography.primary, typography.secondary, typography.mono):
+        if name and name.lower() not in GENERIC_FAMILIES and name not in families:
+            families.append(name)
+    return families
+
+
+def google_family(name: str) -> str:
+    """Normalizes a family name to the casing Google Fonts expects (e.g. 'open sans' -> 'Open Sans')."""
+    for family in GOOGLE_FONTS:
+        if family.lower() == name.lower():
+            return family
+    return ' '.join(word.capitalize() for word in name.split())
+
+
+def google_fonts_url(families: Iterable[str]) -> str:
+    query = '&'.join(f"family={google_family(name).replace(' ', '+')}" for name in families)
+    return f'{GOOGLE_FONTS_CSS}?{query}&display=swap'
+
+
+def font_face_css(name: str, url: str, unicode_range: str = '') -> str:
+    range_css = f' unicode-range: {unicode_range};' if unicode_range else ''
+    return f"@font-face {{ font-family: '{name}'; src: url('{url}'); font-display: swap;{range_css} }}"
+
+
+def font_head_html(families: Iterable[str], registry, preload: bool = False, fallbacks: bool = True) -> str:
+    """
+    Head tags that load the given families: @font-face rules for local fonts of the registry and
+    the cached rules of the registry's font store. Families not cached yet are downloaded in the
+    background and render in their fallback until then (see load_fonts); the page never links Google.
+    With preload, the files are fetched right away. With fallbacks, families with known metrics
+    also get a metric-adjusted fallback face (see FontMetrics.fallback_css).
+    """
+    families = list(families)
+    local_fonts = registry.fonts if registry else {}
+    local = [name for name in families if name in local_fonts]
+    remote = [name for name in families if name not in local_fonts]
+
+    # Optimized local fonts are split by unicode-range, the browser only fetches the parts it needs
+    faces = getattr(registry, 'font_faces', {})
+
+    tags, rules = [], []
+    for name in local:
+        for url, unicode_range in faces.get(name) or [(local_fonts[name], '')]:
+            if preload and (not unicode_range or unicode_range.startswith(_LATIN_RANGE)):
+                media_type = FONT_MEDIA_TYPES.get(Path(url).suffix.lower(), 'font/woff2')
+                tags.append(f'<link rel="preload" href="{url}" as="font" type="{media_type}" crossorigin>')
+            rules.append(font_face_css(name, url, unicode_range))
+    if rules:
+        tags.append(f"<style>{' '.join(rules)}</style>")
+
+    # Google families are only served from the font store, the others are fetched for later
+    store = getattr(registry, 'font_store', None)
+    if store is not None:
+        cached = [name for name in remote if store.css(name) is not None]
+        for name in cached:
+            if preload:
+                for url in store.preload_urls(name):
+                    media_type = FONT_MEDIA_TYPES.get(Path(url).suffix.lower(), 'font/woff2')
+                    tags.append(f'<link rel="preload" href="{url}" as="font" type="{media_type}" crossorigin>')
+        if cached:
+            tags.append(f"<style>{''.join(store.css(name) for name in cached)}</style>")
+        for name in remote:
+            if name not in cached:
+                store.fetch_in_background(name)
+
+    if fallbacks:
+        fallback_rules = []
+        for name in families:
+            metrics = getattr(registry, 'font_metrics', {}).get(name)
+            if metrics is None and store is not None:
+                metrics = store.metrics(name)
+            if metrics is not None:
+                fallback_rules.append(metrics.fallback_css(name))
+        if fallback_rules:
+            tags.append(f"<style>{' '.join(fallback_rules)}</style>")
+    return ''.join(tags)
+
+
+def load_fonts(families: Iterable[str], registry, client: Optional[Client] = None, preload: bool = False):
+    """
+    Adds the given families to a client's page (default: the current one), each only once.
+    While the page is being built the tags land in the initial HTML, afterwards they are inserted live.
+    Families still being downloaded by the font store are added once they are cached.
+    """
+    client = client or context.client
+    loaded = _loaded.setdefault(client, set())
+    missing = [name for name in dict.fromkeys(families) if name and name.lower() not in GENERIC_FAMILIES and name not in loaded]
+    if not missing:
+        return
+    store = getattr(registry, 'font_store', None)
+    local_fonts = registry.fonts if registry else {}
+    uncached = [name for name in missing if store is not None and name not in local_fonts and store.css(name) is None]
+    with client:
+        ui.add_head_html(font_head_html(missing, registry, preload=preload))
+    loaded.update(name for name in missing if name not in uncached)
+    if uncached and not store.offline:
+        pending = {name: store.fetch_in_background(name) for name in uncached}
+        background_tasks.create(_load_when_cached(pending, registry, client), name='nicetheme load fonts')
+
+
+async def _load_when_cached(pending: Dict[str, Optional[Future]], registry, client: Client):
+    """Adds families to a client's page as soon as their background downloads finished."""
+    await asyncio.gather(*(asyncio.wrap_future(future) for future in pending.values() if future is not None))
+    if not client.is_deleted:
+        load_fonts([name for name in pending if registry.font_store.css(name) is not None], registry, client)
+
+
+class FontStore:
+    """
+    Local cache and proxy for Google Fonts. Each family is resolved once: its stylesheet and files
+    are downloaded into `cache_dir` and served by the app under content-hashed URLs, so browsers
+    never contact Google. With `offline=True` nothing is downloaded and only families already in
+    `cache_dir` (e.g. a pre-seeded directory) are available.
+
+    Layout of `cache_dir`: `css/<family>.css` (rewritten to local URLs) and `files/<hash>.<ext>`.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, offline: bool = False, timeout: float = 10.0,
+                 retry_after: float = 300.0):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_FONT_CACHE
+        self.offline = offline
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._css: Dict[str, str] = {}
+        self._pending: Dict[str, Future] = {}  # Family -> its running download
+        self._failed: Dict[str, float] = {}  # Family -> time of the last failed download
+        self._metrics: Dict[str, Optional[FontMetrics]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _slug(family: str) -> str:
+        return re.sub(r'[^a-z0-9]+', '-', family.lower()).strip('-')
+
+    def _css_path(self, family: str) -> Path:
+        return self.cache_dir / 'css' / f'{self._slug(family)}.css'
+
+    def file_path(self, name: str) -> Optional[Path]:
+        """The cached font file for a served name (None for unknown or malformed names)."""
+        if not _FILE_NAME.match(name):
+            return None
+        path = self.cache_dir / 'files' / name
+        return path if path.exists() else None
+
+    def css(self, family: str) -> Optional[str]:
+        """The cached @font-face rules of a family (pointing at local URLs), None if not cached."""
+        family = google_family(family)
+        css = self._css.get(family)
+        if css is None:
+            path = self._css_path(family)
+            if not path.exists():
+                return None
+            css = self._css[family] = path.read_text(encoding='utf-8')
+        return css
+
+    def metrics(self, family: str) -> Optional[FontMetrics]:
+        """Metrics of a cached family, read from its Latin file (None if not cached or unreadable)."""
+        family = google_family(family)
+        if family not in self._metrics:
+            metrics = None
+            for url in self.preload_urls(family)[:1]:
+                path = self.file_path(url.rsplit('/', 1)[-1])
+                if path is not None:
+                    try:
+                        metrics = FontMetrics.from_file(path)
+                    except Exception:  # fontTools missing or unreadable file
+                        pass
+            if metrics is None and self.css(family) is None:
+                return None  # Not cached yet, try again once it is
+            self._metrics[family] = metrics
+        return self._metrics[family]
+
+    def preload_urls(self, family: str) -> List[str]:
+        """Local URLs worth preloading for a family: the files covering Latin text."""
+        css = self.css(family) or ''
+        urls = []
+        for rule in css.split('@font-face')[1:]:
+            if _LATIN_RANGE in rule or 'unicode-range' not in rule:
+                urls += re.findall(r"url\('?([^')]+)'?\)", rule)
+        return urls
+
+    def fetch(self, family: str) -> Optional[str]:
+        """Downloads a family into the cache (blocking), returns its rewritten CSS."""
+        family = google_family(family)
+        if self.offline:
+            return self.css(family)
+
+        request = urllib.request.Request(google_fonts_url([family]), headers=_FETCH_HEADERS)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            css = response.read().decode('utf-8')
+
+        files_dir = self.cache_dir / 'files'
+        files_dir.mkdir(parents=True, exist_ok=True)
+
+        def localize(match) -> str:
+            remote = match.group(1)
+            with urllib.request.urlopen(urllib.request.Request(remote, headers=_FETCH_HEADERS),
+                                        timeout=self.timeout) as response:
+                data = response.read()
+            suffix = Path(remote.split('?')[0]).suffix.lower()
+            name = f"{hashlib.sha256(data).hexdigest()[:16]}{suffix if suffix in FONT_MEDIA_TYPES else '.woff2'}"
+            _write_atomic(files_dir / name, data)
+            return f"url('{FONT_URL_PREFIX}/{name}')"
+
+        css = _REMOTE_URL.sub(localize, css)
+        path = self._css_path(family)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(path, css.encode('utf-8'))
+        self._css[family] = css
+        return css
+
+    def fetch_in_background(self, family: str) -> Optional[Future]:
+        """
+        Resolves a family without blocking the caller (once; failures are retried after `retry_after` s).
+        Returns the future of the running download, None if there is nothing to wait for.
+        """
+        family = google_family(family)
+        if self.offline:
+            return None
+        def run():
+            try:
+                self.fetch(family)
+            except Exception:
+                # The family keeps rendering in its fallback, retry later
+                self._failed[family] = time.monotonic()
+            finally:
+                with self._lock:
+                    self._pending.pop(family, None)
+
+        with self._lock:
+            if family in self._pending:
+                return self._pending[family]
+            if time.monotonic() - self._failed.get(family, -self.retry_after) < self.retry_after:
+                return None
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='nicetheme-fonts')
+            future = self._pending[family] = self._executor.submit(run)
+        return future
+
+    def optimize(self, source: Path, subsets: Sequence[str] = DEFAULT_SUBSETS) -> List[FontFace]:
+        """
+        Splits a local font into WOFF2 files per Unicode range (see UNICODE_RANGES), cached by the
+        source's content hash so each font is only processed once. Ranges the font has no glyphs
+        for are skipped. Requires fontTools (and brotli for WOFF2) unless the result is cached.
+        """
+        data = Path(source).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        files_dir = self.cache_dir / 'files'
+        manifest = self.cache_dir / 'optimized' / f'{digest}-{"-".join(subsets)}.txt'
+
+        if manifest.exists():
+            faces = [line.split('\t') for line in manifest.read_text(encoding='utf-8').splitlines() if line]
+            if all(self.file_path(url.rsplit('/', 1)[-1]) for url, _ in faces):
+                return [(url, unicode_range) for url, unicode_range in faces]
+
+        files_dir.mkdir(parents=True, exist_ok=True)
+        with _quiet_font_tools():
+            faces = self._subset(source, digest, subsets, files_dir)
+
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(manifest, '\n'.join('\t'.join(face) for face in faces).encode('utf-8'))
+        return faces
+
+    def _subset(self, source: Path, digest: str, subsets: Sequence[str], files_dir: Path) -> List[FontFace]:
+        from fontTools import subset as ft_subset
+        from fontTools.ttLib import TTFont
+
+        font = TTFont(Path(source))
+        codepoints = set(font.getBestCmap() or {})
+        font.close()
+
+        faces = []
+        for subset in subsets:
+            unicode_range = UNICODE_RANGES[subset]
+            unicodes = [u for u in _parse_unicode_range(unicode_range) if u in codepoints]
+            if not unicodes:
+                continue
+
+            options = ft_subset.Options()
+            options.flavor = 'woff2'
+            options.layout_features = ['*']
+            options.name_IDs = ['*']
+            options.notdef_outline = True
+            font = ft_subset.load_font(str(source), options)
+            subsetter = ft_subset.Subsetter(options)
+            subsetter.populate(unicodes=unicodes)
+            subsetter.subset(font)
+
+            name = f'{digest}-{subset}.woff2'
+            tmp = files_dir / f'{name}.tmp'
+            ft_subset.save_font(font, str(tmp), options)
+            font.close()
+            tmp.replace(files_dir / name)
+            faces.append((f'{FONT_URL_PREFIX}/{name}', unicode_range))
+        return faces
+
+    def install(self):
+        """Serves the cached files under FONT_URL_PREFIX (the route is shared by all stores)."""
+        _install_font_route(self)
+
+
+_font_stores: List[FontStore] = []
+
+
+def _install_font_route(store: FontStore):
+    if store in _font_stores:
+        return
+    _font_stores.append(store)
+    if len(_font_stores) > 1:
+        return
+
+    def serve_font(name: str):
+        for font_store in _font_stores:
+            path = font_store.file_path(name)
+            if path is not None:
+                return FileResponse(path, media_type=FONT_MEDIA_TYPES[path.suffix],
+                                    headers={'Cache-Control': 'public, max-age=31536000, immutable'})
+        raise HTTPException(status_code=404)
+
+    app.add_api_route(FONT_URL_PREFIX + '/{name}', serve_font, methods=['GET'], include_in_schema=False)
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')  # Workers may write the same file at once
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+
+def _parse_unicode_range(unicode_range: str) -> List[int]:
+    """'U+0000-00FF, U+0131' -> [0x0, ..., 0xff, 0x131]"""
+    codepoints = []
+    for part in unicode_range.split(','):
+        part = part.strip()[2:]
+        start, _, end = part.partition('-')
+        codepoints.extend(range(int(start, 16), int(end or start, 16) + 1))
+    return codepoints
+
+
+@contextmanager
+def _quiet_font_tools():
+    """fontTools warns about harmless metadata quirks (e.g. old 'created' timestamps)."""
+    logger = logging.getLogger('fontTools')
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
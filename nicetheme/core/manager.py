@@ -1,48 +1,355 @@
-from typing import Callable, List, Literal, Optional
+import asyncio
+import time
+import weakref
+from collections.abc import Mapping
+from dataclasses import dataclass, fields, replace
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Literal, Optional, Tuple
+from nicegui import Client, context
 from .themes import Theme, Palette
-from .registry import ThemeRegistry
+from .registry import RegistryChanges, ThemeRegistry
+
+# What a listener can subscribe to (see ThemeManager.bind)
+TOPICS = ('theme', 'mode', 'effective_mode', 'palette', 'palette_override', 'texture', 'layout', 'typography')
+
+
+def _frozen(value: Any) -> Hashable:
+    """A hashable stand-in for an override value (lists and tuples as tuples, mappings as sorted items)."""
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, _frozen(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(item) for item in value)
+    return value
+
+
+def _same_kind(current: Any, value: Any) -> bool:
+    """Whether a stored override has the shape of the field value it replaces (prefs come from the browser)."""
+    if isinstance(current, bool) or isinstance(value, bool):
+        return type(current) is type(value)
+    if isinstance(current, (int, float)):
+        return isinstance(value, (int, float))
+    if isinstance(current, str):
+        return isinstance(value, str)
+    if isinstance(current, Mapping):
+        return isinstance(value, Mapping) and all(isinstance(k, str) and isinstance(v, str) for k, v in value.items())
+    if isinstance(current, (list, tuple)):
+        return isinstance(value, (list, tuple)) and all(isinstance(item, str) for item in value)
+    return False
+
+
+@dataclass(frozen=True)
+class ThemeChange:
+    """
+    One topic that changed between two flushes, with its values at the previous and at this flush.
+    Values per topic: the theme, mode, effective mode and palette names, the palette overrides
+    dict, and the Texture, Layout and Typography (None without a theme).
+    """
+    topic: str
+    before: Any
+    after: Any
+
 
 class ThemeManager:
     """
-    PURE BACKEND: Manages the state of the theme. 
+    PURE BACKEND: Manages the state of the theme.
     Does NOT know about HTML, CSS injection, or the browser.
+
+    The registry's Theme/Palette/Texture/Layout objects are shared and never mutated.
+    Every change is recorded as a copy-on-write override, and `session()` hands out
+    one lightweight manager per client so users never see each other's changes.
+    A manager used outside a client (the one created at startup) only holds the defaults
+    for sessions created later: changing it does not reach the clients already connected.
+
+    Notifications are coalesced: mutations only mark the manager dirty and listeners
+    run once per event-loop turn (or at most `max_rate` times per second). Each flush
+    compares the state with the one last delivered, so a listener can subscribe to the
+    topics it shows and read what changed from `changes`.
     """
-    def __init__(self, themes_dirs: Optional[List] = None):
-        self._registry = ThemeRegistry(themes_dirs=themes_dirs)  # Use provided themes directories
+    def __init__(self, themes_dirs: Optional[List] = None, registry: Optional[ThemeRegistry] = None,
+                 max_rate: Optional[float] = None):
+        self._registry = registry or ThemeRegistry.shared(themes_dirs)  # One registry per set of directories
         self._theme_name: str = 'default'
-        self._theme: Optional[Theme] = self._registry.themes.get(self._theme_name)
-        self._active_palette_name: str = self._theme.palette if self._theme else 'solarized'
+        self._base_theme: Optional[Theme] = self._registry.themes.get(self._theme_name)
+        self._active_palette_name: str = self._base_theme.palette if self._base_theme else 'solarized'
         self._mode: Literal['light', 'dark', 'auto'] = 'auto'  # Default to auto (browser detect)
-        self._listeners: List[Callable[['ThemeManager'], None]] = []
+        self._detected_mode: Literal['light', 'dark'] = 'light'
+        self._listeners: Dict[Callable[['ThemeManager'], None], Optional[FrozenSet[str]]] = {}
+
+        # Coalescing notification scheduler
+        self.max_rate = max_rate  # Flushes per second, None = once per event-loop turn
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._last_flush = 0.0
+
+        # State at the last flush (topic -> (comparison key, value)) and what that flush changed
+        self._delivered: Dict[str, Tuple[Any, Any]] = {}
+        self._changes: Dict[str, ThemeChange] = {}
+        self._forced = False
+
+        # Copy-on-write state: selected registry entries and per-field overrides
+        self._texture_name: Optional[str] = None
+        self._layout_name: Optional[str] = None
+        self._overrides: Dict[str, Dict[str, Any]] = {}
+
+        # Lazily built copies (only when overrides exist)
+        self._theme: Optional[Theme] = None
+        self._palettes: Dict[str, Palette] = {}
+
+        # Per-client sessions (only used on the root manager)
+        self._sessions: 'weakref.WeakKeyDictionary[Client, ThemeManager]' = weakref.WeakKeyDictionary()
+        self._client_ref: Optional[Callable[[], Optional[Client]]] = None
+
+        # Hot-reloaded registry entries are re-resolved for this manager and its sessions
+        self._registry.on_reload(self._on_registry_reload)
+        self._delivered = self._state()
 
-    def bind(self, callback: Callable[['ThemeManager'], None]):
-        """Registers a listener (The Bridge or UI)"""
-        self._listeners.append(callback)
+    def bind(self, callback: Callable[['ThemeManager'], None], topics: Optional[Iterable[str]] = None):
+        """
+        Registers a listener (The Bridge or UI). With `topics` (see TOPICS), it only runs on flushes
+        that changed one of them; without, on every flush. Binding again replaces the topics.
+        """
+        if topics is not None:
+            topics = frozenset(topics)
+            unknown = topics.difference(TOPICS)
+            if unknown:
+                raise ValueError(f"Unknown topics: {', '.join(sorted(unknown))}")
+        self._listeners[callback] = topics
 
     def unbind(self, callback: Callable[['ThemeManager'], None]):
         """Unregisters a listener"""
-        if callback in self._listeners:
-            self._listeners.remove(callback)
+        self._listeners.pop(callback, None)
+
+    @property
+    def changes(self) -> Dict[str, ThemeChange]:
+        """The topics changed by the last flush (the one listeners are being called for)."""
+        return self._changes
 
     def _notify(self):
-        for listener in self._listeners:
-            listener(self)
+        """Marks the state dirty and schedules a single flush for the current event-loop turn."""
+        self._dirty = True
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (startup, scripts): deliver immediately
+            self.flush()
+            return
+
+        delay = 0.0
+        if self.max_rate:
+            delay = self._last_flush + 1.0 / self.max_rate - time.monotonic()
+        if delay > 0:
+            self._flush_handle = loop.call_later(delay, self.flush)
+        else:
+            self._flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        """Synchronously delivers pending changes to all listeners (also useful in tests)."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._changes = self._diff()
+        for listener, topics in list(self._listeners.items()):
+            if topics is None or not topics.isdisjoint(self._changes):
+                listener(self)
+
+    def _state(self) -> Dict[str, Tuple[Any, Any]]:
+        """
+        The value of every topic, with the key it is compared by: selected names are compared
+        together with the registry entry, so a hot-reloaded entry counts as a change.
+        """
+        theme = self.theme
+        palette_overrides = dict(self._overrides.get('palette', {}))
+        effective_mode = self.get_effective_mode()
+        state = {
+            'theme': ((self._theme_name, self._base_theme), self._theme_name),
+            'mode': (self._mode, self._mode),
+            'effective_mode': (effective_mode, effective_mode),
+            'palette': ((self._active_palette_name, self._registry.palettes.get(self._active_palette_name)),
+                        self._active_palette_name),
+            'palette_override': (palette_overrides, palette_overrides),
+        }
+        for pillar in ('texture', 'layout', 'typography'):
+            value = getattr(theme, pillar) if theme else None
+            name = getattr(theme, f'{pillar}_name', None) if theme else None
+            state[pillar] = ((name, value), value)
+        return state
+
+    def _diff(self) -> Dict[str, ThemeChange]:
+        """Compares the state with the one last delivered (refresh() reports every topic)."""
+        state, previous = self._state(), self._delivered
+        forced, self._delivered, self._forced = self._forced, state, False
+        return {
+            topic: ThemeChange(topic, previous[topic][1], value)
+            for topic, (key, value) in state.items()
+            if forced or previous[topic][0] != key
+        }
+
+    # --- Sessions ---
+
+    def session(self, client: Optional[Client] = None) -> 'ThemeManager':
+        """
+        Returns the manager scoped to a client (default: the current one), creating it on first use.
+        A session starts from this manager's current state and shares the registry's objects.
+        It is a copy, not a view: later changes to this manager (set_mode, select_theme, update_*)
+        only apply to sessions created afterwards. Change `session()` to restyle a connected client.
+        """
+        if self._client_ref is not None:
+            return self  # Already a session
+
+        client = client or context.client
+        session = self._sessions.get(client)
+        if session is None:
+            session = ThemeManager.__new__(ThemeManager)
+            session.__dict__.update(self.__dict__)
+            session._listeners = {}
+            session._dirty = False
+            session._flush_handle = None
+            session._overrides = {pillar: dict(values) for pillar, values in self._overrides.items()}
+            session._palettes = {}
+            session._sessions = weakref.WeakKeyDictionary()
+            session._client_ref = weakref.ref(client)
+            session._changes = {}
+            session._forced = False
+            session._delivered = session._state()
+            self._sessions[client] = session
+        return session
+
+    def _on_registry_reload(self, changes: RegistryChanges):
+        """Re-resolves reloaded registry entries; only the sessions that use one of them are notified."""
+        for manager in [self, *list(self._sessions.values())]:
+            manager._apply_registry_changes(changes)
+
+    def _apply_registry_changes(self, changes: RegistryChanges):
+        affected = False
+        if self._theme_name in changes.get('themes', ()):
+            theme = self._registry.themes.get(self._theme_name)
+            if theme:
+                self._base_theme = theme
+                affected = True
+        if self._active_palette_name in changes.get('palettes', ()):
+            affected = True
+        if self._texture_name in changes.get('textures', ()) or self._layout_name in changes.get('layouts', ()):
+            affected = True
+        if affected:
+            self._invalidate()  # Overrides are kept: they apply on top of the new entries
+            self._notify()
+
+    @property
+    def client(self) -> Optional[Client]:
+        """The client this session belongs to (None for the root manager)."""
+        return self._client_ref() if self._client_ref else None
+
+    # --- Copy-on-write helpers ---
+
+    def _invalidate(self):
+        self._theme = None
+        self._palettes.clear()
+
+    def _override(self, pillar: str, target: Any, values: Dict[str, Any]):
+        """Records field overrides for a pillar, ignoring unknown fields."""
+        known = {f.name for f in fields(target) if f.init}
+        accepted = {k: v for k, v in values.items() if k in known}
+        if accepted:
+            self._overrides.setdefault(pillar, {}).update(accepted)
+            self._invalidate()
+
+    def _override_palette(self, values: Dict[str, Any]):
+        """
+        Records palette overrides. The palettes already built are derived, so only the entries and
+        CSS variables that depend on the changed fields are recomputed (see Palette.derive).
+        Raises ColorCycleError, recording nothing, if an override makes a name refer back to itself.
+        """
+        palette = self.get_active_palette()
+        if not palette:
+            return
+        known = {f.name for f in fields(palette) if f.init}
+        accepted = {k: v for k, v in values.items() if k in known}
+        if not accepted:
+            return
+        palettes = {mode: self.get_active_palette(mode) for mode in ('light', 'dark')}
+        derived = {mode: base.derive(**accepted) for mode, base in palettes.items() if base}
+        for palette in derived.values():
+            palette.table  # Edits that are not derived incrementally are checked here
+        self._overrides.setdefault('palette', {}).update(accepted)
+        self._theme = None
+        self._palettes = derived
+
+    def _copy_on_write(self, pillar: str, base: Any) -> Any:
+        overrides = self._overrides.get(pillar)
+        return replace(base, **overrides) if overrides else base
+
+    def _compose_theme(self) -> Optional[Theme]:
+        base = self._base_theme
+        if base is None:
+            return None
+
+        texture = self._registry.textures.get(self._texture_name, base.texture) if self._texture_name else base.texture
+        layout = self._registry.layouts.get(self._layout_name, base.layout) if self._layout_name else base.layout
+
+        changed = (
+            self._active_palette_name != base.palette
+            or self._texture_name or self._layout_name or self._overrides
+        )
+        if not changed:
+            return base
+
+        return replace(
+            base,
+            palette=self._active_palette_name,
+            texture_name=self._texture_name or base.texture_name,
+            texture=self._copy_on_write('texture', texture),
+            layout_name=self._layout_name or base.layout_name,
+            layout=self._copy_on_write('layout', layout),
+            typography=self._copy_on_write('typography', base.typography),
+        )
+
+    def _select_palette(self, name: str):
+        if name != self._active_palette_name:
+            self._active_palette_name = name
+            self._overrides.pop('palette', None)
+        self._invalidate()
+
+    def _select_texture(self, name: str):
+        if name in self._registry.textures:
+            self._texture_name = name
+            self._overrides.pop('texture', None)
+            self._invalidate()
+
+    def _select_layout(self, name: str):
+        if name in self._registry.layouts:
+            self._layout_name = name
+            self._overrides.pop('layout', None)
+            self._invalidate()
+
+    def _reset_overrides(self):
+        self._texture_name = None
+        self._layout_name = None
+        self._overrides = {}
+        self._invalidate()
 
     # --- Actions ---
-    
+
     def apply_theme(self, theme: Theme, name: str = 'unknown'):
-        self._theme = theme
+        self._base_theme = theme
         self._theme_name = name
+        self._active_palette_name = theme.palette
+        self._reset_overrides()
         self._notify()
 
     def select_theme(self, name: str):
         """Loads a theme by name from the registry"""
         theme = self._registry.themes.get(name)
         if theme:
-            self._theme = theme
+            self._base_theme = theme
             self._theme_name = name
             # Refresh palette name from new theme
             self._active_palette_name = theme.palette
+            self._reset_overrides()
             self._notify()
 
     def set_mode(self, mode: Literal['light', 'dark', 'auto']):
@@ -50,38 +357,78 @@ class ThemeManager:
         self._notify()
 
     def set_palette(self, name: str):
-        self._active_palette_name = name
-        if self._theme:
-            self._theme.palette = name
+        self._select_palette(name)
+        self._notify()
+
+    def set_texture(self, name: str):
+        """Selects a registry texture, dropping previous texture overrides"""
+        self._select_texture(name)
+        self._notify()
+
+    def set_layout(self, name: str):
+        """Selects a registry layout, dropping previous layout overrides"""
+        self._select_layout(name)
         self._notify()
-        
+
     def refresh(self):
-        """Force a notification to update listeners (useful if generic properties changed)"""
+        """Force a notification to update listeners (useful if generic properties changed), every topic included"""
+        self._forced = True
         self._notify()
 
-    def update_primary_color(self, color: str):
-        # Logic to update specific part of the data model
-        current_palette = self.get_active_palette()
-        if current_palette:
-            current_palette.primary = color
+    def update_palette(self, **values):
+        """Overrides fields of the active palette (e.g. primary='blue'), see _override_palette"""
+        if self.get_active_palette():
+            self._override_palette(values)
+            self._notify()
+
+    def update_texture(self, **values):
+        """Overrides fields of the active texture (e.g. blur=4)"""
+        if self.theme:
+            self._override('texture', self.theme.texture, values)
             self._notify()
 
+    def update_layout(self, **values):
+        """Overrides fields of the active layout (e.g. roundness=12)"""
+        if self.theme:
+            self._override('layout', self.theme.layout, values)
+            self._notify()
+
+    def update_typography(self, **values):
+        """Overrides fields of the active typography (e.g. scale=1.2)"""
+        if self.theme:
+            self._override('typography', self.theme.typography, values)
+            self._notify()
+
+    def update_primary_color(self, color: str):
+        self.update_palette(primary=color)
+
     def update_secondary_color(self, color: str):
         # Logic to update secondary accent color
-        current_palette = self.get_active_palette()
-        if current_palette:
-            current_palette.secondary = color
-            self._notify()
+        self.update_palette(secondary=color)
 
     # --- Getters (Computed Properties) ---
 
+    def cache_key(self) -> tuple:
+        """
+        Identifies everything that affects the compiled output (see ThemeCompiler).
+        The mode is not part of it: the output holds the variables for both modes.
+        The registry version retires outputs compiled from entries that were since reloaded.
+        """
+        overrides = tuple(sorted(
+            (pillar, _frozen(values)) for pillar, values in self._overrides.items()
+        ))
+        return (
+            id(self._base_theme), self._active_palette_name,
+            self._texture_name, self._layout_name, overrides, self._registry.version,
+        )
+
     def get_effective_mode(self) -> str:
         if self._mode == 'auto':
             # When in auto mode, check the detected browser preference
             # This will be set by JavaScript media query detection
-            return getattr(self, '_detected_mode', 'light')
+            return self._detected_mode
         return self._mode
-    
+
     def set_detected_mode(self, mode: Literal['light', 'dark']):
         """Sets the detected browser preference (called from JavaScript)"""
         self._detected_mode = mode
@@ -90,55 +437,74 @@ class ThemeManager:
             self._notify()
 
     def apply_preferences(self, prefs: dict):
-        """Applies a batch of preferences (e.g. from localStorage)"""
-        if 'mode' in prefs: self._mode = prefs['mode']
-        if 'palette' in prefs: 
-            self._active_palette_name = prefs['palette']
-            if self._theme: self._theme.palette = prefs['palette']
-        
-        if self._theme:
-            if 'texture' in prefs: 
-                self._theme.texture_name = prefs['texture']
-                tex = self._registry.textures.get(prefs['texture'])
-                if tex: self._theme.texture = tex
-                
-            if 'layout' in prefs: 
-                self._theme.layout_name = prefs['layout']
-                lay = self._registry.layouts.get(prefs['layout'])
-                if lay: self._theme.layout = lay
-            
-            if 'typography' in prefs:
-                typo_refs = prefs['typography']
-                if self._theme.typography:
-                    for k, v in typo_refs.items():
-                        if hasattr(self._theme.typography, k):
-                            setattr(self._theme.typography, k, v)
-        
+        """
+        Applies a batch of preferences (e.g. from localStorage or the nt_prefs cookie). They come
+        from the browser and may be stale or malformed: entries with an unknown name or of the
+        wrong shape are dropped instead of raising.
+        """
+        if not isinstance(prefs, dict):
+            return
+        if prefs.get('mode') in ('light', 'dark', 'auto'): self._mode = prefs['mode']
+        if self._is_entry(self._registry.palettes, prefs.get('palette')): self._select_palette(prefs['palette'])
+
+        if self._base_theme:
+            if self._is_entry(self._registry.textures, prefs.get('texture')): self._select_texture(prefs['texture'])
+            if self._is_entry(self._registry.layouts, prefs.get('layout')): self._select_layout(prefs['layout'])
+            typography = self._valid_overrides(self._base_theme.typography, prefs.get('typography'))
+            if typography:
+                self._override('typography', self._base_theme.typography, typography)
+
         # Palette overrides (active palette)
-        if 'palette_overrides' in prefs:
-            p = self.get_active_palette()
-            if p:
-                for k, v in prefs['palette_overrides'].items():
-                    if hasattr(p, k):
-                        setattr(p, k, v)
-        
+        palette = self.get_active_palette()
+        overrides = self._valid_overrides(palette, prefs.get('palette_overrides')) if palette else None
+        if overrides:
+            overrides.pop('name', None)
+            overrides.pop('mode', None)
+            try:
+                self._override_palette(overrides)
+            except ValueError:
+                pass  # e.g. a reference cycle in stale prefs
+
+        self._theme = None  # each pillar change above invalidated what it touched
         self._notify()
 
-    def get_active_palette(self) -> Optional[Palette]:
-        if not self._theme: return None
-        # Get the palette name from the theme
-        palette_name = self._theme.palette
-        # Get the palette from the registry
-        palettes = self._registry.palettes.get(palette_name)
-        if not palettes: return None
-        return palettes.get(self.get_effective_mode())
-    
+    @staticmethod
+    def _is_entry(entries: Mapping[str, Any], name: Any) -> bool:
+        return isinstance(name, str) and name in entries
+
+    @staticmethod
+    def _valid_overrides(target: Any, values: Any) -> Dict[str, Any]:
+        """The entries of stored overrides that name a field of `target` and match its value's shape."""
+        if not isinstance(values, dict):
+            return {}
+        known = {f.name for f in fields(target) if f.init}
+        return {k: v for k, v in values.items() if k in known and _same_kind(getattr(target, k), v)}
+
+    def get_active_palette(self, mode: Optional[Literal['light', 'dark']] = None) -> Optional[Palette]:
+        """The active palette for a mode (default: the effective one), with overrides applied."""
+        if not self._base_theme: return None
+        mode = mode or self.get_effective_mode()
+        palette = self._palettes.get(mode)
+        if palette is None:
+            # Get the palette from the registry
+            palettes = self._registry.palettes.get(self._active_palette_name)
+            if not palettes or mode not in palettes: return None
+            palette = self._copy_on_write('palette', palettes[mode])
+            self._palettes[mode] = palette
+        return palette
+
+    @property
+    def registry(self) -> ThemeRegistry:
+        return self._registry
+
     @property
     def theme_name(self) -> str:
         return self._theme_name
 
     @property
     def theme(self) -> Optional[Theme]:
+        if self._theme is None:
+            self._theme = self._compose_theme()
         return self._theme
 
     @property
@@ -1,110 +1,791 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import hmac
+import inspect
+import logging
 import os
+import pickle
+import threading
+import weakref
 import yaml
-from typing import Dict, Optional, List
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (Any, Callable, Dict, Iterable, Iterator, Optional, List, MutableMapping, Sequence, Set, Tuple,
+                    TypeVar)
 from pathlib import Path
-from nicegui import app
-from .themes import Palette, Texture, Layout, Theme, Typography
+from nicegui import app, background_tasks
+from .themes import ColorCycleError, Palette, Texture, Layout, Theme, Typography, build_contrast, build_ramps, color_map
+from .fonts import DEFAULT_SUBSETS, FontFace, FontMetrics, FontStore, _write_atomic
+
+logger = logging.getLogger(__name__)
+
+# libyaml's C parser is ~8x faster than the pure-Python one; fall back when it isn't compiled in
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Below this many files a pool costs more than it saves
+PARALLEL_SCAN_MIN_FILES = 16
+
+# Built entries of each themes directory, kept in a private cache directory rather than in the
+# (possibly shared, or installed) themes directory; bump the version when the dataclasses in
+# themes.py or the way they are built changes
+DEFAULT_SNAPSHOT_DIR = Path.home() / ".cache" / "nicetheme" / "snapshots"
+SNAPSHOT_VERSION = 9
+
+# Random key of a snapshot directory: snapshots are HMAC-signed with it and only unpickled if the
+# signature matches, so a file planted in the cache is never unpickled
+SNAPSHOT_KEY = "snapshot.key"
+
+# Snapshot entry per YAML file: relative path -> ((mtime_ns, size), content hash, pickled entry)
+SnapshotEntry = Tuple[Tuple[int, int], str, bytes]
+
+# Bundled themes, always scanned after the user's directories
+INTERNAL_THEMES = Path(__file__).parent.parent / "themes"
+
+# Directories of a themes dir that hold components; YAML files at its top level are themes
+COMPONENT_KINDS = ("palettes", "textures", "layouts")
+
+# Changed entry names per kind ("palettes", "textures", "layouts", "themes"), as passed to on_reload listeners
+RegistryChanges = Dict[str, Set[str]]
+
+T = TypeVar("T")
+
+
+def _load_yaml(file: Path) -> Any:
+    """Parses one YAML file (None if it cannot be read or parsed, like an empty file)."""
+    try:
+        with open(file, "r") as f:
+            return yaml.load(f, Loader=YamlLoader)
+    except Exception:
+        return None
+
+
+def _digest(file: Path) -> str:
+    return hashlib.sha256(file.read_bytes()).hexdigest()[:16]
+
+
+class LazyEntries(MutableMapping[str, T]):
+    """
+    Registry entries by name, each built from its file on first access.
+    Iterating and len() only use the index; items() and values() build every entry and skip
+    files that turn out to be invalid, like a full scan would have.
+    """
+
+    def __init__(self, load: Callable[[Path], Optional[T]]):
+        self._load = load
+        self._files: Dict[str, Optional[Path]] = {} # Name -> source file (None if set directly)
+        self._entries: Dict[str, T] = {}
+
+    def add(self, name: str, file: Path):
+        """Indexes a name without loading it (replacing an earlier entry of that name)."""
+        self._files[name] = file
+        self._entries.pop(name, None)
+
+    def file(self, name: str) -> Optional[Path]:
+        return self._files.get(name)
+
+    def put(self, name: str, file: Optional[Path], value: T):
+        """Indexes a name with an entry that is already built."""
+        self._files[name] = file
+        self._entries[name] = value
+
+    def peek(self, name: str) -> Optional[T]:
+        """The entry if it was built already (never loads)."""
+        return self._entries.get(name)
+
+    def copy(self, load: Optional[Callable[[Path], Optional[T]]] = None) -> 'LazyEntries[T]':
+        """A shallow copy sharing the built entries, optionally with another loader."""
+        entries: LazyEntries[T] = LazyEntries(load or self._load)
+        entries._files = dict(self._files)
+        entries._entries = dict(self._entries)
+        return entries
+
+    @property
+    def loaded(self) -> List[str]:
+        """Names of the entries built so far."""
+        return list(self._entries)
+
+    def load_all(self):
+        for name in list(self._files):
+            self.get(name)
+
+    def __getitem__(self, name: str) -> T:
+        try:
+            return self._entries[name]
+        except KeyError:
+            pass
+        file = self._files[name]
+        value = self._load(file) if file is not None else None
+        if value is None:
+            del self._files[name] # Invalid file: forget the name, as a full scan would
+            raise KeyError(name)
+        self._entries[name] = value
+        return value
+
+    def __setitem__(self, name: str, value: T):
+        self._files.setdefault(name, None)
+        self._entries[name] = value
+
+    def __delitem__(self, name: str):
+        del self._files[name]
+        self._entries.pop(name, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._files))
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def items(self) -> List[Tuple[str, T]]: # type: ignore[override]
+        self.load_all()
+        return list(self._entries.items())
+
+    def values(self) -> List[T]: # type: ignore[override]
+        self.load_all()
+        return list(self._entries.values())
+
+    def __repr__(self) -> str:
+        return f"LazyEntries({len(self._files)} indexed, {len(self._entries)} loaded)"
+
+
+@functools.lru_cache(maxsize=None)
+def _snapshot_key(directory: Path) -> bytes:
+    """The signing key of a snapshot directory, created (readable by this user only) on first use."""
+    file = directory / SNAPSHOT_KEY
+    try:
+        return file.read_bytes()
+    except FileNotFoundError:
+        pass
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    try:
+        fd = os.open(file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return file.read_bytes()  # Created by another worker meanwhile
+    key = os.urandom(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class _Snapshot:
+    """
+    The built entries of one themes directory, stored in `directory` under a name derived from
+    the themes directory's path. Entries are pickled one by one, so reading the snapshot stays
+    cheap and an entry is only unpickled when the registry loads it. The file is signed with the
+    directory's key (see _snapshot_key); a file without a valid signature is ignored.
+    """
+
+    def __init__(self, path: Path, enabled: bool = True, directory: Optional[Path] = None):
+        self.path = path
+        self.enabled = enabled
+        self.directory = Path(directory) if directory else DEFAULT_SNAPSHOT_DIR
+        self.file = self.directory / f"{hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:16]}.pickle"
+        self.dirty = False
+        self._entries: Optional[Dict[str, SnapshotEntry]] = None
+
+    @property
+    def entries(self) -> Dict[str, SnapshotEntry]:
+        if self._entries is None:
+            self._entries = self._read() if self.enabled else {}
+        return self._entries
+
+    def _sign(self, data: bytes) -> bytes:
+        return hmac.new(_snapshot_key(self.directory), data, hashlib.sha256).digest()
+
+    def _read(self) -> Dict[str, SnapshotEntry]:
+        """Reads the snapshot file (empty if missing, unreadable, unsigned or from another version)."""
+        try:
+            content = self.file.read_bytes()
+            signature, data = content[:32], content[32:]
+            if not hmac.compare_digest(signature, self._sign(data)):
+                return {}
+            snapshot = pickle.loads(data)
+            if snapshot.get("version") == SNAPSHOT_VERSION and snapshot.get("path") == str(self.path.resolve()):
+                return snapshot["entries"]
+        except Exception:
+            pass
+        return {}
+
+    def is_current(self, file: Path) -> bool:
+        """Whether the snapshot holds `file` as it is now (without unpickling it)."""
+        entry = self.entries.get(file.relative_to(self.path).as_posix())
+        if not entry:
+            return False
+        stat = file.stat()
+        return entry[0] == (stat.st_mtime_ns, stat.st_size) or entry[1] == _digest(file)
+
+    def load(self, file: Path, build: Callable[[Path], Any]) -> Any:
+        """
+        The entry for `file`: unpickled if its mtime and size (or else its content hash) match,
+        otherwise `build(file)`, which is then added to the snapshot.
+        """
+        if not self.enabled:
+            return build(file)
+        key = file.relative_to(self.path).as_posix()
+        stat = file.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self.entries.get(key)
+        if entry and entry[0] == signature:
+            try:
+                return pickle.loads(entry[2])
+            except Exception:
+                entry = None
+        digest = _digest(file)
+        try:
+            if not entry or entry[1] != digest:
+                raise LookupError(key)
+            data = entry[2]
+            value = pickle.loads(data)
+        except Exception:
+            value = build(file)
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.entries[key] = (signature, digest, data)
+        self.dirty = True
+        return value
+
+    def save(self, files: List[Path]):
+        """Writes the snapshot if entries were added or `files` no longer has some of them."""
+        if not self.enabled or self._entries is None:
+            return
+        keys = {file.relative_to(self.path).as_posix() for file in files}
+        removed = [key for key in self._entries if key not in keys]
+        for key in removed:
+            del self._entries[key]
+        if not (self.dirty or removed):
+            return
+        data = pickle.dumps({"version": SNAPSHOT_VERSION, "path": str(self.path.resolve()), "entries": self._entries},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            signature = self._sign(data)
+            _write_atomic(self.file, signature + data)
+            self.dirty = False
+        except OSError:
+            pass # Read-only cache directory: build from YAML every time
+
+
+@dataclass(frozen=True)
+class RegistryState:
+    """
+    One consistent version of the registry's entries. Reloads build a new state from copies
+    and publish it with a single assignment, so readers never see a half-loaded catalog.
+    """
+    palettes: LazyEntries[Dict[str, Palette]]
+    textures: LazyEntries[Texture]
+    layouts: LazyEntries[Layout]
+    themes: LazyEntries[Theme]
+    version: int = 0
+
 
 class ThemeRegistry:
     """
     Scans and registers theme components (palettes, textures, layouts, fonts) from a directory.
+    Google families are resolved through a local FontStore (`font_cache`, `offline_fonts`), local
+    fonts are split into WOFF2 files per Unicode range in `font_subsets` (None keeps the raw files).
+
+    The scan only indexes names and files: `palettes`, `textures`, `layouts` and `themes` are
+    LazyEntries that build an entry the first time it is used. Later directories override
+    earlier ones. With `lazy=False` everything is built up front (see `preload`), parsing the
+    YAML serially, or in parallel with `scan_executor` 'thread' or 'process'.
+
+    With `snapshot` enabled, built entries are pickled to one signed file per themes directory in
+    `snapshot_dir` (default ~/.cache/nicetheme/snapshots), on preload and at exit. Later runs
+    unpickle the entries of files whose mtime and size (or, failing that, content hash) are
+    unchanged instead of parsing them.
+
+    With `watch` (needs watchfiles), changed YAML files are re-parsed while the app runs and a
+    new RegistryState is swapped in; `on_reload` listeners (the ThemeManager) get the changes.
+
+    Use `ThemeRegistry.shared()` to get the one registry of the process for a set of directories.
     """
 
-    def __init__(self, themes_dirs: Optional[List[Path]] = None):
-        self.themes_dirs = themes_dirs or []
-        
-        # Always include the internal themes directory
-        internal_themes = Path(__file__).parent.parent / "themes"
-        if internal_themes not in self.themes_dirs:
-            self.themes_dirs.append(internal_themes)
+    # Process-wide registries by resolved themes directories (see shared)
+    _shared: Dict[Tuple[Path, ...], 'ThemeRegistry'] = {}
+    _shared_lock = threading.Lock()
+    scan_count = 0 # Scans run in this process, by all registries
+
+    def __init__(self, themes_dirs: Optional[List[Path]] = None, font_cache: Optional[Path] = None,
+                 offline_fonts: bool = False, font_subsets: Optional[Sequence[str]] = DEFAULT_SUBSETS,
+                 scan_executor: Optional[str] = None, scan_workers: Optional[int] = None,
+                 snapshot: bool = True, snapshot_dir: Optional[Path] = None, lazy: bool = True,
+                 watch: bool = False):
+        self.themes_dirs = self._with_internal(themes_dirs)
         
-        self.palettes: Dict[str, Dict[str, Palette]] = {}
-        self.textures: Dict[str, Texture] = {}
-        self.layouts: Dict[str, Layout] = {}
+        self.state: Optional[RegistryState] = None # palettes, textures, layouts, themes (see scan)
         self.fonts: Dict[str, str] = {} # Name -> Relative Path or URL
         self.font_files: Dict[str, Path] = {} # Name -> Absolute Path
-        self.themes: Dict[str, Theme] = {}
+        self.font_store = FontStore(font_cache, offline=offline_fonts) # Google Fonts, served locally
+        self.font_subsets = font_subsets
+        self.font_faces: Dict[str, List[FontFace]] = {} # Name -> optimized (url, unicode-range) faces
+        self.font_metrics: Dict[str, FontMetrics] = {} # Name -> metrics for the fallback @font-face
+
+        self.scan_executor = scan_executor
+        self.scan_workers = scan_workers
+        self.snapshot = snapshot
+        self.snapshot_dir = snapshot_dir
+        self.lazy = lazy
+        self.parsed_files = 0 # YAML files parsed so far (not taken from a snapshot)
+        self._snapshots: Dict[Path, _Snapshot] = {} # Themes dir -> snapshot
+        self._parsed: Dict[Path, Any] = {} # YAML parsed ahead of building, by preload()
+        self._built: Dict[Path, Any] = {} # Palettes built ahead (with their ramps in one batch), by preload()
+        self._reload_listeners: List[Callable[[], Optional[Callable[[RegistryChanges], None]]]] = []
+        self._options: Optional[inspect.BoundArguments] = None # Constructor options, for shared() instances
 
         self.scan()
+        _registries.add(self)
+        if watch:
+            self.watch()
+
+    @classmethod
+    def shared(cls, themes_dirs: Optional[List[Path]] = None, **options) -> 'ThemeRegistry':
+        """
+        The process-wide registry for these themes directories, created (and scanned) on first use.
+        `options` are passed to the constructor. Later calls may leave them out, but raise ValueError
+        if they ask for other values than the registry was created with (defaults included).
+        """
+        dirs = cls._with_internal(themes_dirs)
+        key = tuple(path.resolve() for path in dirs)
+        with cls._shared_lock:
+            registry = cls._shared.get(key)
+            if registry is None:
+                registry = cls._shared[key] = cls(themes_dirs=dirs, **options)
+                registry._options = inspect.signature(cls).bind_partial(**options)
+                registry._options.apply_defaults()
+                return registry
+        created = registry._options.arguments
+        conflicts = sorted(name for name, value in options.items() if created.get(name, value) != value)
+        if conflicts:
+            raise ValueError(
+                f"The shared registry for {', '.join(map(str, dirs))} already exists with other options: "
+                + ', '.join(f'{name}={created[name]!r} (asked for {options[name]!r})' for name in conflicts)
+                + ". Pass them on the first call (e.g. nt.initialize before creating a ThemeManager)."
+            )
+        return registry
+
+    @staticmethod
+    def _with_internal(themes_dirs: Optional[List[Path]]) -> List[Path]:
+        """The given directories followed by the internal one (always included)."""
+        dirs = [Path(path) for path in themes_dirs or []]
+        if INTERNAL_THEMES not in dirs:
+            dirs.append(INTERNAL_THEMES)
+        return dirs
+
+    @property
+    def palettes(self) -> LazyEntries[Dict[str, Palette]]:
+        return self.state.palettes
+
+    @property
+    def textures(self) -> LazyEntries[Texture]:
+        return self.state.textures
+
+    @property
+    def layouts(self) -> LazyEntries[Layout]:
+        return self.state.layouts
+
+    @property
+    def themes(self) -> LazyEntries[Theme]:
+        return self.state.themes
+
+    @property
+    def version(self) -> int:
+        """Incremented every time a scan or reload publishes a new state."""
+        return self.state.version if self.state else 0
 
     def scan(self):
-        """Scans the themes directories for components."""
-        for path in self.themes_dirs:
-            if not path.exists():
-                continue
+        """Indexes the themes directories; entries are built on first access (or by preload)."""
+        ThemeRegistry.scan_count += 1
+        dirs = [path for path in self.themes_dirs if path.exists()]
+        self._snapshots = {path: _Snapshot(path, self.snapshot, self.snapshot_dir) for path in dirs}
 
-            self._scan_palettes(path / "palettes")
-            self._scan_textures(path / "textures")
-            self._scan_layouts(path / "layouts")
+        textures: LazyEntries[Texture] = LazyEntries(self._load_texture)
+        layouts: LazyEntries[Layout] = LazyEntries(self._load_layout)
+        components = {
+            "palettes": LazyEntries(self._load_palettes),
+            "textures": textures,
+            "layouts": layouts,
+        }
+        themes = LazyEntries(functools.partial(self._load_theme, textures=textures, layouts=layouts))
+        for path in dirs:
+            for kind, entries in components.items():
+                for file in self._yaml_files(path / kind):
+                    entries.add(file.stem, file)
             self._scan_fonts(path / "fonts")
-            self._scan_themes(path)
+            for file in self._yaml_files(path):
+                themes.add(file.stem, file)
+        self.state = RegistryState(components["palettes"], textures, layouts, themes, self.version + 1)
 
-    def _scan_palettes(self, path: Path):
-        if not path.exists(): return
-        for file in path.glob("*.yaml"):
+        if not self.lazy:
+            self.preload()
+
+        self.measure_fonts()
+        if self.font_subsets:
+            self.optimize_fonts()
+
+    def preload(self):
+        """Builds every entry now (parsing changed YAML files in parallel) and saves the snapshots."""
+        all_entries = (self.palettes, self.textures, self.layouts, self.themes)
+        files = [entries.file(name) for entries in all_entries for name in entries]
+        stale = [file for file in files if file is not None and not self._is_current(file)]
+        self._parsed = dict(zip(stale, self._parse_files(stale)))
+        try:
+            palette_files = {self.palettes.file(name) for name in self.palettes}
+            self._prebuild_palettes([file for file in stale if file in palette_files])
+            for entries in all_entries:
+                entries.load_all()
+        finally:
+            self._parsed = {}
+            self._built = {}
+        self.save_snapshot()
+
+    def _prebuild_palettes(self, files: List[Path]):
+        """Builds parsed palette files, generating the ramps and contrast indexes of the whole batch in one call each."""
+        for file in files:
             try:
-                with open(file, "r") as f:
-                    data = yaml.safe_load(f)
-                    
-                    # Handle 'palette' root key if present
-                    if 'palette' in data:
-                        data = data['palette']
-                    
-                    # Extract common and specific fields
-                    common = data.copy()
-                    dark_spec = common.pop('dark', {})
-                    light_spec = common.pop('light', {})
-                    
-                    # Create Dark Palette
-                    # Merge logic: dark_spec overrides common
-                    dark_data = common.copy()
-                    dark_data.update(dark_spec)
-                    dark_data['mode'] = 'dark'
-                    dark_palette = Palette(**dark_data)
-                    
-                    # Create Light Palette
-                    # Merge logic: light_spec overrides (common merged with dark??)
-                    # YAML said: "light: inherit from the dark for undefined fields"
-                    # So Light Base = Dark Data (which is Common + Dark Overrides)
-                    light_data = dark_data.copy()
-                    # We need to remove 'mode' before update or overwrite it later
-                    # Update with light spec
-                    light_data.update(light_spec)
-                    light_data['mode'] = 'light'
-                    light_palette = Palette(**light_data)
-
-                    self.palettes[file.stem] = {
-                        'light': light_palette,
-                        'dark': dark_palette
-                    }
+                self._built[file] = self._build_palettes(self._parsed[file], index=False)
+                del self._parsed[file]
             except Exception:
-                pass
+                pass  # Built (and rejected) again by _load_entry
+        palettes = [palette for pair in self._built.values() for palette in pair.values()]
+        build_ramps(palettes)
+        build_contrast(palettes)
 
-    def _scan_textures(self, path: Path):
-        if not path.exists(): return
-        for file in path.glob("*.yaml"):
+    def save_snapshot(self):
+        """Writes the entries built so far to the snapshot of each themes directory (also done at exit)."""
+        for path, snapshot in self._snapshots.items():
+            snapshot.save(self._catalog_files(path))
+
+    @staticmethod
+    def _yaml_files(path: Path) -> List[Path]:
+        return sorted(path.glob("*.yaml")) if path.exists() else []
+
+    def _catalog_files(self, path: Path) -> List[Path]:
+        files: List[Path] = []
+        for kind in COMPONENT_KINDS:
+            files += self._yaml_files(path / kind)
+        return files + self._yaml_files(path)
+
+    def _snapshot_for(self, file: Path) -> Optional[_Snapshot]:
+        """The snapshot of the themes directory a YAML file belongs to."""
+        return self._snapshots.get(file.parent) or self._snapshots.get(file.parent.parent)
+
+    def _is_current(self, file: Path) -> bool:
+        try:
+            return self._snapshot_for(file).is_current(file)
+        except Exception:
+            return False
+
+    # --- Hot reload ---
+
+    def on_reload(self, callback: Callable[[RegistryChanges], None]):
+        """Registers a listener called with the changed names after a reload published a new state.
+
+        Bound methods are held weakly, so a manager that subscribes does not outlive its last reference.
+        """
+        if callback in self._listeners():
+            return
+        if inspect.ismethod(callback):
+            self._reload_listeners.append(weakref.WeakMethod(callback))
+        else:
+            self._reload_listeners.append(lambda: callback)
+
+    def off_reload(self, callback: Callable[[RegistryChanges], None]):
+        """Removes a listener registered with `on_reload`."""
+        self._reload_listeners = [ref for ref in self._reload_listeners if ref() not in (None, callback)]
+
+    def _listeners(self) -> List[Callable[[RegistryChanges], None]]:
+        """The live reload listeners; references to collected managers are pruned."""
+        pairs = [(ref, ref()) for ref in self._reload_listeners]
+        self._reload_listeners = [ref for ref, listener in pairs if listener is not None]
+        return [listener for _, listener in pairs if listener is not None]
+
+    def reload(self, files: Iterable[Path], parsed: Optional[Dict[Path, Any]] = None) -> RegistryChanges:
+        """
+        Re-parses the given (changed, added or removed) YAML files and publishes a new state.
+        `parsed` holds YAML already parsed for some of them (see watch).
+        """
+        files = sorted({Path(file) for file in files})
+        self._parsed.update(parsed or {})
+        try:
+            state, changes = self._prepare_reload(files)
+        finally:
+            for file in files:
+                self._parsed.pop(file, None)
+        self._publish(state, changes)
+        return changes
+
+    def watch(self):
+        """
+        Reloads changed theme YAML files while the app runs (needs the `watchfiles` package).
+        Starts with the app, or right away if it is already running.
+        """
+        from watchfiles import awatch
+
+        async def watch_themes():
+            dirs = [str(path) for path in self.themes_dirs if path.exists()]
+            async for changes in awatch(*dirs, watch_filter=lambda _, path: path.endswith(".yaml")):
+                files = sorted({Path(path) for _, path in changes})
+                # Only the parsing runs off the event loop: entries, snapshots and the state are built
+                # and published on it, so they are never changed by two threads at once
+                parsed = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: {file: _load_yaml(file) for file in files if file.exists()})
+                self.reload(files, parsed)
+
+        if app.is_started or app.is_starting:
+            background_tasks.create(watch_themes(), name='nicetheme watch themes')  # Created at runtime
+        else:
+            app.on_startup(watch_themes)
+
+    def _prepare_reload(self, files: Iterable[Path]) -> Tuple[RegistryState, RegistryChanges]:
+        """
+        Builds the next state from copies of the current one, parsing only the changed files.
+        A file that no longer builds (e.g. saved half-way) keeps its last good entry.
+        """
+        old = self.state
+        textures, layouts = old.textures.copy(), old.layouts.copy()
+        mappings: Dict[str, LazyEntries] = {
+            "palettes": old.palettes.copy(),
+            "textures": textures,
+            "layouts": layouts,
+            "themes": old.themes.copy(functools.partial(self._load_theme, textures=textures, layouts=layouts)),
+        }
+        changes: RegistryChanges = {kind: set() for kind in mappings}
+        for file in sorted({Path(file) for file in files}):
+            kind = self._kind_of(file)
+            if kind is None:
+                continue
+            entries = mappings[kind]
+            current = self._entry_file(kind, file.stem) # Another directory may still define the name
+            if current is None:
+                entries.pop(file.stem, None)
+            elif not self._rebuild(entries, file.stem, current):
+                continue
+            changes[kind].add(file.stem)
+
+        # Themes hold their texture and layout objects: rebuild the loaded ones that used a changed name
+        themes = mappings["themes"]
+        for name in themes.loaded:
+            theme = themes.peek(name)
+            file = themes.file(name)
+            if file is not None and (theme.texture_name in changes["textures"]
+                                     or theme.layout_name in changes["layouts"]):
+                if self._rebuild(themes, name, file):
+                    changes["themes"].add(name)
+
+        state = RegistryState(mappings["palettes"], textures, layouts, themes, old.version + 1)
+        return state, {kind: names for kind, names in changes.items() if names}
+
+    @staticmethod
+    def _rebuild(entries: LazyEntries, name: str, file: Path) -> bool:
+        """
+        Builds an entry again from `file`, now, so readers of the new state never wait. If it does
+        not build, the last good entry is kept (or, if it was never loaded, it fails when used).
+        """
+        previous, previous_file = entries.peek(name), entries.file(name)
+        entries.add(name, file)
+        if entries.get(name) is not None:
+            return True
+        if previous is not None:
+            logger.warning("%s is invalid, keeping the last good entry of %r", file, name)
+            entries.put(name, previous_file, previous)
+        else:
+            logger.warning("%s is invalid", file)
+            entries.add(name, file)
+        return False
+
+    def _publish(self, state: RegistryState, changes: RegistryChanges):
+        if not changes:
+            return
+        self.state = state
+        for listener in self._listeners():
+            listener(changes)
+
+    def _kind_of(self, file: Path) -> Optional[str]:
+        """'themes' or the component kind of a YAML file in one of the themes directories."""
+        if file.suffix != ".yaml":
+            return None
+        parent = file.parent.resolve()
+        for path in self.themes_dirs:
+            root = path.resolve()
+            if parent == root:
+                return "themes"
+            if parent.parent == root and parent.name in COMPONENT_KINDS:
+                return parent.name
+        return None
+
+    def _entry_file(self, kind: str, name: str) -> Optional[Path]:
+        """The file a name resolves to now (the last themes directory that defines it)."""
+        for path in reversed(self.themes_dirs):
+            file = (path if kind == "themes" else path / kind) / f"{name}.yaml"
+            if file.exists():
+                return file
+        return None
+
+    def _parse_files(self, files: List[Path]) -> List[Any]:
+        """Parses files with the configured pool, results in the order of `files`."""
+        if not self.scan_executor or len(files) < PARALLEL_SCAN_MIN_FILES:
+            return [_load_yaml(file) for file in files]
+
+        workers = self.scan_workers or min(32, (os.cpu_count() or 1) + 4)
+        pool: Executor
+        if self.scan_executor == 'process':
+            workers = self.scan_workers or os.cpu_count() or 1
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+        with pool:
+            return list(pool.map(_load_yaml, files, chunksize=max(1, len(files) // (workers * 4))))
+
+    def measure_fonts(self):
+        """Reads local font metrics, used for layout-shift free fallbacks (needs fontTools)."""
+        for name, file in self.font_files.items():
             try:
-                with open(file, "r") as f:
-                    data = yaml.safe_load(f)
-                    self.textures[file.stem] = Texture(**data)
+                self.font_metrics[name] = FontMetrics.from_file(file)
+            except ImportError:
+                return
             except Exception:
                 pass
 
-    def _scan_layouts(self, path: Path):
-        if not path.exists(): return
-        for file in path.glob("*.yaml"):
+    def optimize_fonts(self):
+        """Subsets local fonts to WOFF2 (cached by content hash, so only new fonts cost time)."""
+        for name, file in self.font_files.items():
             try:
-                with open(file, "r") as f:
-                    data = yaml.safe_load(f)
-                    self.layouts[file.stem] = Layout(**data)
+                self.font_faces[name] = self.font_store.optimize(file, self.font_subsets)
+            except ImportError:
+                return  # fontTools not installed: serve the raw files
             except Exception:
                 pass
 
+    def _load_entry(self, file: Path, build: Callable[[Any], Any]) -> Any:
+        """Builds the entry of one file, through its directory's snapshot (None if the file is invalid)."""
+        def from_yaml(file: Path) -> Any:
+            self.parsed_files += 1
+            if file in self._built:
+                return self._built.pop(file)
+            data = self._parsed.pop(file) if file in self._parsed else _load_yaml(file)
+            try:
+                return build(data)
+            except ColorCycleError as error:
+                logger.warning("%s skipped: color reference cycle %s", file, error)
+                return None
+            except Exception:
+                return None
+
+        try:
+            snapshot = self._snapshot_for(file)
+            return snapshot.load(file, from_yaml) if snapshot else from_yaml(file)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _build_palettes(data: Any, index: bool = True) -> Dict[str, Palette]:
+        # Handle 'palette' root key if present
+        if 'palette' in data:
+            data = data['palette']
+        
+        # Extract common and specific fields
+        common = data.copy()
+        dark_spec = common.pop('dark', {})
+        light_spec = common.pop('light', {})
+
+        # Freeze the color maps first, so both variants share them unless a mode redefines one
+        for spec in (common, dark_spec, light_spec):
+            for key in ('colors', 'greys'):
+                if key in spec:
+                    spec[key] = color_map(spec[key])
+        
+        # Create Dark Palette
+        # Merge logic: dark_spec overrides common
+        dark_data = common.copy()
+        dark_data.update(dark_spec)
+        dark_data['mode'] = 'dark'
+        dark_palette = Palette(**dark_data)
+        
+        # Create Light Palette
+        # Merge logic: light_spec overrides (common merged with dark??)
+        # YAML said: "light: inherit from the dark for undefined fields"
+        # So Light Base = Dark Data (which is Common + Dark Overrides)
+        light_data = dark_data.copy()
+        # We need to remove 'mode' before update or overwrite it later
+        # Update with light spec
+        light_data.update(light_spec)
+        light_data['mode'] = 'light'
+        light_palette = Palette(**light_data)
+
+        # Pre-resolve every name so lookups are O(1) at runtime, then index both variants in one batch
+        dark_palette.compile()
+        light_palette.compile()
+        if index:
+            build_ramps((dark_palette, light_palette))
+            build_contrast((dark_palette, light_palette))
+
+        return {
+            'light': light_palette,
+            'dark': dark_palette
+        }
+
+    def _load_palettes(self, file: Path) -> Optional[Dict[str, Palette]]:
+        return self._load_entry(file, self._build_palettes)
+
+    def _load_texture(self, file: Path) -> Optional[Texture]:
+        return self._load_entry(file, lambda data: Texture(**data))
+
+    def _load_layout(self, file: Path) -> Optional[Layout]:
+        return self._load_entry(file, lambda data: Layout(**data))
+
+    def _load_theme(self, file: Path, textures: LazyEntries[Texture], layouts: LazyEntries[Layout]) -> Optional[Theme]:
+        # Themes are kept as data: they reference textures/layouts that may live in other directories
+        data = self._load_entry(file, dict)
+        if data is None:
+            return None
+        try:
+            return self._build_theme(data, textures, layouts)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _build_theme(data: Dict[str, Any], textures: LazyEntries[Texture], layouts: LazyEntries[Layout]) -> Theme:
+        # Resolve texture and layout references
+        texture_name = data.get('texture')
+        layout_name = data.get('layout')
+
+        # Ensure texture and layout are never None
+        default_texture = Texture(
+            shadow_intensity=0.2, highlight_intensity=0.1, opacity=1.0, blur=0
+        )
+        default_layout = Layout(
+            roundness=0.5, density=0.5, border=1.0
+        )
+
+        texture = textures.get(texture_name, default_texture) if texture_name else default_texture
+        layout = layouts.get(layout_name, default_layout) if layout_name else default_layout
+
+        # Create theme with resolved components
+        theme = Theme(
+            palette=data.get('palette', 'tailwind'),
+            texture_name=texture_name or 'default',
+            texture=texture,
+            layout_name=layout_name or 'default',
+            layout=layout,
+            typography=Typography(**data.get('typography', {
+                'primary': 'sans-serif',
+                'secondary': 'sans-serif',
+                'mono': 'monospace',
+                'scale': 1.0,
+                'title_case': 'none'
+            }))
+        )
+        return theme
+
     def _scan_fonts(self, path: Path):
         if not path.exists(): return
         
-        # Serve the fonts directory statically so we can refer to them in CSS
-        app.add_static_files("/fonts", str(path))
+        # Serve the fonts directory statically so we can refer to them in CSS (once per process,
+        # whichever registry scans it), and cached Google Fonts next to it
+        with _font_mounts_lock:
+            if path.resolve() not in _font_mounts:
+                app.add_static_files("/fonts", str(path))
+                _font_mounts.add(path.resolve())
+        self.font_store.install()
 
         for file in path.glob("*.*"):
             if file.suffix.lower() in [".otf", ".ttf", ".woff", ".woff2"]:
@@ -113,43 +794,16 @@ class ThemeRegistry:
                 self.fonts[file.stem] = f"/fonts/{file.name}"
                 self.font_files[file.stem] = file
 
-    def _scan_themes(self, path: Path):
-        if not path.exists(): return
-        for file in path.glob("*.yaml"):
-            try:
-                with open(file, "r") as f:
-                    data = yaml.safe_load(f)
-                    
-                    # Resolve texture and layout references
-                    texture_name = data.get('texture')
-                    layout_name = data.get('layout')
-                    
-                    # Ensure texture and layout are never None
-                    default_texture = Texture(
-                        shadow_intensity=0.2, highlight_intensity=0.1, opacity=1.0, blur=0
-                    )
-                    default_layout = Layout(
-                        roundness=0.5, density=0.5, border=1.0
-                    )
-                    
-                    texture = self.textures.get(texture_name, default_texture) if texture_name else default_texture
-                    layout = self.layouts.get(layout_name, default_layout) if layout_name else default_layout
-                    
-                    # Create theme with resolved components
-                    theme = Theme(
-                        palette=data.get('palette', 'tailwind'),
-                        texture_name=texture_name or 'default',
-                        texture=texture,
-                        layout_name=layout_name or 'default',
-                        layout=layout,
-                        typography=Typography(**data.get('typography', {
-                            'primary': 'sans-serif',
-                            'secondary': 'sans-serif',
-                            'mono': 'monospace',
-                            'scale': 1.0,
-                            'title_case': 'none'
-                        }))
-                    )
-                    self.themes[file.stem] = theme
-            except Exception:
-                pass
\ No newline at end of file
+
+# Font directories already served under /fonts
+_font_mounts: Set[Path] = set()
+_font_mounts_lock = threading.Lock()
+
+# Registries whose snapshots are saved when the process exits
+_registries: "weakref.WeakSet[ThemeRegistry]" = weakref.WeakSet()
+
+
+@atexit.register
+def _save_snapshots():
+    for registry in list(_registries):
+        registry.save_snapshot()
@@ -1,14 +1,165 @@
-from dataclasses import dataclass, field
-from typing import Literal, Dict, List, Optional
+import functools
+import re
+import sys
+from dataclasses import MISSING, dataclass, field, fields, replace
+from typing import Any, Literal, Dict, FrozenSet, List, Mapping, Optional, Sequence, Set, Tuple, Type, TypeVar
 
+import numpy as np
 
+from . import color
 
-@dataclass
+# Palette attributes that hold a single color reference (semantic roles)
+PALETTE_ROLES = (
+    "primary", "secondary", "positive", "negative", "warning", "info", "debug", "inative",
+    "shadow", "highlight", "border",
+)
+
+# Tonal ramp generated for every named color (--nt-color-<name>-<step>): step -> OKLCH lightness
+TONE_STEPS = {50: 0.97, 100: 0.93, 200: 0.87, 300: 0.79, 400: 0.71, 500: 0.63, 600: 0.55, 700: 0.47, 800: 0.39, 900: 0.30}
+
+# Surface levels emitted (--nt-surface-0..5): levels a palette does not list continue its ramp
+SURFACE_LEVELS = 6
+
+# Minimum WCAG contrast of an accent against the page surface (1.4.11: UI components and large text)
+ACCENT_CONTRAST = 3.0
+
+# Roles emitted as --nt-<role> (shadow, highlight and border become --nt-<role>-color and -rgb)
+_ACCENT_ROLES = ("primary", "secondary", "positive", "negative", "warning", "info", "inative")
+
+# A group of CSS variables emitted together from one palette entry or field: (kind, key), see Palette._emit
+Group = Tuple[str, str]
+
+
+C = TypeVar("C")
+
+# var() references to the palette's own variables (--nt-color-<name>, --nt-<role>) resolve to the entry
+_NT_VAR = re.compile(r"^var\(\s*--nt-(color-)?([\w-]+)\s*(?:,.*)?\)$", re.S)
+
+
+class ColorCycleError(ValueError):
+    """A palette name that resolves back to itself (e.g. primary: accent, accent: primary)."""
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+@functools.lru_cache(maxsize=4096)
+def _tone_vars(name: str) -> Tuple[str, ...]:
+    """--nt-color-<name>-<step> for every TONE_STEPS (the same names in every palette)."""
+    return tuple(f"--nt-color-{name}-{step}" for step in TONE_STEPS)
+
+
+class FrozenMap(dict):
+    """
+    A dict that cannot be changed, so one instance can be shared. It pickles and copies like a
+    dict (unlike mappingproxy), and a map shared by several objects stays shared in one pickle.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"'{type(self).__name__}' object is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+def color_map(colors: Mapping[str, str]) -> Mapping[str, str]:
+    """
+    A read-only map of interned names and colors, so one instance can be shared between the
+    light and dark variant of a palette (and across sessions). Maps built here are returned as is.
+    """
+    if isinstance(colors, FrozenMap):
+        return colors
+    return FrozenMap({_intern(k): _intern(v) for k, v in colors.items()})
+
+
+def _slotted(cls: Type[C]) -> Type[C]:
+    """
+    Recreates a frozen dataclass with __slots__ (what dataclass(slots=True) does on Python 3.10+):
+    no per-instance __dict__, and pickling that works despite the frozen __setattr__.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {k: v for k, v in cls.__dict__.items() if k not in names and k not in ("__dict__", "__weakref__")}
+    namespace["__slots__"] = names
+
+    def __getstate__(self):
+        return [getattr(self, name) for name in names]
+
+    def __setstate__(self, state):
+        for name, value in zip(names, state):
+            object.__setattr__(self, name, value)
+
+    namespace["__getstate__"] = __getstate__
+    namespace["__setstate__"] = __setstate__
+
+    # Without a class attribute to fall back on, init=False fields need their default set explicitly
+    defaults = [(f.name, f.default) for f in fields(cls) if not f.init and f.default is not MISSING]
+    if defaults:
+        init = cls.__init__
+
+        @functools.wraps(init)
+        def __init__(self, *args, **kwargs):
+            for name, value in defaults:
+                object.__setattr__(self, name, value)
+            init(self, *args, **kwargs)
+
+        namespace["__init__"] = __init__
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
+@_slotted
+@dataclass(frozen=True)
+class Ramps:
+    """Tonal scales of a palette, generated by build_ramps (the registry does it when a palette loads)."""
+    source: Tuple[Any, ...]  # (colors, greys, surface, mode) they were generated from
+    tones: Mapping[str, Tuple[str, ...]]  # Color name -> one value per TONE_STEPS
+    surfaces: Tuple[str, ...]  # SURFACE_LEVELS values, the listed ones first
+
+    def matches(self, palette: "Palette") -> bool:
+        colors, greys, surface, mode = self.source
+        return colors is palette.colors and greys is palette.greys and surface == palette.surface and mode == palette.mode
+
+
+@_slotted
+@dataclass(frozen=True)
+class ContrastIndex:
+    """WCAG contrast ratios of a palette's colors and content against its levels, computed by build_contrast."""
+    source: Tuple[Any, ...]  # (colors, greys, surface, content, mode) it was computed from
+    names: Tuple[str, ...]  # Rows of `ratios`: the palette's colors
+    levels: Tuple[str, ...]  # Columns of `ratios`: 'surface-0'.. (every emitted level), then 'content-0'..
+    ratios: np.ndarray  # Read-only, NaN where a side is not a color
+    text: np.ndarray  # Content levels (rows) against the listed surface levels (columns)
+    readable: FrozenSet[str]  # Colors with ACCENT_CONTRAST against the page surface (surface-0)
+
+    def matches(self, palette: "Palette") -> bool:
+        colors, greys, surface, content, mode = self.source
+        return (colors is palette.colors and greys is palette.greys and surface == palette.surface
+                and content == palette.content and mode == palette.mode)
+
+    def ratio(self, name: str, level: str = "surface-0") -> float:
+        return float(self.ratios[self.names.index(name), self.levels.index(level)])
+
+    def failing(self, minimum: float, levels: Optional[Sequence[str]] = None) -> List[Tuple[str, str, float]]:
+        """(color, level, ratio) for every pair below `minimum`, against the given levels (default: the page surface)."""
+        columns = [self.levels.index(level) for level in (levels or ("surface-0",)) if level in self.levels]
+        return [
+            (self.names[row], self.levels[columns[column]], float(self.ratios[row, columns[column]]))
+            for row, column in np.argwhere(self.ratios[:, columns] < minimum)
+        ]
+
+
+@_slotted
+@dataclass(frozen=True)
 class Palette:
     name: str
     mode: Literal["light", "dark"]
-    colors: Dict[str, str]
-    greys: Dict[str, str]
+    colors: Mapping[str, str] # Read-only, see color_map
+    greys: Mapping[str, str]
     
     primary: str
     secondary: str
@@ -19,37 +170,388 @@ class Palette:
     debug: str
     inative: str
     
-    content: List[str]
-    surface: List[str]
+    content: Sequence[str]
+    surface: Sequence[str]
     shadow: str
     highlight: str
     border: str
 
-    def resolve_color(self, color_ref: str, depth: int = 10) -> str:
+    # Carried over by dataclasses.replace, so session copies reuse the registry's ramps (see get_ramps)
+    ramps: Optional[Ramps] = field(default=None, repr=False, compare=False)
+    contrast: Optional[ContrastIndex] = field(default=None, repr=False, compare=False)
+
+    # Resolved lookup tables, built by compile() (edits are new instances: dataclasses.replace or derive)
+    _table: Optional[Dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    _rgb: Optional[Dict[str, Optional[Tuple[int, int, int]]]] = field(default=None, init=False, repr=False, compare=False)
+    _chains: Optional[Dict[str, Tuple[str, ...]]] = field(default=None, init=False, repr=False, compare=False)  # References only
+
+    # CSS variables and their dependency graph (group -> the names its variables resolve through), built by css_vars
+    _vars: Optional[Dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    _groups: Optional[Dict[Group, Tuple[str, ...]]] = field(default=None, init=False, repr=False, compare=False)
+    _graph: Optional[Dict[Group, Tuple[str, ...]]] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "colors", color_map(self.colors))
+        object.__setattr__(self, "greys", color_map(self.greys))
+        object.__setattr__(self, "content", tuple(_intern(c) for c in self.content))
+        object.__setattr__(self, "surface", tuple(_intern(c) for c in self.surface))
+        for role in PALETTE_ROLES:
+            object.__setattr__(self, role, _intern(getattr(self, role)))
+
+    def compile(self) -> Dict[str, str]:
+        """
+        Resolves every color name and semantic role to its final value (and RGB triple), recording
+        the names each one resolves through. Raises ColorCycleError if a name refers back to itself.
+        """
+        names = list(self.colors) + list(self.greys) + list(PALETTE_ROLES)
+        traces = {name: self._trace(name) for name in names}
+        table = {name: value for name, (value, _) in traces.items()}
+        rgb = dict(zip(table, color.rgb_triples(list(table.values()))))  # One batch per palette
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_rgb", rgb)
+        object.__setattr__(self, "_chains", {name: chain for name, (_, chain) in traces.items() if len(chain) > 1})
+        return table
+
+    @property
+    def table(self) -> Dict[str, str]:
+        """The resolved lookup table (compiled on first use)."""
+        return self._table if self._table is not None else self.compile()
+
+    @property
+    def css_vars(self) -> Dict[str, str]:
+        """The palette's CSS variables (colors, tonal ramps, surface, content, texture colors), emitted on first use."""
+        if self._vars is None:
+            css_vars, groups, graph = {}, {}, {}
+            for group in self._var_groups():
+                emitted, graph[group] = self._emit(*group)
+                css_vars.update(emitted)
+                groups[group] = tuple(emitted)
+            object.__setattr__(self, "_vars", css_vars)
+            object.__setattr__(self, "_groups", groups)
+            object.__setattr__(self, "_graph", graph)
+        return self._vars
+
+    def dependents(self, *names: str) -> List[str]:
+        """The CSS variables derived from any of `names` (color and grey names or fields, e.g. 'primary', 'surface')."""
+        self.css_vars  # Builds the graph
+        groups = self._affected(set(names))
+        return [var for group, emitted in self._groups.items() if group in groups for var in emitted]
+
+    def derive(self, **values) -> "Palette":
+        """
+        A copy with some fields replaced, like dataclasses.replace, that recomputes only the table
+        entries and CSS variables resolving through a changed name (see dependents). Edits that add
+        or remove names, or change the mode, are compiled from scratch on first use.
+        """
+        palette = replace(self, **values)
+        changed = self._changed_names(palette, values)
+        if changed is None or self._table is None:
+            return palette
+
+        table, chains = dict(self._table), dict(self._chains)
+        entries = [name for name in table if name in changed or not changed.isdisjoint(chains.get(name, ()))]
+        for name in entries:
+            table[name], chain = palette._trace(name)
+            if len(chain) > 1:
+                chains[name] = chain
+            else:
+                chains.pop(name, None)
+        rgb = dict(self._rgb)
+        rgb.update(zip(entries, color.rgb_triples([table[name] for name in entries])))
+        object.__setattr__(palette, "_table", table)
+        object.__setattr__(palette, "_rgb", rgb)
+        object.__setattr__(palette, "_chains", chains)
+        if self._vars is None:
+            return palette
+
+        affected = self._affected(changed)
+        kinds = {kind for kind, _ in affected}
+        if kinds & {"tones", "surface"}:
+            object.__setattr__(palette, "ramps", None)  # Regenerated by get_ramps
+        if kinds & {"color", "surface", "content"}:
+            object.__setattr__(palette, "contrast", None)
+
+        css_vars, graph = dict(self._vars), dict(self._graph)
+        for group, names in self._groups.items():  # In emission order
+            if group not in affected:
+                continue
+            emitted, graph[group] = palette._emit(*group)
+            if tuple(emitted) != names:
+                return palette  # Other variables than before: emitted from scratch on first use
+            css_vars.update(emitted)
+        object.__setattr__(palette, "_vars", css_vars)
+        object.__setattr__(palette, "_groups", self._groups)  # Same variables, so shared
+        object.__setattr__(palette, "_graph", graph)
+        return palette
+
+    def get_ramps(self) -> Ramps:
+        """The tonal ramps (generated at load; rebuilt only if colors, greys or surface were overridden)."""
+        ramps = self.ramps
+        if ramps is None or not ramps.matches(self):
+            ramps = build_ramps([self])[0]
+        return ramps
+
+    def get_contrast(self) -> ContrastIndex:
+        """The contrast index (computed at load; recomputed only if colors, surface or content were overridden)."""
+        contrast = self.contrast
+        if contrast is None or not contrast.matches(self):
+            contrast = build_contrast([self])[0]
+        return contrast
+
+    def resolve_color(self, color_ref: str) -> str:
         """Resolves a color reference (name) to a hex code or value."""
         if not color_ref: return ""
-        if depth <= 0: return color_ref
-
-        # Check if valid CSS value
-        if color_ref.startswith(("#", "rgb", "hsl", "var")):
-            return color_ref
-        
-        # Check colors
-        if color_ref in self.colors:
-            return self.resolve_color(self.colors[color_ref], depth - 1)
-            
-        # Check greys
-        if color_ref in self.greys:
-            return self.resolve_color(self.greys[color_ref], depth - 1)
-
-        # Check attributes (like primary, secondary)
-        val = getattr(self, color_ref, None)
-        if isinstance(val, str):
-            return self.resolve_color(val, depth - 1)
-            
-        return color_ref # Fallback
-
-@dataclass
+        value = self.table.get(color_ref)
+        if value is not None:
+            return value
+        return self._trace(color_ref)[0]
+
+    def resolve_rgb(self, color_ref: str) -> Optional[Tuple[int, int, int]]:
+        """Resolves a color reference to an (r, g, b) tuple, None if it is not a color (e.g. var(--other))."""
+        table = self.table
+        if color_ref in table:
+            return self._rgb[color_ref]
+        return color.rgb_triple(self.resolve_color(color_ref))
+
+    def _trace(self, color_ref: str) -> Tuple[str, Tuple[str, ...]]:
+        """Walks references without the lookup table (used to build it): the value and the names on the way."""
+        trail: List[str] = []
+        while color_ref:
+            # Check if valid CSS value (hex or function; see color.parse for every syntax)
+            if color.is_literal(color_ref):
+                match = _NT_VAR.match(color_ref)
+                if not match:
+                    return color_ref, tuple(trail)
+                prefix, name = match.groups()
+                if not (name in self.colors or name in self.greys or (not prefix and name in PALETTE_ROLES)):
+                    return color_ref, tuple(trail)
+                color_ref = name
+
+            if color_ref in trail:
+                if color_ref == trail[-1] and color_ref.lower() in color.NAMED_COLORS:
+                    return color_ref, tuple(trail)  # white: white is the CSS color
+                raise ColorCycleError(" -> ".join(trail[trail.index(color_ref):] + [color_ref]))
+
+            # Check colors, then greys, then attributes (like primary, secondary)
+            if color_ref in self.colors:
+                value = self.colors[color_ref]
+            elif color_ref in self.greys:
+                value = self.greys[color_ref]
+            else:
+                value = getattr(self, color_ref, None) if not color_ref.startswith("_") else None
+                if not isinstance(value, str):
+                    return color_ref, tuple(trail)  # Fallback
+            trail.append(color_ref)
+            color_ref = value
+        return "", tuple(trail)
+
+    def _affected(self, names: Set[str]) -> Set[Group]:
+        """The groups of CSS variables that resolve through any of `names`."""
+        return {group for group, deps in self._graph.items() if not names.isdisjoint(deps)}
+
+    def _lookup(self, color_ref: str) -> Tuple[str, Tuple[str, ...]]:
+        """resolve_color, and the names the reference resolves through."""
+        table = self.table
+        if color_ref in table:
+            return table[color_ref], self._chains.get(color_ref) or (color_ref,)
+        return self._trace(color_ref)
+
+    def _field(self, key: str, kind: str) -> Tuple[str, Tuple[str, ...]]:
+        """The value of a color, grey or role resolved, and the names on the way (starting with `key`)."""
+        if kind == "color" or key not in self.colors and (kind == "grey" or key not in self.greys):
+            return self._lookup(key)  # The table entry of `key` resolves this very value
+        value, chain = self._lookup(self.greys[key] if kind == "grey" else getattr(self, key))
+        return value, (key,) + chain
+
+    def _rgb_string(self, color_ref: str, value: str) -> str:
+        """The RGB triple of a resolved reference for rgba(var(...), alpha)."""
+        rgb = self._rgb[color_ref] if color_ref in self._rgb else color.rgb_triple(value)
+        return f"{rgb[0]}, {rgb[1]}, {rgb[2]}" if rgb else "0, 0, 0"  # Fallback
+
+    def _changed_names(self, palette: "Palette", values: Mapping[str, Any]) -> Optional[Set[str]]:
+        """The names and fields an edit changes, None if it adds or removes names (or changes the mode)."""
+        changed = set()
+        for key in values:
+            before, after = getattr(self, key), getattr(palette, key)
+            if key in ("colors", "greys"):
+                if before.keys() != after.keys():
+                    return None
+                changed.update(name for name in after if after[name] != before[name])
+            elif key in PALETTE_ROLES or key in ("name", "surface", "content"):
+                if after != before:
+                    changed.add(key)
+            elif key != "mode" or after != before:
+                return None
+        return changed
+
+    def _var_groups(self) -> List[Group]:
+        """Every group of CSS variables, in emission order."""
+        groups = [("role", role) for role in _ACCENT_ROLES]
+        if "base03" in self.table:
+            groups.append(("dark", "base03"))
+        groups += [("color", name) for name in self.colors]
+        groups.append(("base", ""))
+        groups += [("grey", name) for name in self.greys]
+        groups += [("tones", name) for name in self.colors]
+        groups += [("surface", ""), ("content", ""), ("texture", "shadow"), ("texture", "highlight"), ("texture", "border")]
+        return groups
+
+    def _emit(self, kind: str, key: str) -> Tuple[Dict[str, str], Tuple[str, ...]]:
+        """The CSS variables of one group, and the names and fields they were resolved through."""
+        if kind == "tones":
+            # Tonal ramps (generated when the palette loaded)
+            tones = self.get_ramps().tones.get(key, ())
+            return dict(zip(_tone_vars(key), tones)), self._lookup(key)[1]
+        if kind in ("color", "grey"):
+            value, chain = self._field(key, kind)
+            return {f"--nt-color-{key}": value}, chain
+        if kind == "role":
+            value, chain = self._field(key, kind)
+            return {"--nt-inactive" if key == "inative" else f"--nt-{key}": value}, chain
+        if kind == "texture":
+            value, chain = self._field(key, kind)
+            return {f"--nt-{key}-color": value, f"--nt-{key}-rgb": self._rgb_string(getattr(self, key), value)}, chain
+        if kind == "dark":
+            value, chain = self._lookup(key)
+            return {"--nt-dark": value}, chain  # Quasar's dark component background
+        if kind == "base":
+            # Ensure base colors exist
+            base = (("white", "#ffffff"), ("black", "#000000"))
+            return {f"--nt-color-{name}": value for name, value in base if name not in self.colors}, ()
+
+        # Surface (levels the palette does not list continue its ramp) and content
+        levels = [(level, *self._lookup(level)) for level in getattr(self, kind)]
+        css_vars = {}
+        if levels:
+            first, value, _ = levels[0]
+            css_vars[f"--nt-{kind}-rgb"] = self._rgb_string(first, value)
+            if kind == "surface":
+                css_vars["--nt-surface-page"] = value
+                css_vars.update((f"--nt-surface-{i}", value) for i, value in enumerate(self.get_ramps().surfaces))
+            else:
+                css_vars["--nt-content-accent"] = value
+                css_vars.update((f"--nt-content-{i}", value) for i, (_, value, _) in enumerate(levels))
+        return css_vars, (kind,) + tuple(name for _, _, chain in levels for name in chain)
+
+
+def build_ramps(palettes: Sequence[Palette]) -> List[Ramps]:
+    """
+    Generates the tonal ramps of several palettes in one batch (one parse, one gamut fit) and
+    stores them on each palette. Variants whose colors resolve the same share their tones.
+    """
+    tone_sources: Dict[Tuple[Tuple[str, str], ...], int] = {}  # Resolved (name, value) pairs -> index
+    tone_index, surfaces = [], []
+    for palette in palettes:
+        table = palette.table
+        pairs = tuple((name, table[name]) for name in palette.colors)
+        tone_index.append(tone_sources.setdefault(pairs, len(tone_sources)))
+        surfaces.append([palette.resolve_color(level) for level in palette.surface])
+
+    values = [value for pairs in tone_sources for _, value in pairs]
+    tone_count = len(values)
+    values += [value for levels in surfaces for value in levels]
+    lch = color.convert(values, "oklch")
+
+    # Missing surface levels continue each palette's ramp: darker in light mode, lighter in dark mode,
+    # by the average step of the listed levels
+    lasts, directions, missing = [], [], []
+    offset = tone_count
+    for palette, levels in zip(palettes, surfaces):
+        levels_lch = lch[offset:offset + len(levels)]
+        offset += len(levels)
+        step = np.abs(np.diff(levels_lch[:, 0])).mean() if len(levels) > 1 else 0.04
+        step = float(np.clip(np.nan_to_num(step, nan=0.04), 0.03, 0.08))
+        lasts.append(levels_lch[-1] if len(levels) else np.full(3, np.nan))
+        directions.append(-step if palette.mode == "light" else step)
+        missing.append(max(SURFACE_LEVELS - len(levels), 0))
+    count = max(missing, default=0)
+
+    # Tones and surface levels of every palette in one fit
+    steps = len(TONE_STEPS)
+    ramps_lch = np.concatenate([
+        color.tonal_ramps(lch[:tone_count], list(TONE_STEPS.values())).reshape(-1, 3),
+        color.extend_ramps(np.array(lasts).reshape(-1, 3), np.array(directions), count).reshape(-1, 3),
+    ])
+    generated = color.to_hex(color.oklch_to_srgb(ramps_lch))
+    tone_values, surface_values = generated[:tone_count * steps], generated[tone_count * steps:]
+
+    tones, offset = [], 0
+    for pairs in tone_sources:
+        ramps = {}
+        for name, _ in pairs:
+            ramp = tone_values[offset * steps:(offset + 1) * steps]
+            if ramp[0] is not None:  # Skip values that are not colors (e.g. var(--other))
+                ramps[_intern(name)] = tuple(_intern(value) for value in ramp)
+            offset += 1
+        tones.append(FrozenMap(ramps))
+
+    result = []
+    for i, (palette, levels) in enumerate(zip(palettes, surfaces)):
+        extension = surface_values[i * count:i * count + missing[i]]
+        if None in extension:  # The last level is not a color: repeat it (or emit nothing without levels)
+            extension = levels[-1:] * missing[i]
+        ramps = Ramps(
+            source=(palette.colors, palette.greys, palette.surface, palette.mode),
+            tones=tones[tone_index[i]],
+            surfaces=tuple(_intern(value) for value in levels[:SURFACE_LEVELS] + extension),
+        )
+        object.__setattr__(palette, "ramps", ramps)
+        result.append(ramps)
+    return result
+
+
+def build_contrast(palettes: Sequence[Palette]) -> List[ContrastIndex]:
+    """
+    Computes the contrast index of several palettes in one vectorized pass (the luminance of every
+    value, then every ratio with one gather) and stores it on each palette.
+    """
+    values: List[str] = []
+    blocks = []
+    for palette in palettes:
+        table = palette.table
+        names = tuple(palette.colors)
+        surfaces = palette.get_ramps().surfaces
+        content = [palette.resolve_color(level) for level in palette.content]
+        blocks.append((len(values), names, len(surfaces), len(content)))
+        values += [table[name] for name in names] + list(surfaces) + content
+    luminance = color.relative_luminance(color.parse(values)[:, :3])
+
+    # Every (row, column) pair of every palette: colors and content against the levels
+    rows, columns = [np.empty(0, dtype=int)], [np.empty(0, dtype=int)]
+    for palette, (start, names, surfaces, content) in zip(palettes, blocks):
+        levels = np.arange(start + len(names), start + len(names) + surfaces + content)
+        texts = levels[surfaces:]
+        listed = levels[:min(len(palette.surface), surfaces)]
+        for sources, targets in ((np.arange(start, start + len(names)), levels), (texts, listed)):
+            rows.append(np.repeat(sources, len(targets)))
+            columns.append(np.tile(targets, len(sources)))
+    ratios = color.contrast_ratio(luminance[np.concatenate(rows)], luminance[np.concatenate(columns)])
+
+    result, offset = [], 0
+    for palette, (start, names, surfaces, content) in zip(palettes, blocks):
+        size = len(names) * (surfaces + content)
+        matrix = ratios[offset:offset + size].reshape(len(names), surfaces + content)
+        offset += size
+        listed = min(len(palette.surface), surfaces)
+        text = ratios[offset:offset + content * listed].reshape(content, listed)
+        offset += content * listed
+        matrix.flags.writeable = text.flags.writeable = False
+        failing = (matrix[:, :min(surfaces, 1)] < ACCENT_CONTRAST).any(axis=1)  # NaN (not a color) never fails
+        contrast = ContrastIndex(
+            source=(palette.colors, palette.greys, palette.surface, palette.content, palette.mode),
+            names=names,
+            levels=tuple(f"surface-{i}" for i in range(surfaces)) + tuple(f"content-{i}" for i in range(content)),
+            ratios=matrix,
+            text=text,
+            readable=frozenset(name for name, fails in zip(names, failing) if not fails),
+        )
+        object.__setattr__(palette, "contrast", contrast)
+        result.append(contrast)
+    return result
+
+
+@_slotted
+@dataclass(frozen=True)
 class Texture:
     shadow_intensity: float
     highlight_intensity: float
@@ -63,13 +565,15 @@ class Texture:
     chip: str = ""  # Also applies to badges
     menu: str = ""  # Also applies to tooltips and notifications
 
-@dataclass
+@_slotted
+@dataclass(frozen=True)
 class Layout:
     roundness: float
     density: float
     border: float
 
-@dataclass
+@_slotted
+@dataclass(frozen=True)
 class Typography:
     primary: str
     secondary: str
@@ -77,7 +581,8 @@ class Typography:
     scale: float
     title_case: Literal["lowercase", "title_case", "uppercase", "none"]
 
-@dataclass
+@_slotted
+@dataclass(frozen=True)
 class Theme:
     palette: str  # Name of the palette to use
     texture_name: str
@@ -9,26 +9,71 @@ Import this module as 'nt' to access all NiceTheme components:
     # Optional: Initialize with custom theme directories
     nt.initialize(themes_dirs=['path/to/my/themes'])
     
-    nt.button('Click me', variant='primary')
-    nt.select(['A', 'B', 'C'])
-    nt.icon('home')
+    @nt.page('/')  # like ui.page, with the theme rendered server-side
+    def index():
+        nt.button('Click me', variant='primary')
+        nt.select(['A', 'B', 'C'])
+        nt.icon('home')
 """
-from typing import List, Optional
+import functools
+import inspect
+from typing import Callable, List, Optional, Sequence
 from pathlib import Path
+from nicegui import ui
+from .core.bridge import _install_client_hints
+from .core.fonts import DEFAULT_SUBSETS
 
 # ... (Global state)
 _manager = None
 _bridge = None
+_options = None  # Arguments of the call that initialized them
 
-def initialize(themes_dirs: Optional[List[Path]] = None):
-    """Initializes the NiceTheme system with optional custom theme directories."""
-    global _manager, _bridge
+def initialize(themes_dirs: Optional[List[Path]] = None, font_cache: Optional[Path] = None,
+               offline_fonts: bool = False, font_subsets: Optional[Sequence[str]] = DEFAULT_SUBSETS,
+               watch_themes: bool = False):
+    """
+    Initializes the NiceTheme system with optional custom theme directories.
+    Google Fonts are cached in `font_cache` and served by the app; with `offline_fonts`
+    only that (pre-seeded) directory is used and nothing is downloaded.
+    Local fonts are split into WOFF2 files per Unicode range in `font_subsets` (None: raw files).
+    With `watch_themes`, edited theme YAML files are applied to connected clients without a restart.
+    Calling it again with other arguments raises ValueError.
+    """
+    global _manager, _bridge, _options
+    options = (themes_dirs, font_cache, offline_fonts, font_subsets, watch_themes)
     if _manager is None:
-        _manager = ThemeManager(themes_dirs=themes_dirs)
+        registry = ThemeRegistry.shared(themes_dirs, font_cache=font_cache, offline_fonts=offline_fonts,
+                                        font_subsets=font_subsets, watch=watch_themes)
+        _manager = ThemeManager(registry=registry)
         # Registry is initialized within Manager
         _bridge = ThemeBridge(_manager, _manager._registry)
+        _options = options
+    elif options != _options:
+        raise ValueError("nt.initialize() was already called with other arguments "
+                         "(or a nt.page was requested before it, initializing the defaults)")
     return _manager
 
+def page(path: str, **kwargs) -> Callable:
+    """
+    Drop-in replacement for ``ui.page`` that renders the theme into the initial HTML,
+    so the page is visible and correctly themed on first paint.
+    The theme system is resolved on the first request, so `initialize(...)` may come after the decorator.
+    """
+    _install_client_hints()  # Middleware can only be added before the app starts
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def themed_page(*args, **page_kwargs):
+            if _bridge is None:
+                initialize()
+            _bridge.first_paint()
+            result = func(*args, **page_kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        return ui.page(path, **kwargs)(themed_page)
+    return decorator
+
 # Import atomic components
 from .components.atoms import (
     button,
@@ -50,6 +95,9 @@ from .components.organisms import terminal
 from .core import ThemeManager, ThemeBridge, ThemeRegistry
 
 __all__ = [
+    # Pages
+    'initialize',
+    'page',
     # Atomic components
     'button',
     'select_button',
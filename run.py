@@ -75,6 +75,16 @@ def start_server():
     # Use the same python executable that is running this script
     PROCESS = subprocess.Popen([sys.executable, 'test/test.py'])
 
+def needs_restart(changes):
+    """
+    Theme YAML files are hot-reloaded by the running app (ThemeRegistry(watch=True)).
+    """
+    for _, path in changes:
+        if path.endswith('.yaml') and os.sep + 'themes' + os.sep in path:
+            continue
+        return True
+    return False
+
 def signal_handler(signum, frame):
     """
     Handle interrupt signals to cleanly exit.
@@ -106,6 +116,9 @@ def main():
         print(f"Watching for changes in: {', '.join(valid_paths)}")
         for changes in watch(*valid_paths):
             change_list = list(changes)
+            if not needs_restart(change_list):
+                print(f"\nDetected {len(change_list)} theme change(s), applied by the running app.")
+                continue
             print(f"\nDetected {len(change_list)} change(s). Restarting...")
             start_server()
     except Exception as e:
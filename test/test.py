@@ -13,9 +13,9 @@ from nicetheme.components.atoms.select import select
 from nicetheme.components.atoms.icon import palette_icon
 from nicetheme.components.molecules.theme_config import theme_config
 
-# Initialize Manager (internally creates its own registry and loads default.yaml)
-manager = ThemeManager()
-registry = manager._registry
+# Initialize Manager (loads default.yaml); theme YAML edits are applied live (see run.py)
+registry = ThemeRegistry.shared(watch=True)
+manager = ThemeManager(registry=registry)
 
 # Initialize ThemeBridge to sync the theme to the UI
 bridge = ThemeBridge(manager, registry)
@@ -38,7 +38,7 @@ with ui.column().classes('w-full items-center p-8 gap-8 min-h-screen'):
             ui.select(
                 theme_mapping, 
                 value=manager.theme_name,
-                on_change=lambda e: manager.select_theme(e.value)
+                on_change=lambda e: manager.session().select_theme(e.value)
             ).classes('w-64').props('rounded outlined dense')
 
 
@@ -61,9 +61,30 @@ def main_page():
 # Example 2: Using core utilities
 from nicetheme import ThemeManager, ThemeRegistry
 
-# Initialize theme manager
+# Initialize theme manager: managers, components and user code share one registry per process
 manager = ThemeManager()
-registry = ThemeRegistry()
+registry = ThemeRegistry.shared()
+assert registry is manager.registry is ThemeManager().registry
+assert ThemeRegistry.scan_count == 1, f"expected one registry scan, got {ThemeRegistry.scan_count}"
+
+# Overrides may be lists or dicts (e.g. surface levels, named colors) and still compile
+from nicetheme.core import ThemeCompiler
+manager.update_palette(surface=['#ffffff', '#eeeeee'], colors={'brand': '#268bd2'})
+assert ThemeCompiler().compile(manager) is not None
+
+# Stale or malformed stored preferences (nt_prefs_* cookie, localStorage) are dropped, not raised
+import json
+from urllib.parse import quote, unquote
+cookie = quote(json.dumps({
+    'mode': 'sepia', 'palette': ['solarized'], 'texture': 'no-such-texture', 'layout': {},
+    'typography': 'x', 'palette_overrides': {'colors': 'x', 'surface': [1, 2], 'primary': 'red', 'mode': 'dark'},
+}))
+manager.apply_preferences(json.loads(unquote(cookie)))
+manager.apply_preferences({'typography': {'scale': 'big', 'primary': 'Inter'}})
+manager.apply_preferences(['not', 'a', 'dict'])
+assert manager.mode == 'auto' and manager.theme.typography.primary == 'Inter'
+assert manager.get_active_palette().primary == 'red'
+assert ThemeCompiler().compile(manager) is not None
 
 print("✅ NiceTheme API test successful!")
 print(f"Available components: {', '.join([x for x in dir(nt) if not x.startswith('_')])}")